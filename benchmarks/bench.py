@@ -0,0 +1,280 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import contextlib
+import json
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import gvars
+from lib.arg_parse import ArgParse
+from lib.tick_files import save_ticks
+from models.monitor import Monitor
+from ib.ib_hft import IBHft
+from ib.order_book import OrderBook
+from models.params import BASIC_PARAMETERS
+from benchmarks.tick_generators import generate_ticks, REGIMES
+
+# python benchmarks/bench.py [ticks=N] [children=N] [ticker=ES] [seed=N]
+#     [regimes=random_walk,trending,choppy] [cases=monitor,...] [memory=0] [out=file.json]
+# python benchmarks/bench.py compare <old.json> <new.json>
+#
+# Every case replays the same synthetic ticks, once to measure the throughput and
+# once more under tracemalloc to measure the peak memory, unless memory=0.
+CASES = ('monitor', 'monitor_children', 'density', 'speed', 'breaking', 'replay')
+
+class Benchmark:
+    def __init__(self, ticker="ES", length=20000, children=4, seed=0, regimes=None, cases=None, memory=True):
+        self.ticker = ticker
+        self.length = length
+        self.children = children
+        self.seed = seed
+        self.regimes = regimes or list(REGIMES)
+        self.cases = cases or list(CASES)
+        self.memory = memory
+        self.results = []
+
+
+    def run(self):
+        temp_dir = tempfile.mkdtemp(prefix="hft_bench_")
+        gvars.TEMP_DIR = temp_dir # Datalogs of the monitors
+        try:
+            for regime in self.regimes:
+                times, prices = generate_ticks(regime, self.ticker, self.length, self.seed)
+                for case in self.cases:
+                    self.results.append(self.run_case(case, regime, times, prices))
+                    print(self.result_str(self.results[-1]))
+        finally:
+            shutil.rmtree(temp_dir)
+        return self.report()
+
+
+    def run_case(self, case, regime, times, prices):
+        run = getattr(self, f"run_{case}")
+        seconds = self.measure(run, times, prices)
+        result = {
+            'case': case,
+            'regime': regime,
+            'ticker': self.ticker,
+            'ticks': len(times),
+            'children': self.children if case in ('monitor_children', 'replay') else 0,
+            'seconds': round(seconds, 4),
+            'ticks_per_sec': round(len(times) / seconds, 1) if seconds > 0 else None
+        }
+        if self.memory:
+            tracemalloc.start()
+            try:
+                self.measure(run, times, prices)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            result['peak_memory_kb'] = round(peak / 1024, 1)
+        return result
+
+
+    # Runs return the seconds spent in what they measure, without their setup
+    def measure(self, run, times, prices):
+        random.seed(self.seed) # Params of the children monitors
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return run(times, prices)
+
+
+    def run_monitor(self, times, prices, children=0):
+        gvars.args = ArgParse(["bench.py"])
+        remote = BenchRemote()
+        monitor = Monitor(self.ticker, remote, 0)
+        monitor.create_children(children)
+        start = time.perf_counter()
+        for price_time, price in zip(times, prices):
+            remote.price_change(monitor, price, price_time)
+            monitor.price_change(4, price, price_time)
+        seconds = time.perf_counter() - start
+        monitor.close()
+        return seconds
+
+
+    def run_monitor_children(self, times, prices):
+        return self.run_monitor(times, prices, self.children)
+
+
+    def run_density(self, times, prices):
+        return self.run_component(times, prices, 'density', ('density',))
+
+
+    def run_speed(self, times, prices):
+        return self.run_component(times, prices, 'speed', ('speed',))
+
+
+    def run_breaking(self, times, prices):
+        # Breaking works on the density points
+        return self.run_component(times, prices, 'breaking', ('density', 'breaking'))
+
+
+    # Only the price_change of the component is timed, the ticks are stored
+    # and the components it depends on are updated outside the measure
+    def run_component(self, times, prices, component, components):
+        gvars.args = ArgParse(["bench.py"])
+        monitor = Monitor(self.ticker, BenchRemote(), 0)
+        seconds = 0
+        for price_time, price in zip(times, prices):
+            jump = monitor.ticks(price - monitor.data.last_price()) if len(monitor.data) > 0 else 0
+            monitor.data.append(price, price_time, jump)
+            monitor.set_last_height_and_trend()
+            for name in components:
+                if name == component:
+                    start = time.perf_counter()
+                    getattr(monitor, name).price_change()
+                    seconds += time.perf_counter() - start
+                else:
+                    getattr(monitor, name).price_change()
+        monitor.close()
+        return seconds
+
+
+    # Load mode replay of a tick file, from loading the file to clear_all
+    def run_replay(self, times, prices):
+        tick_price, price_precision, dollar_multiplier = BASIC_PARAMETERS[self.ticker[0:2]]
+        tick_file = f"{gvars.TEMP_DIR}/{self.ticker}.ticks"
+        save_ticks(tick_file, times, prices, self.ticker, tick_price, price_precision)
+        gvars.args = ArgParse(["hft.py", tick_file, "0", str(self.children)])
+        start = time.perf_counter()
+        IBHft(input_file=tick_file, collect_params=True)
+        return time.perf_counter() - start
+
+
+    def report(self):
+        return {
+            'commit': git_commit(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'conf': {key: value for key, value in gvars.CONF.items() if isinstance(value, (bool, int, float, str))},
+            'seed': self.seed,
+            'results': self.results
+        }
+
+
+    @staticmethod
+    def result_str(result):
+        output = (f"{result['case']:<18} {result['regime']:<12} {result['ticks']:>7} ticks "
+            f"{result['seconds']:>8.3f} s {result['ticks_per_sec'] or 0:>10.1f} ticks/s")
+        if 'peak_memory_kb' in result:
+            output += f" {result['peak_memory_kb']:>10.1f} KB peak"
+        return output
+
+
+    # Ratios of new / old for the cases found in both reports
+    @staticmethod
+    def compare_str(old, new):
+        old_results = {(r['case'], r['regime'], r['ticker'], r['ticks'], r['children']): r for r in old['results']}
+        output = f"{old['commit'][:10]} -> {new['commit'][:10]}\n"
+        output += f"{'case':<18} {'regime':<12} {'ticks/s':>12} {'ratio':>7} {'peak KB':>12} {'ratio':>7}\n"
+        for result in new['results']:
+            key = (result['case'], result['regime'], result['ticker'], result['ticks'], result['children'])
+            if key not in old_results:
+                continue
+            old_result = old_results[key]
+            output += f"{result['case']:<18} {result['regime']:<12} {result['ticks_per_sec']:>12.1f} {ratio(result, old_result, 'ticks_per_sec'):>7}"
+            if 'peak_memory_kb' in result:
+                output += f" {result['peak_memory_kb']:>12.1f} {ratio(result, old_result, 'peak_memory_kb'):>7}"
+            output += "\n"
+        return output
+
+
+# Accepts and fills the orders of the monitors like IBHft in load mode:
+# market orders at once, limit orders when a later tick reaches their price
+class BenchRemote:
+    def __init__(self):
+        self.live_mode = False
+        self.order_latencies = None
+        self.current_order_id = 0
+        self.order_book = None
+        self.monitors = {} # order_id -> monitor, of the resting orders
+        self.last_price = None
+        self.last_time = None
+
+
+    def price_change(self, monitor, price, price_time):
+        self.last_price = price
+        self.last_time = price_time
+        if self.order_book is None:
+            self.order_book = OrderBook(monitor.prm.tick_price)
+        for order, fill_price in self.order_book.match(price):
+            del self.monitors[order.order_id]
+            order.monitor.order_change(order.order_id, "Filled", 0, fill_price, price_time)
+
+
+    def place_order(self, monitor, action, quantity, price=None, order_id=None, test=False):
+        if order_id is None:
+            self.current_order_id += 1
+            order_id = self.current_order_id
+        monitor.order_change(order_id, "Submitted", 0, 0, self.last_time)
+        if price is None:
+            self.cancel_resting(monitor)
+            monitor.order_change(order_id, "Filled", 0, self.last_price, self.last_time)
+        else:
+            self.cancel_resting(monitor)
+            self.order_book.add(monitor, order_id, action, quantity, price)
+            self.monitors[order_id] = monitor
+
+
+    def cancel_order(self, order_id, test=False):
+        monitor = self.monitors.get(order_id)
+        if monitor is not None:
+            self.cancel_resting(monitor)
+            monitor.order_change(order_id, "Cancelled", 0, 0, self.last_time)
+
+
+    def cancel_resting(self, monitor):
+        order = self.order_book.cancel(monitor)
+        if order is not None:
+            del self.monitors[order.order_id]
+
+
+    def store_params(self, params):
+        pass
+
+
+def ratio(result, old_result, name):
+    if not old_result.get(name) or result.get(name) is None:
+        return ""
+    return f"{result[name] / old_result[name]:.2f}"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+if __name__ == "__main__":
+    args = ArgParse(sys.argv)
+    if sys.argv[1:2] == ["compare"]:
+        with open(sys.argv[2]) as f:
+            old = json.load(f)
+        with open(sys.argv[3]) as f:
+            new = json.load(f)
+        print(Benchmark.compare_str(old, new))
+        sys.exit(0)
+
+    benchmark = Benchmark(
+        ticker=args.option('ticker') or "ES",
+        length=int(args.option('ticks') or 20000),
+        children=int(args.option('children') or 4),
+        seed=int(args.option('seed') or 0),
+        regimes=[regime for regime in args.option('regimes').split(',') if regime != ''],
+        cases=[case for case in args.option('cases').split(',') if case != ''],
+        memory=args.option('memory') != '0'
+    )
+    report = benchmark.run()
+    out = args.option('out') or f"./output/benchmark_{report['commit'][:10] or 'unknown'}.json"
+    with open(out, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Saved {out}")
@@ -0,0 +1,62 @@
+import random
+from array import array
+
+from models.params import BASIC_PARAMETERS
+
+# Synthetic ticks for the benchmarks, reproducible from a seed.
+# Prices move in whole ticks of the ticker (see BASIC_PARAMETERS) and never
+# repeat the previous price, as repeated prices are dropped by Monitor.price_change.
+# Times are exponential inter arrival times, in seconds since START_TIME.
+START_TIME = 1546300800 # 2019-01-01
+START_PRICES = {'ES': 2500, 'NQ': 6500, 'YM': 23000, 'CL': 50, 'NG': 3, 'GC': 1280, 'HG': 2.6,
+    'SI': 15, 'EU': 1.14, 'JP': 0.0091, 'ZB': 145, 'ZN': 120, 'ZC': 375, 'ZS': 890}
+
+def generate_ticks(regime, ticker, length, seed=0, mean_interval=0.5):
+    tick_price, price_precision, dollar_multiplier = BASIC_PARAMETERS[ticker[0:2]]
+    rnd = random.Random(seed)
+    steps = REGIMES[regime](rnd)
+    times = array('d')
+    prices = array('d')
+    time = START_TIME
+    tick = round(START_PRICES.get(ticker[0:2], 100) / tick_price)
+    for i in range(length):
+        time += round(rnd.expovariate(1 / mean_interval), 3)
+        tick += next(steps)
+        times.append(time)
+        prices.append(round(tick * tick_price, price_precision))
+    return times, prices
+
+
+# Steps are in ticks, never 0
+
+def random_walk_steps(rnd):
+    while True:
+        yield rnd.choice((-1, 1)) * (2 if rnd.random() < 0.1 else 1)
+
+
+# Runs in one direction, with pullbacks, that reverse every few thousand ticks
+def trending_steps(rnd, up_probability=0.6, mean_run=3000):
+    direction = 1
+    while True:
+        if rnd.random() < 1 / mean_run:
+            direction = -direction
+        yield direction if rnd.random() < up_probability else -direction
+
+
+# Mean reverting inside a range of a few ticks around a center that slowly moves
+def choppy_steps(rnd, half_range=8, mean_shift=2000):
+    offset = 0
+    while True:
+        if rnd.random() < 1 / mean_shift:
+            offset = 0 # The range moves to the current price
+        up_probability = 0.5 - 0.4 * max(-1, min(1, offset / half_range))
+        step = 1 if rnd.random() < up_probability else -1
+        offset += step
+        yield step
+
+
+REGIMES = {
+    'random_walk': random_walk_steps,
+    'trending': trending_steps,
+    'choppy': choppy_steps
+}
@@ -3,6 +3,7 @@ HEIGHT = {'max': 1, 'mid': 0, 'min': -1}
 DENSITY_DIRECTION = {'in': 1, 'out': -1, 'out-in': -11, 'in-out': 11, 'out-edge': -12}
 DENSITY_DIRECTION_INV = {v: k for k, v in DENSITY_DIRECTION.items()}
 TREND_PATTERN = {'follow': 1, 'neutral': 0, 'reversal': -1}
+DIAGNOSTICS = {'off': 0, 'decisions': 1, 'full': 2}
 
 # Variables:
 args = None
@@ -16,5 +17,22 @@ CONF = {
 	'accepting_trade_number': 10,
 	'speeding_enabled': False,
 	'breaking_enabled': True,
-	'instant_market_fill': False
+	'instant_market_fill': False,
+	'fill_queue_touches': 1, # Load mode, trades at the price of a limit order before it fills, None to fill when traded through (see OrderBook)
+	'market_slippage_ticks': 1, # Load mode, ticks from the last price market orders fill at
+	'batch_replay': True, # Load mode, .ticks and .quotes files only, .json files are streamed (see utilities/json2ticks.py)
+	'async_datalog': True,
+	'datalog_format': 'text', # 'text' or 'events' (see utilities/events2text.py)
+	'diagnostics': 'full', # 'off', 'decisions' or 'full' (see DIAGNOSTICS)
+	'test_diagnostics': 'off',
+	'latency_stats': True,
+	'latency_report_interval': 300, # secs, live mode only
+	'allocation_profile': None, # ticks between tracemalloc snapshots, None to disable
+	'bounded_history': True, # Live mode only, keeps the ticks of the longest look back (see Monitor.history_duration)
+	'spill_history': True, # Evicted ticks go to a spill file, saved with the rest at the end (see Monitor.save_data)
+	'tick_dispatch': True, # Live mode, a worker thread per ticker processes its ticks (see TickDispatcher)
+	'dispatch_max_depth': 16, # waiting ticks of a ticker coalesced into one, None to process them all
+	'async_session': False, # Live mode, an asyncio loop processes the ticks and the housekeeping (see AsyncSession)
+	'record_quotes': True, # Live mode, bid, ask and last ticks are saved as a .quotes file (see lib/tick_files.py)
+	'results_export': None # 'csv' or 'columns' (see lib/columns.py) to export the results on close, None to disable
 }
\ No newline at end of file
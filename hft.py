@@ -5,6 +5,8 @@ import time
 import gvars
 from lib import util, core
 from ib.ib_hft import IBHft
+from ib.directory_replay import DirectoryReplay
+from ib.async_session import AsyncSession
 from lib.arg_parse import ArgParse
 
 # Main method
@@ -14,17 +16,22 @@ if __name__ == "__main__":
         if ".txt" in sys.argv[1]:
             # Live
             logging.basicConfig(filename='./log/hft_live.log', level=logging.INFO)
-            IBHft(tickers = util.read_symbol_list(sys.argv[1]))
+            if gvars.CONF['async_session']:
+                AsyncSession(util.read_symbol_list(sys.argv[1]), gvars.CONF['dispatch_max_depth']).run()
+            else:
+                IBHft(tickers = util.read_symbol_list(sys.argv[1]))
         else:
             # Load
+            logging.basicConfig(filename='./log/hft_load.log', level=logging.ERROR)
             if os.path.isdir(sys.argv[1]):
                 filenames = os.listdir(sys.argv[1])
                 filenames = [f"{sys.argv[1]}/{filename}" for filename in filenames]
+                # workers=N option, one process per file
+                directory_replay = DirectoryReplay(filenames, gvars.args.workers())
+                directory_replay.run()
+                print(directory_replay.summary_str())
             else:
-                filenames = [sys.argv[1]]
-            for filename in filenames:
-                logging.basicConfig(filename='./log/hft_load.log', level=logging.ERROR)
-                IBHft(input_file = filename)
+                IBHft(input_file = sys.argv[1])
     except:
         print("Reraising exceptions in main file.")
         raise
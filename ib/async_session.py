@@ -0,0 +1,200 @@
+import asyncio
+from collections import deque
+import logging
+import sys
+
+from models.params_db import ParamsDb
+
+# Live session run by an asyncio loop instead of threads.
+# The ibapi reader loop (EClient.run) still blocks on the socket, so it runs
+# in an executor thread. Its callbacks only append the ticks and order
+# statuses to the queue of each monitor, one coroutine per monitor processes
+# them (see MonitorQueue), and they take turns between ticks, so one process
+# can follow many tickers without a thread each.
+# Housekeeping runs as tasks of the same loop: TWS health checks, saving
+# ParamsDb and flushing the logs.
+class AsyncSession:
+    HEALTH_CHECK_INTERVAL = 120 # secs
+    PARAMS_SAVE_INTERVAL = 600
+    LOG_FLUSH_INTERVAL = 10
+
+    def __init__(self, tickers, max_depth=16, health_check_interval=HEALTH_CHECK_INTERVAL,
+            params_save_interval=PARAMS_SAVE_INTERVAL, log_flush_interval=LOG_FLUSH_INTERVAL):
+        self.tickers = tickers
+        self.max_depth = max_depth
+        self.health_check_interval = health_check_interval
+        self.params_save_interval = params_save_interval
+        self.log_flush_interval = log_flush_interval
+        self.app = None
+        self.loop = None
+        self.stopping = None # type: asyncio.Event
+        self.queues = {} # req_id -> MonitorQueue list, one per parent monitor
+        self.monitor_queues = {} # parent monitor -> MonitorQueue
+        self.tasks = []
+
+
+    def run(self):
+        asyncio.run(self.main())
+
+
+    async def main(self):
+        # Imported here so the module does not need ibapi (IBHft does)
+        from ib.ib_hft import IBHft
+
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        self.app = IBHft(tickers=self.tickers, session=self)
+        reader = self.loop.run_in_executor(None, self.app.run)
+        housekeeping = [
+            asyncio.create_task(self.periodically(self.health_check_interval, self.check_health)),
+            asyncio.create_task(self.periodically(self.params_save_interval, self.save_params)),
+            asyncio.create_task(self.periodically(self.log_flush_interval, self.flush_logs))
+        ]
+        try:
+            await asyncio.wait([reader, asyncio.create_task(self.stopping.wait())], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in housekeeping + self.tasks:
+                task.cancel()
+            await asyncio.gather(*housekeeping, *self.tasks, return_exceptions=True)
+            print(self.state_str())
+            self.app.clear_all() # Disconnects, so the reader returns
+            await reader
+
+
+    # Called by IBHft from the reader thread
+
+    def add_monitors(self, req_id, monitors):
+        self.queues[req_id] = [MonitorQueue(monitor, self.loop, self.max_depth) for monitor in monitors]
+        for monitor_queue in self.queues[req_id]:
+            self.monitor_queues[monitor_queue.monitor] = monitor_queue
+        self.loop.call_soon_threadsafe(self.start_queues, self.queues[req_id])
+
+
+    def push_tick(self, req_id, price, time, received):
+        for monitor_queue in self.queues[req_id]:
+            monitor_queue.push_tick(price, time, received)
+
+
+    def push_order(self, monitor, order_status):
+        monitor_queue = self.monitor_queues.get(monitor)
+        if monitor_queue is None:
+            # Simulated statuses of test orders, already in the loop
+            monitor.order_change(*order_status)
+        else:
+            monitor_queue.push_order(order_status)
+
+
+    # Loop
+
+    def start_queues(self, monitor_queues):
+        for monitor_queue in monitor_queues:
+            self.tasks.append(asyncio.create_task(monitor_queue.run()))
+
+
+    async def periodically(self, interval, function):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await function()
+            except Exception:
+                logging.exception(f"AsyncSession failed to run {function.__name__}")
+
+
+    async def check_health(self):
+        process = await asyncio.create_subprocess_exec("ps", "axu", stdout=asyncio.subprocess.PIPE)
+        output = (await process.communicate())[0].decode()
+        if not ("java" in output and "Jts" in output):
+            print("TWS/Gateway not running")
+            self.stopping.set()
+        elif not self.app.isConnected():
+            print("TWS/Gateway disconnected")
+            self.stopping.set()
+
+
+    async def save_params(self):
+        ParamsDb.gi().save()
+
+
+    async def flush_logs(self):
+        for monitor in self.monitor_queues:
+            monitor.flush_logs()
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+        sys.stdout.flush()
+
+
+    def state_str(self):
+        output = "  ASYNC SESSION:\n"
+        output += f"    {'ticker':<12} {'prm_id':>6} {'pushed':>9} {'delivered':>9} {'coalesced':>9} {'orders':>6} {'depth':>6} {'max depth':>9}\n"
+        for q in self.monitor_queues.values():
+            output += (
+                f"    {q.monitor.ticker:<12} {q.monitor.prm.id:>6} {q.pushed:>9} {q.delivered:>9} "
+                f"{q.coalesced:>9} {q.order_statuses:>6} {len(q.ticks):>6} {q.max_depth_seen:>9}\n"
+            )
+        return output
+
+
+# Ticks and order statuses of a parent monitor, pushed from the reader thread
+# and processed by its coroutine. Ticks waiting beyond max_depth are coalesced
+# as in TickQueue (see ib/tick_dispatch.py). Order statuses go first, so the
+# position knows about a fill before the next tick.
+class MonitorQueue:
+    def __init__(self, monitor, loop, max_depth):
+        self.monitor = monitor
+        self.loop = loop
+        self.max_depth = max_depth
+        self.ticks = deque()
+        self.orders = deque()
+        self.ready = asyncio.Event()
+        self.wakeup_pending = False # the reader scheduled ready.set, no need to schedule it again
+        self.pushed = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.order_statuses = 0
+        self.max_depth_seen = 0
+
+
+    def push_tick(self, price, time, received):
+        self.ticks.append((price, time, received))
+        self.pushed += 1
+        self.wake()
+
+
+    def push_order(self, order_status):
+        self.orders.append(order_status)
+        self.wake()
+
+
+    def wake(self):
+        if not self.wakeup_pending:
+            self.wakeup_pending = True
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+
+    async def run(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            self.wakeup_pending = False
+            while len(self.orders) > 0 or len(self.ticks) > 0:
+                try:
+                    while len(self.orders) > 0:
+                        self.monitor.order_change(*self.orders.popleft())
+                        self.order_statuses += 1
+                    if len(self.ticks) > 0:
+                        self.deliver_tick()
+                except Exception:
+                    logging.exception(f"MonitorQueue {self.monitor.ticker} failed to process a tick or order status")
+                await asyncio.sleep(0) # The other monitors run between ticks
+
+
+    def deliver_tick(self):
+        self.max_depth_seen = max(self.max_depth_seen, len(self.ticks))
+        price, time, received = self.ticks.popleft()
+        if self.max_depth is not None and len(self.ticks) >= self.max_depth:
+            stale = len(self.ticks)
+            for i in range(stale):
+                price, last_time, received = self.ticks.popleft()
+            self.coalesced += stale
+        self.delivered += 1
+        self.monitor.price_change(4, price, time, received)
@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import gvars
+from lib import util
+from models.params_db import ParamsDb
+from ib.params_sweep import init_worker
+
+# Replays many recorded tick files, one worker process per file at a time.
+# Workers only collect the accepted params, this process merges them into
+# ParamsDb in the order of the files and saves it once at the end.
+class DirectoryReplay:
+    def __init__(self, file_names, workers=None):
+        self.file_names = sorted(file_names)
+        self.workers = workers or os.cpu_count()
+        self.summaries = [] # one list of monitor summaries per file
+
+
+    def run(self):
+        with ProcessPoolExecutor(min(self.workers, len(self.file_names)), initializer=init_worker,
+                initargs=(gvars.args, gvars.CONF, gvars.TEMP_DIR)) as executor:
+            for file_name, (accepted, summaries) in zip(self.file_names, executor.map(replay_file, self.file_names)):
+                self.merge(accepted)
+                self.summaries.append(summaries)
+        ParamsDb.gi().save()
+        return self.summaries
+
+
+    # Acceptances of the same params in a file (by their key) update one entry,
+    # the first one adds it and the next ones add their results to it
+    def merge(self, accepted):
+        merged = {} # key -> Params
+        for key, attrs, last_result in accepted:
+            if key not in merged:
+                merged[key] = ParamsDb.create_params_from_attributes(attrs)
+            params = merged[key]
+            params.last_result = last_result
+            ParamsDb.gi().add_or_modify(params)
+
+
+    def summary_str(self):
+        output = "COMBINED RESULTS:\n"
+        totals = {}
+        for summaries in self.summaries:
+            for summary in summaries:
+                output += (
+                    f"  {summary['ticker']:<24} prm_id: {summary['prm_id']:>4}  "
+                    f"trades: {summary['total_trades']:>4}  "
+                    f"pnl: {summary['pnl']:>+10.2f}  average_pnl: {summary['average_pnl']:>+8.2f}\n"
+                )
+                total = totals.setdefault(summary['prm_id'], {'total_trades': 0, 'pnl': 0})
+                total['total_trades'] += summary['total_trades']
+                total['pnl'] += summary['pnl']
+        for prm_id, total in totals.items():
+            average_pnl = total['pnl'] / total['total_trades'] if total['total_trades'] > 0 else 0
+            output += (
+                f"  {'TOTAL':<24} prm_id: {prm_id:>4}  trades: {total['total_trades']:>4}  "
+                f"pnl: {total['pnl']:>+10.2f}  average_pnl: {average_pnl:>+8.2f}\n"
+            )
+        return output
+
+
+# Worker processes
+
+def replay_file(file_name):
+    # Imported here so the parent process does not need ibapi
+    from ib.ib_hft import IBHft
+
+    app = IBHft(input_file=file_name, collect_params=True)
+    # The same params can be accepted several times, each one with its result
+    keys = {} # id(params) -> key
+    accepted = []
+    for params, last_result in app.accepted_params:
+        key = keys.setdefault(id(params), len(keys))
+        accepted.append((key, ParamsDb.get_attributes_from_params(params), last_result))
+    summaries = []
+    for monitors in app.req_id_to_monitors_map.values():
+        for monitor in monitors:
+            summaries.append({
+                'ticker': util.file_from_path(file_name),
+                'prm_id': monitor.prm.id,
+                'total_trades': monitor.results.total_trades(),
+                'pnl': monitor.dollars(monitor.results.pnl()),
+                'average_pnl': monitor.dollars(monitor.results.average_pnl())
+            })
+    return accepted, summaries
@@ -4,8 +4,9 @@ sys.path.append('/home/bruno/ib_api/9_73/IBJts/source/pythonclient')
 from threading import Thread, Lock
 import logging
 import time
-import json
 import subprocess
+from itertools import repeat
+from functools import partial
 
 from ibapi.wrapper import EWrapper
 from ibapi.client import EClient
@@ -17,18 +18,30 @@ from lib import util, core
 import gvars
 from models.monitor import Monitor
 from models.params_db import ParamsDb
+from models.tick_batch import TickBatch
+from lib.tick_files import load_ticks, load_quotes, iter_quotes, is_quotes_file, LAST
+from ib.order_latencies import OrderLatencies
+from ib.order_registry import OrderRegistry
+from ib.order_book import OrderBook
+from ib.tick_dispatch import TickDispatcher
 
 
 class IBHft(EClient, EWrapper):
 
-    def __init__(self, tickers=[], input_file=""):
+    # params_list, tick_file and collect_params are only used by worker processes
+    # (ParamsSweep and DirectoryReplay), their parent process stores the params.
+    # A live session given runs the connection and clears it (see AsyncSession)
+    def __init__(self, tickers=[], input_file="", params_list=None, tick_file=None, collect_params=False, session=None):
         EClient.__init__(self, wrapper = self)
 
         self.tickers = tickers
+        self.params_list = params_list # Monitors are created for these params instead of params_ids
+        self.collect_params = collect_params
+        self.accepted_params = [] # (params, last_result) of each acceptance when collecting them, params can be accepted again
 
         # state variables
         self.req_id_to_monitors_map = {} # Only parent monitors
-        self.order_id_to_monitor_map = {} # Parent and children monitors
+        self.orders = OrderRegistry() # Orders of parent and children monitors
 
         # tws variables
         self.current_req_id = 0
@@ -41,18 +54,28 @@ class IBHft(EClient, EWrapper):
         # self.periodically_thread.start()
 
         # Used in load (not live) mode or test orders
-        self.active_order = {} # dict by monitor
+        self.order_books = {} # dict by ticker, resting limit orders
         self.remaining = {} # dict by monitor
         self.current_tick_time = {} # dict by tick
         self.current_tick_price = {} # dict by tick
 
+        # Tick to order and order status latencies of the monitors trading on their own ticker
+        self.order_latencies = OrderLatencies() if gvars.CONF['latency_stats'] else None
+
         self.live_mode = True if input_file == "" else False
+        self.session = session
+        # Live last ticks are processed by a worker thread per ticker instead of the reader thread
+        self.dispatcher = None
+        if self.live_mode and session is None and gvars.CONF['tick_dispatch']:
+            self.dispatcher = TickDispatcher(gvars.CONF['dispatch_max_depth'])
         try:
             if self.live_mode:
                 self.connect("127.0.0.1", 7497, 0)
-                self.run()
+                if session is None:
+                    self.run()
             else:
                 self.input_file = input_file
+                self.tick_file = tick_file or input_file
                 self.tickers = [util.file_from_path(input_file)]
                 self.nextValidId(0)
                 self.test_thread = Thread(target = self.connectAck)
@@ -62,7 +85,8 @@ class IBHft(EClient, EWrapper):
             print("Exceptions raised inside IBHft.__init__")
             raise
         finally:
-            self.clear_all()
+            if session is None:
+                self.clear_all()
 
 
     def connectAck(self):
@@ -70,12 +94,19 @@ class IBHft(EClient, EWrapper):
         # tickers = ["GCQ8"]
         for ticker in self.tickers:
             monitors = []
-            for prm_id in gvars.args.params_ids():
-                monitor = Monitor(ticker, self, prm_id)
-                monitor.create_children(gvars.args.test_instances())
-                monitors.append(monitor)
+            if self.params_list is not None:
+                monitors = [Monitor(ticker, self, None, params) for params in self.params_list]
+            else:
+                for prm_id in gvars.args.params_ids():
+                    monitor = Monitor(ticker, self, prm_id)
+                    monitor.create_children(gvars.args.test_instances())
+                    monitors.append(monitor)
             next_req_id = self.get_next_req_id()
             self.req_id_to_monitors_map[next_req_id] = monitors
+            if self.session is not None:
+                self.session.add_monitors(next_req_id, monitors)
+            elif self.dispatcher is not None:
+                self.dispatcher.add(next_req_id, ticker, partial(self.deliver_tick, monitors))
             self.request_market_data(next_req_id, ticker)
         print("Registered:")
         print([f"{req_id}: {monitors[0].ticker}" for req_id, monitors in self.req_id_to_monitors_map.items()])
@@ -84,43 +115,81 @@ class IBHft(EClient, EWrapper):
     def request_market_data(self, req_id, ticker):
         if self.live_mode:
             self.reqMktData(req_id, util.get_contract(ticker), "", False, False, [])
+        elif self.tick_file != self.input_file or (gvars.CONF['batch_replay'] and not self.tick_file.endswith(".json")):
+            self.replay_batch(req_id, ticker)
         else:
-            with open(self.input_file, "r") as f:
-                data = json.load(f)
+            self.replay_ticks(req_id, ticker, iter_quotes(self.input_file))
+
+
+    # Load mode replay where the price only columns are computed for the whole file
+    # at once and shared by all the monitors (see TickBatch). Only for binary
+    # files, which are mapped, a .json file would have to be parsed whole in memory.
+    def replay_batch(self, req_id, ticker):
+        monitors = self.req_id_to_monitors_map[req_id]
+        quotes = None
+        if is_quotes_file(self.tick_file):
+            quotes, last_ticks = load_quotes(self.tick_file)
+        else:
+            last_ticks = load_ticks(self.tick_file)
+        batch = TickBatch(*last_ticks, monitors[0].prm.tick_price)
+        for monitor in monitors:
+            monitor.set_tick_batch(batch)
+
+        if quotes is not None:
+            # The batch has the last trades, the quotes between them only go to the order book
+            self.replay_ticks(req_id, ticker, zip(*quotes))
+        else:
+            self.replay_ticks(req_id, ticker, zip(batch.raw_time, batch.raw_price, repeat(LAST)))
+
 
-            for time, price in data:
+    def replay_ticks(self, req_id, ticker, ticks):
+        for time, price, kind in ticks:
+            if kind == LAST:
                 self.current_tick_time[ticker] = time
                 self.current_tick_price[ticker] = price
-                self.tickPrice(self.current_req_id, 4, price, {})
+            self.tickPrice(req_id, kind, price, {})
 
 
     def tickPrice(self, reqId, tickType, price:float, attrib):
+        received = time.perf_counter_ns()
         # tickType:
         # bid price = 1
         # ask price = 2
         # last traded price = 4
         
-        if tickType != 4:
-            # For now this only makes sense with last price,
-            # maybe in the future one can work with other prices
+        if tickType not in (1, 2, 4):
             return
 
         monitors = self.req_id_to_monitors_map[reqId]
         if price <= 0:
-            logging.info(f"Returned 0 or under 0 price: '{price}', for ticker {monitor.ticker}")
+            logging.info(f"Returned 0 or under 0 price: '{price}', for ticker {monitors[0].ticker}")
             return
         if self.live_mode:
             time_ = time.time()
+            # Every tick is recorded as it comes (see Monitor.save_data), monitors only trade on the last price
+            for monitor in monitors:
+                monitor.record_tick(tickType, price, time_)
+            if tickType != 4:
+                return
             self.current_tick_price[monitors[0].ticker] = price
             self.current_tick_time[monitors[0].ticker] = time_
+            if self.session is not None:
+                self.session.push_tick(reqId, price, time_, received)
+            elif self.dispatcher is not None:
+                self.dispatcher.push(reqId, price, time_, received)
+            else:
+                self.deliver_tick(monitors, price, time_, received)
+        elif tickType == 4:
+            self.match_orders(monitors[0].ticker, price)
             for monitor in monitors:
-                monitor.price_change(tickType, price, time_)
+                monitor.price_change(tickType, price, self.current_tick_time[monitor.ticker], received)
         else:
-            for monitor in monitors:
-                self.process_order(monitor, price)
-                for child_monitor in monitor.child_test_monitors:
-                    self.process_order(child_monitor, price)
-                monitor.price_change(tickType, price, self.current_tick_time[monitor.ticker])
+            self.match_quote(monitors[0], tickType, price)
+
+
+    def deliver_tick(self, monitors, price, time_, received):
+        for monitor in monitors:
+            monitor.price_change(4, price, time_, received)
 
 
     # callback to client.reqIds(-1)
@@ -156,21 +225,25 @@ class IBHft(EClient, EWrapper):
 
             if order_id is None:
                 order_id = self.get_next_order_id()
-                assert monitor not in self.order_id_to_monitor_map.values()
-                self.order_id_to_monitor_map[order_id] = monitor
+                self.orders.add(order_id, monitor)
+            monitor.log_event('order', (order_id, action, quantity, price, monitor.last_time()))
+            if self.order_latencies is not None and not monitor.test:
+                self.order_latencies.order_sent(order_id, monitor.ticker, monitor.tick_received, time.perf_counter_ns())
 
             if not self.live_mode or test:
                 self.orderStatus(order_id, "Submitted", 1, self.remaining.get(monitor, 0), 0, 0, 0, 0, 0, "")
-                self.transmit_order(monitor, order)
+                self.transmit_order(monitor, order_id, order)
             else:
                 self.placeOrder(order_id, util.get_contract(monitor.ticker), order)
 
 
     def cancel_order(self, order_id, test=False):
         if not self.live_mode or test:
-            monitor = self.order_id_to_monitor_map[order_id]
+            monitor = self.orders.monitor(order_id)
+            if monitor is None:
+                return # Already filled or cancelled
             self.orderStatus(order_id, "Cancelled", 1, self.remaining.get(monitor, 0), 0, 0, 0, 0, 0, "")
-            self.active_order[monitor] = None
+            self.order_book(monitor).cancel(monitor)
         else:
             self.cancelOrder(order_id)
 
@@ -179,20 +252,36 @@ class IBHft(EClient, EWrapper):
                     remaining, avgFillPrice, permId,
                     parentId, lastFillPrice, clientId,
                     whyHeld):
+        received = time.perf_counter_ns()
         super().orderStatus(orderId, status, filled, remaining, avgFillPrice, permId, parentId, 
             lastFillPrice, clientId, whyHeld)
 
-        monitor = self.order_id_to_monitor_map[orderId]
+        monitor = self.orders.monitor(orderId)
         if monitor is None:
+            return # Not placed in this session or already finished (final statuses can come twice)
+        if self.order_latencies is not None and not monitor.test:
+            self.order_latencies.status_received(orderId, status, received)
+        else:
+            received = None
+        if self.dispatcher is not None:
+            # Handled by the worker of the ticker, like its ticks
+            self.dispatcher.push_order(monitor.ticker,
+                partial(self.deliver_order_status, monitor, orderId, status, remaining, lastFillPrice, time.time(), received))
             return
-        if status == "Filled" or status == "Cancelled":
-            # Check why it is called twice ...
-            # self.order_id_to_monitor_map.pop(orderId)
-            self.order_id_to_monitor_map[orderId] = None
-        if self.live_mode:
-            monitor.order_change(orderId, status, remaining, lastFillPrice, time.time())
+        self.orders.status(orderId, status)
+        if self.session is not None:
+            self.session.push_order(monitor, (orderId, status, remaining, lastFillPrice, time.time(), received))
+        elif self.live_mode:
+            monitor.order_change(orderId, status, remaining, lastFillPrice, time.time(), received)
         else:
-            monitor.order_change(orderId, status, remaining, lastFillPrice, self.current_tick_time[monitor.ticker])
+            monitor.order_change(orderId, status, remaining, lastFillPrice, self.current_tick_time[monitor.ticker], received)
+
+
+    def deliver_order_status(self, monitor, order_id, status, remaining, fill_price, fill_time, received):
+        if self.orders.monitor(order_id) is None:
+            return # Final status queued twice
+        self.orders.status(order_id, status)
+        monitor.order_change(order_id, status, remaining, fill_price, fill_time, received)
 
 
     # Overwritten to avoid cluttering log
@@ -212,48 +301,53 @@ class IBHft(EClient, EWrapper):
     
     # ++++++++++++++ PRIVATE +++++++++++++++++++
 
-    def process_order(self, monitor, price):
-        if self.active_order.get(monitor) is None:
+    def match_orders(self, ticker, price):
+        order_book = self.order_books.get(ticker)
+        if order_book is None or len(order_book) == 0:
             return
-        if self.active_order[monitor].action == "BUY":
-            if price <= self.active_order[monitor].lmtPrice:
-                self.remaining[monitor] = self.remaining.get(monitor, 0) + self.active_order[monitor].totalQuantity
-                self.orderStatus(self.monitor_to_order_id_map(monitor), "Filled", 1, self.remaining[monitor],
-                    self.active_order[monitor].lmtPrice, 0, 0, self.active_order[monitor].lmtPrice, 0, "")
-                self.active_order[monitor] = None
-        elif self.active_order[monitor].action == "SELL":
-            if price >= self.active_order[monitor].lmtPrice:
-                self.remaining[monitor] = self.remaining.get(monitor, 0) - self.active_order[monitor].totalQuantity
-                self.orderStatus(self.monitor_to_order_id_map(monitor), "Filled", 1, self.remaining[monitor],
-                    self.active_order[monitor].lmtPrice, 0, 0, self.active_order[monitor].lmtPrice, 0, "")
-                self.active_order[monitor] = None
-
-
-    def transmit_order(self, monitor, order):
-        if ((order.orderType == "MKT") or 
-                (order.orderType == "LMT" and order.lmtPrice == self.current_tick_price[monitor.ticker] and gvars.CONF['instant_market_fill'])):
-            spread = 1 if order.orderType == "MKT" else 0
-            if order.action == "BUY":
-                self.remaining[monitor] = self.remaining.get(monitor, 0) + order.totalQuantity
-                self.orderStatus(self.monitor_to_order_id_map(monitor), "Filled", 1, self.remaining[monitor],
-                    monitor.price_plus_ticks(+spread, price=self.current_tick_price[monitor.ticker]), 0, 0,
-                    monitor.price_plus_ticks(+spread, price=self.current_tick_price[monitor.ticker]), 0, "")
-                self.active_order[monitor] = None
-            elif order.action == "SELL":
-                self.remaining[monitor] = self.remaining.get(monitor, 0) - order.totalQuantity
-                self.orderStatus(self.monitor_to_order_id_map(monitor), "Filled", 1, self.remaining[monitor],
-                    monitor.price_plus_ticks(-spread, price=self.current_tick_price[monitor.ticker]), 0, 0,
-                    monitor.price_plus_ticks(-spread, price=self.current_tick_price[monitor.ticker]), 0, "")
-                self.active_order[monitor] = None
+        for order, fill_price in order_book.match(price):
+            self.fill_order(order.monitor, order.order_id, order.action, order.quantity, fill_price)
+
+
+    def match_quote(self, monitor, tick_type, price):
+        for order, fill_price in self.order_book(monitor).quote(tick_type, price):
+            self.fill_order(order.monitor, order.order_id, order.action, order.quantity, fill_price)
+
+
+    def transmit_order(self, monitor, order_id, order):
+        order_book = self.order_book(monitor)
+        current_price = self.current_tick_price[monitor.ticker]
+        if order.orderType == "MKT":
+            fill_price = order_book.market_price(order.action, current_price, monitor.prm.price_precision)
         else:
+            fill_price = order_book.marketable_price(order.action, order.lmtPrice)
+            if fill_price is None and order.lmtPrice == current_price and gvars.CONF['instant_market_fill']:
+                fill_price = order.lmtPrice
+        if fill_price is None:
             # Order is lmt, so just assigning for later execution
-            self.active_order[monitor] = order
+            order_book.add(monitor, order_id, order.action, order.totalQuantity, order.lmtPrice)
+        else:
+            order_book.cancel(monitor)
+            self.fill_order(monitor, order_id, order.action, order.totalQuantity, fill_price)
 
 
-    def monitor_to_order_id_map(self, monitor):
-        for order_id, dmonitor in self.order_id_to_monitor_map.items():
-            if monitor == dmonitor:
-                return order_id
+    def fill_order(self, monitor, order_id, action, quantity, fill_price):
+        self.remaining[monitor] = self.remaining.get(monitor, 0) + (quantity if action == "BUY" else -quantity)
+        self.orderStatus(order_id, "Filled", 1, self.remaining[monitor], fill_price, 0, 0, fill_price, 0, "")
+
+
+    def order_book(self, monitor):
+        if monitor.ticker not in self.order_books:
+            self.order_books[monitor.ticker] = OrderBook(monitor.prm.tick_price,
+                gvars.CONF['fill_queue_touches'], gvars.CONF['market_slippage_ticks'])
+        return self.order_books[monitor.ticker]
+
+
+    def store_params(self, params):
+        if not self.collect_params:
+            ParamsDb.gi().add_or_modify(params)
+        else:
+            self.accepted_params.append((params, params.last_result))
 
 
     def keyboardInterrupt(self):
@@ -268,18 +362,32 @@ class IBHft(EClient, EWrapper):
         setattr(self, 'called_clear_all', True)
 
         print("\nClearing all...")
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+            print(self.dispatcher.state_str())
         for req_id, monitors in self.req_id_to_monitors_map.items():
             if self.live_mode and self.isConnected():
                 self.cancelMktData(req_id)
                 time.sleep(0.25)
             for monitor in monitors:
                 monitor.close()
-        ParamsDb.gi().save()
+            if self.order_latencies is not None and len(monitors) > 0 and not monitors[0].test:
+                self.save_order_latencies(monitors[0])
+        if not self.collect_params:
+            ParamsDb.gi().save()
         if self.live_mode and self.isConnected():
             self.disconnect()
         print("Finished clearing.")
 
 
+    def save_order_latencies(self, monitor):
+        summary = self.order_latencies.summary_str(monitor.ticker)
+        print(summary)
+        with open(f"{monitor.create_and_return_output_dir()}/{monitor.ticker}_order_latencies.log", "w") as f:
+            f.write(summary)
+            f.write(self.order_latencies.orders_str(monitor.ticker))
+
+
     def periodically(self):
         while True:
             time.sleep(120)
@@ -5,7 +5,6 @@ from threading import Thread
 import logging
 import time
 from datetime import datetime
-import json
 
 from ibapi.wrapper import EWrapper
 from ibapi.client import EClient
@@ -13,10 +12,17 @@ from ibapi.contract import *
 from ibapi.common import *
 
 from lib import util
+from lib.tick_files import save_ticks, save_quotes, BID, ASK, LAST
+from models.params import BASIC_PARAMETERS
 
 
+# Downloads the last 30 minutes of a ticker, as 1 second bars saved as a .ticks
+# file or, with quotes, as the historical bid/ask and trade ticks saved as a
+# .quotes file (see lib/tick_files.py).
 class IBTestData(EClient, EWrapper):
-    def __init__(self, ticker):
+    TICKS_PER_REQUEST = 1000 # most reqHistoricalTicks returns
+
+    def __init__(self, ticker, quotes=False):
         EClient.__init__(self, wrapper = self)
 
         # variables
@@ -27,9 +33,16 @@ class IBTestData(EClient, EWrapper):
         self.api_ready = False
 
         self.ticker = ticker
+        self.bar_size = "1 secs" # "1 secs" # "1 min" # "1 hour"
 
         self.test_data = []
 
+        self.quotes = quotes
+        self.req_id_to_what_to_show = {}
+        self.tick_streams = {"TRADES": [], "BID_ASK": []} # (time, price, kind) records
+        self.ticks_start = None # type: int
+        self.ticks_end = None # type: int
+
         self.connect("127.0.0.1", 7496, 3)
         self.run()
         self.wait_for_api_ready()
@@ -38,7 +51,10 @@ class IBTestData(EClient, EWrapper):
     def connectAck(self):
         """ callback signifying completion of successful connection """
 
-        self.request_historical_data(self.ticker)
+        if self.quotes:
+            self.request_historical_ticks(self.ticker)
+        else:
+            self.request_historical_data(self.ticker)
 
 
     def request_historical_data(self, ticker):
@@ -51,7 +67,7 @@ class IBTestData(EClient, EWrapper):
 
         # Setting query variables
         duration_string = "1800 S"
-        bar_size = "1 secs" # "1 secs" # "1 min" # "1 hour"
+        bar_size = self.bar_size
         what_to_show = "MIDPOINT"
         
         # Class level mappings
@@ -93,15 +109,84 @@ class IBTestData(EClient, EWrapper):
         print(f"Cleaned to {len(self.test_data)} data points")
 
         print("Saving...")
-        file_name = f"./data/{self.ticker}_{bar_size.replace(" ", "|")_{time.strftime('%Y-%m-%d|%H-%M')}}.json"
-        with open(file_name, "w") as f:
-            json.dump(self.test_data, f)
+        file_name = f"./data/{self.ticker}_{self.bar_size.replace(' ', '|')}_{time.strftime('%Y-%m-%d|%H-%M')}.ticks"
+        tick_price, price_precision, dollar_multiplier = BASIC_PARAMETERS.get(self.ticker[0:2], (None, 0, None))
+        save_ticks(file_name, [date for date, close in self.test_data], [close for date, close in self.test_data],
+            self.ticker, tick_price, price_precision)
         
         print("Disconnecting...")
         self.disconnect()
 
 
 
+    # Historical ticks come in pages, each one requested from the second of the
+    # last tick of the previous page until the end of the session is reached
+    def request_historical_ticks(self, ticker):
+        self.ticks_end = int(time.time())
+        self.ticks_start = self.ticks_end - 1800
+        for what_to_show in self.tick_streams:
+            self.request_ticks_page(ticker, what_to_show, self.ticks_start)
+        print("Requesting historical ticks")
+
+
+    def request_ticks_page(self, ticker, what_to_show, start):
+        next_req_id = self.get_next_req_id()
+        self.req_id_to_stock_ticker_map[next_req_id] = ticker
+        self.req_id_to_what_to_show[next_req_id] = what_to_show
+        start_string = time.strftime('%Y%m%d %H:%M:%S', time.localtime(start))
+        self.reqHistoricalTicks(next_req_id, util.get_contract(ticker), start_string, "", self.TICKS_PER_REQUEST, what_to_show, 0, True, [])
+
+
+    def historicalTicksLast(self, reqId:int, ticks:ListOfHistoricalTickLast, done:bool):
+        self.ticks_page(reqId, [tick.time for tick in ticks], [(tick.time, tick.price, LAST) for tick in ticks])
+
+
+    def historicalTicksBidAsk(self, reqId:int, ticks:ListOfHistoricalTickBidAsk, done:bool):
+        records = []
+        bid = ask = None
+        # Only the side that changed is kept, as live quotes come
+        for tick in ticks:
+            if tick.priceBid != bid:
+                bid = tick.priceBid
+                records.append((tick.time, bid, BID))
+            if tick.priceAsk != ask:
+                ask = tick.priceAsk
+                records.append((tick.time, ask, ASK))
+        self.ticks_page(reqId, [tick.time for tick in ticks], records)
+
+
+    def ticks_page(self, req_id, times, records):
+        ticker = self.req_id_to_stock_ticker_map.pop(req_id, None)
+        what_to_show = self.req_id_to_what_to_show.pop(req_id)
+        stream = self.tick_streams[what_to_show]
+        if len(times) > 0:
+            # The page starts with the ticks of the second the previous one ended on
+            while len(stream) > 0 and stream[-1][0] >= times[0]:
+                stream.pop()
+            stream.extend(record for record in records if record[0] < self.ticks_end)
+        if len(times) == self.TICKS_PER_REQUEST and times[-1] < self.ticks_end:
+            # A second with a whole page of ticks would be requested forever
+            self.request_ticks_page(ticker, what_to_show, times[-1] if times[0] < times[-1] else times[-1] + 1)
+        elif len(self.req_id_to_what_to_show) == 0:
+            self.save_historical_ticks()
+
+
+    def save_historical_ticks(self):
+        print("Historical ticks fetched")
+        # Sorting is stable, quotes go before the trades of the same second
+        records = sorted(self.tick_streams["BID_ASK"] + self.tick_streams["TRADES"], key=lambda record: record[0])
+        print(f"Got {len(self.tick_streams['TRADES'])} trades and {len(self.tick_streams['BID_ASK'])} quotes")
+
+        print("Saving...")
+        file_name = f"./data/{self.ticker}_ticks_{time.strftime('%Y-%m-%d|%H-%M')}.quotes"
+        tick_price, price_precision, dollar_multiplier = BASIC_PARAMETERS.get(self.ticker[0:2], (None, 0, None))
+        save_quotes(file_name, [record[0] for record in records], [record[1] for record in records],
+            [record[2] for record in records], self.ticker, tick_price, price_precision)
+
+        print("Disconnecting...")
+        self.disconnect()
+
+
     # Async
 
     def wait_for_async_request(self):
@@ -0,0 +1,164 @@
+from bisect import bisect_left, insort
+
+from lib.tick_files import BID
+
+# Resting limit orders of the test monitors of a ticker in load mode, by price
+# level. Each tick only walks the levels it reaches, so the cost of a tick
+# grows with the fills and not with the number of monitors.
+# Levels are tick indexes (price / tick price), each one a dict by monitor in
+# the order the orders arrived (a monitor has at most one resting order).
+#
+# queue_touches models the position in the queue of the level: a resting order
+# fills on the queue_touches-th trade at its price (1 fills when the price
+# touches it), or with None only when the price trades through it.
+# Market orders fill market_slippage_ticks away from the last price.
+#
+# Replays of quotes files also give the top of book: market orders then fill
+# at the ask or the bid, limit orders that cross it when they arrive fill at
+# once, and resting ones fill at their price when the other side reaches them.
+class OrderBook:
+    def __init__(self, tick_price, queue_touches=1, market_slippage_ticks=1):
+        self.tick_price = tick_price
+        self.queue_touches = queue_touches
+        self.market_slippage_ticks = market_slippage_ticks
+        self.buy_levels = {} # tick -> {monitor: RestingOrder}
+        self.sell_levels = {}
+        self.buy_ticks = [] # sorted, the best (highest) last
+        self.sell_ticks = [] # negated and sorted, the best (lowest) last
+        self.orders = {} # monitor -> RestingOrder
+        self.bid = None # type: float # None until the replay has quotes
+        self.ask = None # type: float
+
+
+    def add(self, monitor, order_id, action, quantity, price):
+        self.cancel(monitor) # Modified orders go back to the end of the queue
+        order = RestingOrder(monitor, order_id, action, quantity, price, self.tick(price))
+        levels, ticks = self.side(action)
+        level = levels.get(order.tick)
+        if level is None:
+            level = levels[order.tick] = {}
+            # Both lists keep the best level at the end
+            insort(ticks, order.tick if action == "BUY" else -order.tick)
+        level[monitor] = order
+        self.orders[monitor] = order
+
+
+    def cancel(self, monitor):
+        order = self.orders.pop(monitor, None)
+        if order is None:
+            return None
+        levels, ticks = self.side(order.action)
+        level = levels[order.tick]
+        del level[monitor]
+        if len(level) == 0:
+            self.remove_level(order.action, order.tick)
+        return order
+
+
+    # Orders filled by a trade at price, as (order, fill price)
+    def match(self, price):
+        tick = self.tick(price)
+        fills = []
+        # Buys at or above the price, then sells at or below it
+        for action, sign in (("BUY", 1), ("SELL", -1)):
+            levels, ticks = self.side(action)
+            while len(ticks) > 0 and ticks[-1] > sign * tick:
+                self.fill_level(action, sign * ticks[-1], fills)
+            if len(ticks) > 0 and ticks[-1] == sign * tick:
+                level = levels[tick]
+                self.match_touched(level, fills)
+                if len(level) == 0:
+                    self.remove_level(action, tick)
+        return fills
+
+
+    # Orders filled by a new bid (sells at or below it) or ask (buys at or above it)
+    def quote(self, kind, price):
+        if kind == BID:
+            self.bid = price
+            action, sign = "SELL", -1
+        else:
+            self.ask = price
+            action, sign = "BUY", 1
+        tick = self.tick(price)
+        fills = []
+        levels, ticks = self.side(action)
+        while len(ticks) > 0 and ticks[-1] >= sign * tick:
+            self.fill_level(action, sign * ticks[-1], fills)
+        return fills
+
+
+    def fill_level(self, action, tick, fills):
+        levels, ticks = self.side(action)
+        for order in levels[tick].values():
+            fills.append((order, order.price))
+            del self.orders[order.monitor]
+        self.remove_level(action, tick)
+
+
+    def match_touched(self, level, fills):
+        if self.queue_touches is None:
+            return
+        for monitor, order in list(level.items()):
+            order.touches += 1
+            if order.touches >= self.queue_touches:
+                fills.append((order, order.price))
+                del level[monitor]
+                del self.orders[monitor]
+
+
+    def market_price(self, action, last_price, price_precision):
+        quote = self.ask if action == "BUY" else self.bid
+        if quote is not None:
+            return quote
+        direction = 1 if action == "BUY" else -1
+        return round(last_price + direction * self.market_slippage_ticks * self.tick_price, price_precision)
+
+
+    # Price a limit order crossing the top of book fills at, None if it rests
+    def marketable_price(self, action, price):
+        if action == "BUY":
+            if self.ask is not None and self.tick(self.ask) <= self.tick(price):
+                return self.ask
+        elif self.bid is not None and self.tick(self.bid) >= self.tick(price):
+            return self.bid
+        return None
+
+
+    def order(self, monitor):
+        return self.orders.get(monitor)
+
+
+    def tick(self, price):
+        return round(price / self.tick_price)
+
+
+    def side(self, action):
+        return (self.buy_levels, self.buy_ticks) if action == "BUY" else (self.sell_levels, self.sell_ticks)
+
+
+    def remove_level(self, action, tick):
+        levels, ticks = self.side(action)
+        del levels[tick]
+        key = tick if action == "BUY" else -tick
+        if ticks[-1] == key:
+            ticks.pop()
+        else:
+            del ticks[bisect_left(ticks, key)]
+
+
+    def __len__(self):
+        return len(self.orders)
+
+
+class RestingOrder:
+    __slots__ = ('monitor', 'order_id', 'action', 'quantity', 'price', 'tick', 'touches')
+
+    def __init__(self, monitor, order_id, action, quantity, price, tick):
+        self.monitor = monitor
+        self.order_id = order_id
+        self.action = action
+        self.quantity = quantity
+        self.price = price
+        self.tick = tick
+        self.touches = 0
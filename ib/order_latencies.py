@@ -0,0 +1,79 @@
+from lib.histogram import Histogram
+
+# Latencies between a tick, the order it triggers and the statuses of the order.
+# Times are time.perf_counter_ns() values: the tick is stamped when IBHft
+# receives it, the order when IBHft.place_order sends it and every status
+# when IBHft.orderStatus receives it.
+class OrderLatencies:
+    PERCENTILES = (50, 90, 99, 99.9)
+
+    def __init__(self):
+        self.histograms = {} # (ticker, measure) -> Histogram of nanoseconds
+        self.orders = {} # order_id -> OrderTrace
+
+
+    def order_sent(self, order_id, ticker, tick_received, sent):
+        self.record(ticker, 'tick_to_order', sent - tick_received)
+        trace = self.orders.get(order_id)
+        if trace is None:
+            trace = self.orders[order_id] = OrderTrace(ticker)
+        trace.sends.append((tick_received, sent))
+
+
+    def status_received(self, order_id, status, received):
+        trace = self.orders.get(order_id)
+        if trace is None:
+            return # Not sent in this session, or by a test monitor
+        round_trip = received - trace.sends[-1][1]
+        if len(trace.statuses) == 0 or trace.statuses[-1][2] != len(trace.sends):
+            self.record(trace.ticker, 'order_round_trip', round_trip)
+        trace.statuses.append((status, round_trip, len(trace.sends)))
+
+
+    # From IBHft.orderStatus until Position.order_change gets the status
+    def status_delivered(self, ticker, received, delivered):
+        self.record(ticker, 'status_to_order_change', delivered - received)
+
+
+    def record(self, ticker, measure, nanoseconds):
+        histogram = self.histograms.get((ticker, measure))
+        if histogram is None:
+            histogram = self.histograms[(ticker, measure)] = Histogram()
+        histogram.record(nanoseconds)
+
+
+    def summary_str(self, ticker):
+        output = f"ORDER LATENCIES {ticker} (us):\n"
+        output += f"  {'measure':<24} {'count':>6}" + "".join(f" {'p' + str(p):>9}" for p in self.PERCENTILES) + f" {'max':>9}\n"
+        for (histogram_ticker, measure), histogram in self.histograms.items():
+            if histogram_ticker != ticker:
+                continue
+            output += (
+                f"  {measure:<24} {histogram.total:>6}"
+                + "".join(f" {histogram.percentile(p) / 1000:>9.1f}" for p in self.PERCENTILES)
+                + f" {histogram.max / 1000:>9.1f}\n"
+            )
+        return output
+
+
+    def orders_str(self, ticker):
+        output = f"ORDERS {ticker} (us since the tick / since the order was sent):\n"
+        for order_id, trace in self.orders.items():
+            if trace.ticker != ticker:
+                continue
+            output += f"  {order_id:>6}:"
+            for tick_received, sent in trace.sends:
+                output += f" sent {(sent - tick_received) / 1000:.1f}"
+            for status, round_trip, sends in trace.statuses:
+                output += f", {status} {round_trip / 1000:.1f}"
+            output += "\n"
+        return output
+
+
+class OrderTrace:
+    __slots__ = ('ticker', 'sends', 'statuses')
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.sends = [] # (tick received, sent), orders can be modified and sent again
+        self.statuses = [] # (status, time since the last send, number of sends)
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+# Orders placed by the monitors, indexed both ways.
+# Live orders are the ones that can still get a status: a monitor has at most
+# one, looked up by order id (statuses) or by monitor (simulated fills).
+# Once Filled or Cancelled an order moves to the history, which only keeps the
+# last HISTORY_SIZE orders, enough to recognize the repeated final statuses
+# IB sometimes sends.
+class OrderRegistry:
+    HISTORY_SIZE = 10000
+    FINAL_STATUSES = ("Filled", "Cancelled")
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.history_size = history_size
+        self._monitors = {} # live order_id -> monitor
+        self._order_ids = {} # monitor -> live order_id
+        self._history = OrderedDict() # order_id -> final status, oldest first
+
+
+    def add(self, order_id, monitor):
+        assert monitor not in self._order_ids
+        self._monitors[order_id] = monitor
+        self._order_ids[monitor] = order_id
+
+
+    # None for finished or unknown orders
+    def monitor(self, order_id):
+        return self._monitors.get(order_id)
+
+
+    def order_id(self, monitor):
+        return self._order_ids.get(monitor)
+
+
+    def status(self, order_id, status):
+        if status not in self.FINAL_STATUSES:
+            return
+        monitor = self._monitors.pop(order_id, None)
+        if monitor is None:
+            return
+        del self._order_ids[monitor]
+        self._history[order_id] = status
+        if len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+
+
+    def final_status(self, order_id):
+        return self._history.get(order_id)
+
+
+    def __len__(self):
+        return len(self._monitors)
@@ -0,0 +1,77 @@
+import os
+import math
+import random
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+import gvars
+from lib import util
+from lib.tick_files import load_ticks, save_ticks, is_quotes_file
+from models.params_db import ParamsDb
+
+# Replays one tick file for many parameter sets in parallel processes.
+# The ticks are loaded once and saved as a binary tick file that every worker
+# maps (quotes files are mapped as they are), each worker replays them with a
+# shard of the parameter sets as test monitors and this process merges the
+# accepted ones into ParamsDb.
+class ParamsSweep:
+    def __init__(self, input_file, params_list, workers=None, shard_size=None):
+        self.input_file = input_file
+        self.params_list = params_list
+        self.workers = workers or os.cpu_count()
+        # Several shards per worker, so a slow shard does not leave the others idle
+        self.shard_size = shard_size or max(1, math.ceil(len(params_list) / (self.workers * 4)))
+        self.summaries = [] # (params, accepted), params.last_result has the results
+
+
+    def run(self):
+        if is_quotes_file(self.input_file):
+            tick_file = self.input_file
+        else:
+            tick_file = f"{gvars.TEMP_DIR}/{util.file_from_path(self.input_file)}.{os.getpid()}.ticks"
+            save_ticks(tick_file, *load_ticks(self.input_file))
+        try:
+            shards = [self.params_list[i:i + self.shard_size] for i in range(0, len(self.params_list), self.shard_size)]
+            attributes = [[ParamsDb.get_attributes_from_params(params) for params in shard] for shard in shards]
+            with ProcessPoolExecutor(self.workers, initializer=init_worker,
+                    initargs=(gvars.args, gvars.CONF, gvars.TEMP_DIR)) as executor:
+                for shard, results in zip(shards, executor.map(replay_shard, repeat(self.input_file), repeat(tick_file), attributes)):
+                    self.merge(shard, results)
+        finally:
+            if tick_file != self.input_file:
+                os.remove(tick_file)
+        ParamsDb.gi().save()
+        self.sort_summaries()
+        return self.summaries
+
+
+    # Best average pnl first, params without a result (no trades or changed dynamically) last
+    def sort_summaries(self):
+        self.summaries.sort(key=lambda summary: (summary[0].last_result or {}).get('average_pnl', float('-inf')), reverse=True)
+
+
+    def merge(self, shard, results):
+        for params, (last_result, accepted) in zip(shard, results):
+            params.last_result = last_result
+            if accepted:
+                ParamsDb.gi().add_or_modify(params)
+            self.summaries.append((params, accepted))
+
+
+# Worker processes
+
+def init_worker(args, conf, temp_dir):
+    random.seed() # Forked workers would otherwise share the random params of the children
+    gvars.args = args
+    gvars.CONF.update(conf)
+    gvars.TEMP_DIR = temp_dir
+
+
+def replay_shard(input_file, tick_file, attributes):
+    # Imported here so the parent process does not need ibapi to build the params
+    from ib.ib_hft import IBHft
+
+    params_list = [ParamsDb.create_params_from_attributes(attrs) for attrs in attributes]
+    app = IBHft(input_file=input_file, params_list=params_list, tick_file=tick_file, collect_params=True)
+    accepted = set(id(params) for params, last_result in app.accepted_params)
+    return [(params.last_result, id(params) in accepted) for params in params_list]
@@ -0,0 +1,123 @@
+from collections import deque
+from threading import Thread, Event, current_thread
+import logging
+
+# Live last ticks go from the ibapi reader thread to one worker thread per
+# ticker, so a slow ticker does not hold the socket or the other tickers.
+# The reader only appends to the ticker's deque (atomic, no lock is taken) and
+# wakes its worker. When the worker finds more than max_depth ticks waiting it
+# has fallen behind: they are coalesced into one tick with the last price and
+# the time of the oldest, so its duration is the sum of theirs.
+# Order statuses of a ticker go through its queue too, ahead of the waiting
+# ticks, so its monitors are only ever changed by its worker.
+class TickDispatcher:
+    def __init__(self, max_depth=16):
+        self.max_depth = max_depth
+        self.queues = {} # by req_id
+        self.ticker_queues = {} # by ticker
+
+
+    def add(self, req_id, ticker, deliver):
+        self.queues[req_id] = self.ticker_queues[ticker] = TickQueue(ticker, deliver, self.max_depth)
+
+
+    def push(self, req_id, price, time, received):
+        self.queues[req_id].push(price, time, received)
+
+
+    # deliver is called without arguments by the worker of the ticker
+    def push_order(self, ticker, deliver):
+        tick_queue = self.ticker_queues[ticker]
+        if current_thread() is tick_queue.thread:
+            deliver() # Simulated statuses of test orders, placed while processing a tick
+        else:
+            tick_queue.push_order(deliver)
+
+
+    def stop(self):
+        for tick_queue in self.queues.values():
+            tick_queue.stop()
+
+
+    def state_str(self):
+        output = "  TICK DISPATCH:\n"
+        output += f"    {'ticker':<12} {'pushed':>9} {'delivered':>9} {'coalesced':>9} {'orders':>6} {'depth':>6} {'max depth':>9}\n"
+        for tick_queue in self.queues.values():
+            output += (
+                f"    {tick_queue.ticker:<12} {tick_queue.pushed:>9} {tick_queue.delivered:>9} "
+                f"{tick_queue.coalesced:>9} {tick_queue.order_statuses:>6} {tick_queue.depth():>6} {tick_queue.max_depth_seen:>9}\n"
+            )
+        return output
+
+
+# Single producer (the reader thread), single consumer (its worker)
+class TickQueue:
+    def __init__(self, ticker, deliver, max_depth):
+        self.ticker = ticker
+        self.deliver = deliver # called with (price, time, received) in the worker
+        self.max_depth = max_depth
+        self.ticks = deque()
+        self.orders = deque() # order status deliveries, before the next tick
+        self.ready = Event()
+        self.stopped = False
+        # Counters, only written by one thread each
+        self.pushed = 0 # reader
+        self.delivered = 0 # worker
+        self.coalesced = 0 # worker, ticks merged into the one delivered
+        self.max_depth_seen = 0 # worker
+        self.order_statuses = 0 # worker
+        self.thread = Thread(target=self.run, name=f"TickQueue {ticker}", daemon=True)
+        self.thread.start()
+
+
+    def push(self, price, time, received):
+        self.ticks.append((price, time, received))
+        self.pushed += 1
+        self.ready.set()
+
+
+    def push_order(self, deliver):
+        self.orders.append(deliver)
+        self.ready.set()
+
+
+    def depth(self):
+        return len(self.ticks)
+
+
+    def stop(self):
+        self.stopped = True
+        self.ready.set()
+        self.thread.join()
+
+
+    def run(self):
+        while True:
+            self.ready.wait()
+            self.ready.clear() # Before taking the ticks, a push after this wakes the next wait
+            if self.stopped:
+                return
+            while len(self.orders) > 0 or len(self.ticks) > 0:
+                try:
+                    while len(self.orders) > 0:
+                        self.orders.popleft()()
+                        self.order_statuses += 1
+                    if len(self.ticks) > 0:
+                        self.deliver_tick()
+                except Exception:
+                    logging.exception(f"TickQueue {self.ticker} failed to deliver a tick or order status")
+                if self.stopped:
+                    return
+
+
+    def deliver_tick(self):
+        self.max_depth_seen = max(self.max_depth_seen, len(self.ticks))
+        tick = self.ticks.popleft()
+        if self.max_depth is not None and len(self.ticks) >= self.max_depth:
+            stale = len(self.ticks)
+            for i in range(stale):
+                last = self.ticks.popleft()
+            tick = (last[0], tick[1], last[2])
+            self.coalesced += stale
+        self.delivered += 1
+        self.deliver(*tick)
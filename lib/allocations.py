@@ -0,0 +1,138 @@
+import os
+import tracemalloc
+from threading import Lock
+
+from lib.histogram import Histogram
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Memory allocated while processing the ticks of a monitor, measured with tracemalloc.
+# Each tick records the traced memory peak above the memory at its start, which
+# includes the temporary objects (lists, views, f-strings ...) freed before the
+# tick ends, and the memory still held after it. Every `interval` ticks a
+# snapshot is compared with the previous one to find what grew, grouped by
+# module of the repo (tracemalloc charges a C level allocation to the Python
+# line that caused it).
+# Used as a context manager around each tick.
+# Tracing and the peak are process wide (see Tracing), so the ticks of the
+# profiled monitors are measured one at a time.
+class AllocationProfile:
+    TOP_LINES = 15
+
+    def __init__(self, ticker, interval):
+        self.ticker = ticker
+        self.interval = interval
+        Tracing.open()
+        self.filters = [tracemalloc.Filter(True, os.path.join(ROOT, "*"))]
+        self.ticks = 0
+        self.allocated = Histogram() # bytes above the memory at the start of the tick
+        self.retained = 0 # bytes, over all the ticks
+        self.modules = {} # module -> [bytes, blocks] grown between snapshots
+        self.tick_memory = 0
+        self.first_snapshot = self.snapshot = self.take_snapshot()
+        self.last_lines = [] # Lines that grew the most since the first snapshot, set on close
+
+
+    def __enter__(self):
+        Tracing.tick_lock.acquire()
+        self.tick_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            memory, peak = tracemalloc.get_traced_memory()
+            self.allocated.record(max(0, peak - self.tick_memory))
+            self.retained += memory - self.tick_memory
+            self.ticks += 1
+            if self.ticks % self.interval == 0:
+                self.compare_snapshots()
+        finally:
+            Tracing.tick_lock.release()
+        return False
+
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self.filters)
+
+
+    def compare_snapshots(self):
+        snapshot = self.take_snapshot()
+        for stat in snapshot.compare_to(self.snapshot, 'filename'):
+            module = os.path.relpath(stat.traceback[0].filename, ROOT)
+            if module not in self.modules:
+                self.modules[module] = [0, 0]
+            self.modules[module][0] += stat.size_diff
+            self.modules[module][1] += stat.count_diff
+        self.snapshot = snapshot
+
+
+    def close(self):
+        if self.snapshot is None:
+            return
+        with Tracing.tick_lock:
+            if self.ticks % self.interval != 0:
+                self.compare_snapshots()
+        self.last_lines = self.snapshot.compare_to(self.first_snapshot, 'lineno')[:self.TOP_LINES]
+        self.first_snapshot = self.snapshot = None
+        Tracing.close()
+
+
+    def state_str(self):
+        ticks = max(1, self.ticks)
+        output = f"  ALLOCATIONS {self.ticker} ({self.ticks} ticks, snapshots every {self.interval} ticks):\n"
+        output += (
+            f"    allocated per tick (bytes): mean {self.allocated.mean():.0f} - p50 {self.allocated.percentile(50)} - "
+            f"p99 {self.allocated.percentile(99)} - max {self.allocated.max}\n"
+            f"    retained per tick (bytes): {self.retained / ticks:.1f}\n"
+        )
+        output += f"    {'module':<32} {'bytes/tick':>10} {'blocks/tick':>11} {'total KB':>10}\n"
+        for module, (size, count) in sorted(self.modules.items(), key=lambda item: -abs(item[1][0])):
+            output += f"    {module:<32} {size / ticks:>10.1f} {count / ticks:>11.3f} {size / 1024:>10.1f}\n"
+        output += "    top lines:\n"
+        for stat in self.last_lines:
+            frame = stat.traceback[0]
+            line = f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno}"
+            output += f"    {line:<32} {stat.size_diff / 1024:>10.1f} KB {stat.count_diff:>8} blocks\n"
+        return output
+
+
+# One tracemalloc session for all the profiles of the process: started by the
+# first one (unless something else was tracing already) and stopped when the
+# last one closes.
+class Tracing:
+    tick_lock = Lock() # held while a profiled tick is measured
+    _lock = Lock()
+    _profiles = 0
+    _started = False
+
+    @classmethod
+    def open(cls):
+        with cls._lock:
+            if cls._profiles == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                cls._started = True
+            cls._profiles += 1
+
+
+    @classmethod
+    def close(cls):
+        with cls._lock:
+            cls._profiles -= 1
+            if cls._profiles == 0 and cls._started:
+                tracemalloc.stop()
+                cls._started = False
+
+
+# For monitors that are not profiled
+class NoAllocationProfile:
+    def __enter__(self):
+        pass
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+    def close(self):
+        pass
@@ -17,4 +17,17 @@ class ArgParse:
     	return 'data_mode' in self.args
 
     def output_chart(self):
-    	return 'chart' in self.args
\ No newline at end of file
+    	return 'chart' in self.args
+
+    def workers(self):
+        return core.safe_execute(None, ValueError, int, self.option('workers'))
+
+    def grid_variables(self):
+        return [variable for variable in self.option('grid').split(',') if variable != '']
+
+    # Options given as name=value
+    def option(self, name):
+        for arg in self.args:
+            if arg.startswith(f"{name}="):
+                return arg[len(name) + 1:]
+        return ''
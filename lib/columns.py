@@ -0,0 +1,45 @@
+from array import array
+import csv
+import struct
+
+# Named columns of numbers (arrays of the same length), saved as csv or as a
+# binary columns file:
+#   header: magic, number of rows, number of columns
+#   per column: name, array typecode, then its values
+# Columns are padded to 8 bytes, so they can be cast from a mapped file.
+MAGIC = b'COL1'
+HEADER = struct.Struct('<4sxxxxQQ')
+COLUMN_HEADER = struct.Struct('<56s1sxxxxxxx')
+
+def save_columns(file_name, columns):
+    rows = len(next(iter(columns.values()))) if len(columns) > 0 else 0
+    with open(file_name, "wb") as f:
+        f.write(HEADER.pack(MAGIC, rows, len(columns)))
+        for name, values in columns.items():
+            assert len(values) == rows
+            f.write(COLUMN_HEADER.pack(name.encode()[:56], values.typecode.encode()))
+            data = values.tobytes()
+            f.write(data + bytes(-len(data) % 8))
+
+
+def load_columns(file_name):
+    columns = {}
+    with open(file_name, "rb") as f:
+        magic, rows, length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{file_name} is not a columns file")
+        for i in range(length):
+            name, typecode = COLUMN_HEADER.unpack(f.read(COLUMN_HEADER.size))
+            values = array(typecode.decode())
+            data = f.read(rows * values.itemsize)
+            f.read(-len(data) % 8)
+            values.frombytes(data)
+            columns[name.rstrip(b'\0').decode()] = values
+    return columns
+
+
+def save_csv(file_name, columns):
+    with open(file_name, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns.keys())
+        writer.writerows(zip(*columns.values()))
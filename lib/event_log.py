@@ -0,0 +1,70 @@
+import marshal
+import struct
+
+from lib.log_writer import LogWriter
+
+# Binary datalog of typed events.
+# After the magic every event is framed as payload length (uint32), event
+# type (uint8) and the payload marshaled. Payloads are plain values (the
+# state_record of the models), text is only rendered when reading the log
+# (see utilities/events2text.py).
+MAGIC = b'EVT1'
+FRAME = struct.Struct('<IB')
+EVENT_TYPES = {
+    'tick': 1,
+    'density': 2,
+    'speed': 3,
+    'breaking': 4,
+    'position': 5,
+    'results': 6,
+    'datalog_buffer': 7,
+    'decision': 8,
+    'order': 9,
+    'order_status': 10,
+    'text': 11
+}
+EVENT_TYPES_INV = {v: k for k, v in EVENT_TYPES.items()}
+
+class EventLog:
+    def __init__(self, file_name, block=False, threaded=True):
+        stream = open(file_name, "wb")
+        stream.write(MAGIC)
+        self.writer = LogWriter(stream, block=block, threaded=threaded, binary=True)
+
+
+    def write_event(self, event_type, payload):
+        self.writer.write_record(encode_event, (EVENT_TYPES[event_type], payload))
+
+
+    def write(self, text):
+        self.write_event('text', text)
+
+
+    def flush(self):
+        self.writer.flush()
+
+
+    def close(self):
+        self.writer.close()
+
+
+def encode_event(event):
+    event_type, payload = event
+    data = marshal.dumps(payload)
+    return FRAME.pack(len(data), event_type) + data
+
+
+# (event type, payload) pairs
+def read_events(file_name):
+    with open(file_name, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{file_name} is not an events file")
+        while True:
+            frame = f.read(FRAME.size)
+            if len(frame) < FRAME.size:
+                return # A partial frame is only possible if the writer was killed
+            length, event_type = FRAME.unpack(frame)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield EVENT_TYPES_INV[event_type], marshal.loads(data)
@@ -0,0 +1,128 @@
+from array import array
+import time
+
+# Log-linear histogram of non negative integers (HDR style).
+# Values are grouped by powers of 2, each group split in 2^sub_bucket_bits
+# linear buckets, so recording is O(1) and percentiles have a relative error
+# under 1 / 2^sub_bucket_bits whatever the range of the values.
+class Histogram:
+    def __init__(self, sub_bucket_bits=5, max_value_bits=40):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value = (1 << max_value_bits) - 1
+        self.counts = array('q', bytes(8 * ((max_value_bits - sub_bucket_bits + 1) << sub_bucket_bits)))
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+
+    # Kept short, it runs several times per tick
+    def record(self, value):
+        if value > self.max:
+            if value > self.max_value:
+                value = self.max_value
+            self.max = value
+        self.counts[self.bucket(value)] += 1
+        self.total += 1
+        self.sum += value
+
+
+    def bucket(self, value):
+        shift = value.bit_length() - self.sub_bucket_bits - 1
+        if shift < 0:
+            return value
+        return ((shift + 1) << self.sub_bucket_bits) + (value >> shift) - (1 << self.sub_bucket_bits)
+
+
+    # Highest value that falls in the bucket
+    def bucket_value(self, bucket):
+        group = bucket >> self.sub_bucket_bits
+        if group == 0:
+            return bucket
+        lowest = ((bucket & ((1 << self.sub_bucket_bits) - 1)) + (1 << self.sub_bucket_bits)) << (group - 1)
+        return lowest + (1 << (group - 1)) - 1
+
+
+    def percentile(self, percentile):
+        if self.total == 0:
+            return 0
+        rank = max(1, round(self.total * percentile / 100))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bucket_value(bucket), self.max)
+        return self.max
+
+
+    def mean(self):
+        return self.sum / self.total if self.total > 0 else 0
+
+
+# Wall time of the stages of Monitor.price_change, one instance per ticker
+class StageLatencies:
+    PERCENTILES = (50, 90, 99, 99.9)
+    _by_ticker = {}
+
+    @classmethod
+    def for_ticker(cls, ticker):
+        if ticker not in cls._by_ticker:
+            cls._by_ticker[ticker] = cls(ticker)
+        return cls._by_ticker[ticker]
+
+
+    # The monitors of the ticker keep theirs, the next ones (another replay in
+    # the same process, e.g. a reused pool worker) start empty
+    @classmethod
+    def release(cls, ticker):
+        cls._by_ticker.pop(ticker, None)
+
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.stages = {} # stage -> Histogram of nanoseconds, in the order they were first recorded
+
+
+    def start(self):
+        return time.perf_counter_ns()
+
+
+    # Records the time since start for the stage and returns the start of the next one
+    def lap(self, stage, start):
+        now = time.perf_counter_ns()
+        try:
+            self.stages[stage].record(now - start)
+        except KeyError:
+            self.record(stage, now - start)
+        return now
+
+
+    def record(self, stage, nanoseconds):
+        if stage not in self.stages:
+            self.stages[stage] = Histogram()
+        self.stages[stage].record(nanoseconds)
+
+
+    def state_str(self):
+        output = f"  LATENCIES {self.ticker} (us):\n"
+        output += f"    {'stage':<20} {'count':>8} {'mean':>9}" + "".join(f" {'p' + str(p):>9}" for p in self.PERCENTILES) + f" {'max':>9}\n"
+        for stage, histogram in self.stages.items():
+            output += (
+                f"    {stage:<20} {histogram.total:>8} {histogram.mean() / 1000:>9.1f}"
+                + "".join(f" {histogram.percentile(p) / 1000:>9.1f}" for p in self.PERCENTILES)
+                + f" {histogram.max / 1000:>9.1f}\n"
+            )
+        return output
+
+
+# For monitors that are not measured
+class NoLatencies:
+    def start(self):
+        return 0
+
+
+    def lap(self, stage, start):
+        return 0
+
+
+    def record(self, stage, nanoseconds):
+        pass
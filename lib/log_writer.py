@@ -0,0 +1,106 @@
+import queue
+import logging
+from threading import Thread
+
+# Writes to a stream from a background thread.
+# Writes are text (or bytes if binary) or (render, record) pairs that the thread renders,
+# so the writer only pays for taking a snapshot of its state. Queued writes
+# are rendered and written in batches. When the queue is full writes are
+# dropped and counted, or the writer waits for room if block is set.
+# A batch the stream fails to write is logged and counted as failed, the
+# thread keeps draining the queue so writers and close never wait on it.
+# flush is queued too, the thread flushes the stream after the writes before it.
+class LogWriter:
+    FLUSH = object() # queued by flush
+    def __init__(self, stream, max_records=10000, block=False, threaded=True, batch_size=256, binary=False):
+        self.stream = stream
+        self.binary = binary
+        self.block = block
+        self.threaded = threaded
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.failed = 0 # records lost to stream errors
+        self._queue = queue.Queue(max_records)
+        self._thread = None
+        if threaded:
+            self._thread = Thread(target=self._run, name="LogWriter", daemon=True)
+            self._thread.start()
+
+
+    def write(self, text):
+        self.write_record(None, text)
+
+
+    def write_record(self, render, record):
+        if not self.threaded:
+            self.stream.write(self.render(render, record))
+            return
+        try:
+            self._queue.put((render, record), block=self.block)
+        except queue.Full:
+            self.dropped += 1
+
+
+    def flush(self):
+        if not self.threaded:
+            self.stream.flush()
+            return
+        try:
+            self._queue.put(self.FLUSH, block=False)
+        except queue.Full:
+            pass # The thread is busy writing, a later flush will do
+
+
+    def close(self):
+        if self.threaded:
+            # Waits for room even if not blocking, unless the thread is gone
+            while self._thread.is_alive():
+                try:
+                    self._queue.put(None, timeout=1)
+                    break
+                except queue.Full:
+                    pass
+            self._thread.join()
+        if (self.dropped > 0 or self.failed > 0) and not self.binary:
+            try:
+                self.stream.write(f"\nLOG WRITER: {self.dropped} records dropped, {self.failed} failed\n")
+            except Exception:
+                logging.exception("LogWriter failed to write its counters")
+        self.stream.close()
+
+
+    def render(self, render, record):
+        if render is None:
+            return record
+        try:
+            return render(record)
+        except Exception:
+            logging.exception("LogWriter failed to render a record")
+            return b"" if self.binary else ""
+
+
+    # Private
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = items[-1] is None
+            if closing:
+                items.pop()
+            flushing = self.FLUSH in items
+            if flushing:
+                items = [item for item in items if item is not self.FLUSH]
+            try:
+                self.stream.write((b"" if self.binary else "").join(self.render(render, record) for render, record in items))
+                if flushing:
+                    self.stream.flush()
+            except Exception:
+                self.failed += len(items)
+                logging.exception(f"LogWriter failed to write {len(items)} records")
+            if closing:
+                return
@@ -0,0 +1,48 @@
+from bisect import bisect_left
+
+# Monotonic queue for sliding window max (or min) queries.
+# Values are pushed with increasing indexes, get(start) returns the extreme of
+# the values pushed with index >= start (the earliest one on ties).
+# Push is O(1) amortized and get is a bisect over the values still in the queue.
+class RollingExtremum:
+    def __init__(self, maximum=True, key=None):
+        self.maximum = maximum
+        self.key = key
+        self._indexes = []
+        self._keys = []
+        self._values = []
+        self._head = 0
+
+
+    def push(self, index, value):
+        key = value if self.key is None else self.key(value)
+        if not self.maximum:
+            key = -key
+        while len(self._keys) > self._head and self._keys[-1] < key:
+            self._indexes.pop()
+            self._keys.pop()
+            self._values.pop()
+        self._indexes.append(index)
+        self._keys.append(key)
+        self._values.append(value)
+
+
+    def get(self, start=None):
+        position = self._head if start is None else bisect_left(self._indexes, start, self._head)
+        if position >= len(self._values):
+            return None
+        return self._values[position]
+
+
+    # Values before start can not be asked anymore
+    def discard_before(self, start):
+        self._head = bisect_left(self._indexes, start, self._head)
+        if self._head > 64 and self._head * 2 > len(self._indexes):
+            del self._indexes[:self._head]
+            del self._keys[:self._head]
+            del self._values[:self._head]
+            self._head = 0
+
+
+    def __len__(self):
+        return len(self._values) - self._head
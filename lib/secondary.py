@@ -5,5 +5,8 @@ class DummyStream:
 	def write(self, text):
 		pass
 
+	def flush(self):
+		pass
+
 	def close(self):
 		pass
\ No newline at end of file
@@ -0,0 +1,284 @@
+from array import array
+import json
+import mmap
+import os
+import struct
+
+# Recorded ticks are either .json files with a list of [time, price] pairs or
+# binary .ticks files:
+#   header: magic, price type, price precision, tick price, number of ticks, ticker
+#   all the times as float64, then all the prices as float64, or as int32 tick
+#   indexes (price / tick price) when every price is a multiple of the tick price.
+# Binary files are mapped instead of parsed, so replay starts right away and
+# the ticks are shared by the OS page cache between processes. Json files are
+# parsed as a stream, so they are not loaded whole in memory either.
+#
+# Binary .quotes files have the bid, ask and last streams interleaved in the
+# order they were received, as records after the same header:
+#   time as float64, price as float64 or int32 tick index, kind as uint8
+# Kinds are the IB tick types. The records are decoded by struct.iter_unpack
+# straight from the mapped file, load_ticks only returns their last trades and
+# load_quotes decodes them once for a replay that needs both.
+MAGIC = b'TCK1'
+QUOTES_MAGIC = b'TCQ1'
+HEADER = struct.Struct('<4s1sBxxdQ16s') # 40 bytes, keeps the columns 8 byte aligned
+RECORDS = {'d': struct.Struct('<ddB'), 'i': struct.Struct('<diB')} # by price type
+BID, ASK, LAST = 1, 2, 4
+
+def load_ticks(file_name):
+    if file_name.endswith(".json"):
+        times = array('d')
+        prices = array('d')
+        for time, price in iter_json_ticks(file_name):
+            times.append(time)
+            prices.append(price)
+        return times, prices
+    return map_ticks(file_name)
+
+
+# (time, price) pairs, without loading the whole file
+def iter_ticks(file_name):
+    if file_name.endswith(".json"):
+        return iter_json_ticks(file_name)
+    return zip(*map_ticks(file_name))
+
+
+# Streaming parser of the [[time, price], ...] layout, only one chunk of the file is in memory
+def iter_json_ticks(file_name, chunk_size=1 << 16):
+    decoder = json.JSONDecoder()
+    with open(file_name, "r") as f:
+        buffer = ""
+        position = 0
+        started = False
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            while True:
+                # Skip separators until the next value
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position == len(buffer):
+                    break
+                if not started:
+                    if buffer[position] != "[":
+                        raise ValueError(f"{file_name} is not a list of ticks")
+                    started = True
+                    position += 1
+                    continue
+                if buffer[position] == "]":
+                    return
+                try:
+                    (time, price), end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if chunk == "":
+                        raise
+                    break # Incomplete tick, needs the next chunk
+                position = end
+                yield time, price
+            if chunk == "":
+                if started:
+                    raise ValueError(f"{file_name} ends before the end of the list of ticks")
+                raise ValueError(f"{file_name} is empty, not a list of ticks")
+
+
+def save_ticks(file_name, times, prices, ticker="", tick_price=None, price_precision=0):
+    assert len(times) == len(prices)
+    tick_indexes = to_tick_indexes(prices, tick_price, price_precision)
+    price_type = b'd' if tick_indexes is None else b'i'
+    with open(file_name, "wb") as f:
+        f.write(HEADER.pack(MAGIC, price_type, price_precision, tick_price or 0, len(times), ticker.encode()[:16]))
+        f.write(array('d', times).tobytes())
+        f.write(array('d', prices).tobytes() if tick_indexes is None else tick_indexes.tobytes())
+
+
+def read_header(file_name):
+    with open(file_name, "rb") as f:
+        magic, price_type, price_precision, tick_price, length, ticker = HEADER.unpack(f.read(HEADER.size))
+    if magic not in (MAGIC, QUOTES_MAGIC):
+        raise ValueError(f"{file_name} is not a ticks file")
+    return {
+        'quotes': magic == QUOTES_MAGIC,
+        'ticker': ticker.rstrip(b'\0').decode(),
+        'tick_price': tick_price,
+        'price_precision': price_precision,
+        'price_type': price_type.decode(),
+        'length': length
+    }
+
+
+# Read only views over the mapped file
+def map_ticks(file_name):
+    header = read_header(file_name)
+    if header['quotes']:
+        return load_last_ticks(file_name)
+    length = header['length']
+    if length == 0:
+        return array('d'), array('d')
+    with open(file_name, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    times_end = HEADER.size + 8 * length
+    times = memoryview(mapped)[HEADER.size:times_end].cast('d')
+    if header['price_type'] == 'd':
+        return times, memoryview(mapped)[times_end:times_end + 8 * length].cast('d')
+    tick_indexes = memoryview(mapped)[times_end:times_end + 4 * length].cast('i')
+    return times, TickPrices(tick_indexes, header['tick_price'], header['price_precision'])
+
+
+def is_quotes_file(file_name):
+    return not file_name.endswith(".json") and read_header(file_name)['quotes']
+
+
+def save_quotes(file_name, times, prices, kinds, ticker="", tick_price=None, price_precision=0):
+    assert len(times) == len(prices) == len(kinds)
+    tick_indexes = to_tick_indexes(prices, tick_price, price_precision)
+    price_type = 'd' if tick_indexes is None else 'i'
+    record = RECORDS[price_type]
+    records = bytearray(record.size * len(times))
+    for i, values in enumerate(zip(times, prices if tick_indexes is None else tick_indexes, kinds)):
+        record.pack_into(records, i * record.size, *values)
+    with open(file_name, "wb") as f:
+        f.write(HEADER.pack(QUOTES_MAGIC, price_type.encode(), price_precision, tick_price or 0, len(times), ticker.encode()[:16]))
+        f.write(records)
+
+
+# (time, price, kind) of every tick, .ticks and .json files only have last trades
+def iter_quotes(file_name):
+    if not is_quotes_file(file_name):
+        return ((time, price, LAST) for time, price in iter_ticks(file_name))
+    header = read_header(file_name)
+    if header['length'] == 0:
+        return iter(())
+    with open(file_name, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    record = RECORDS[header['price_type']]
+    records = record.iter_unpack(memoryview(mapped)[HEADER.size:HEADER.size + record.size * header['length']])
+    if header['price_type'] == 'd':
+        return records
+    return tick_index_records(records, header['tick_price'], header['price_precision'])
+
+
+def tick_index_records(records, tick_price, price_precision):
+    for time, tick_index, kind in records:
+        yield time, round(tick_index * tick_price, price_precision), kind
+
+
+def load_last_ticks(file_name):
+    times = array('d')
+    prices = array('d')
+    for time, price, kind in iter_quotes(file_name):
+        if kind == LAST:
+            times.append(time)
+            prices.append(price)
+    return times, prices
+
+
+# Every tick of a quotes file as (times, prices, kinds) and its last trades as
+# (times, prices), from one decoding of the records
+def load_quotes(file_name):
+    times, prices, kinds = array('d'), array('d'), array('B')
+    last_times, last_prices = array('d'), array('d')
+    for time, price, kind in iter_quotes(file_name):
+        times.append(time)
+        prices.append(price)
+        kinds.append(kind)
+        if kind == LAST:
+            last_times.append(time)
+            last_prices.append(price)
+    return (times, prices, kinds), (last_times, last_prices)
+
+
+# None if the prices can not be stored exactly as int32 tick indexes
+def to_tick_indexes(prices, tick_price, price_precision):
+    if not tick_price:
+        return None
+    tick_indexes = array('i')
+    for price in prices:
+        tick_index = round(price / tick_price)
+        if not -2**31 <= tick_index < 2**31 or round(tick_index * tick_price, price_precision) != price:
+            return None
+        tick_indexes.append(tick_index)
+    return tick_indexes
+
+
+# Prices of a file stored as tick indexes, converted when read
+class TickPrices:
+    def __init__(self, tick_indexes, tick_price, price_precision):
+        self.tick_indexes = tick_indexes
+        self.tick_price = tick_price
+        self.price_precision = price_precision
+
+
+    def __len__(self):
+        return len(self.tick_indexes)
+
+
+    def __getitem__(self, index):
+        return round(self.tick_indexes[index] * self.tick_price, self.price_precision)
+
+
+    def __iter__(self):
+        tick_price, price_precision = self.tick_price, self.price_precision
+        for tick_index in self.tick_indexes:
+            yield round(tick_index * tick_price, price_precision)
+
+
+# Ticks of every kind in the order they are received, saved by live sessions
+# as a quotes file. Every SPILL_INTERVAL ticks they are appended to spill_file
+# if given, as (time, price, kind) float64 triples, so memory stays bounded.
+class TickRecorder:
+    SPILL_INTERVAL = 4096
+
+    def __init__(self, spill_file=None):
+        self.spill_file = spill_file
+        self.spill = None
+        self.records = array('d') # time, price, kind triples not spilled yet
+        self.length = 0
+
+
+    def record(self, kind, price, time):
+        self.records.append(time)
+        self.records.append(price)
+        self.records.append(kind)
+        self.length += 1
+        if self.spill_file is not None and self.length % self.SPILL_INTERVAL == 0:
+            if self.spill is None:
+                self.spill = open(self.spill_file, "wb")
+            self.records.tofile(self.spill)
+            self.spill.flush()
+            del self.records[:]
+
+
+    # Every tick, spilled or not, as (times, prices, kinds) arrays
+    def all_ticks(self):
+        records = array('d')
+        if self.spill is not None:
+            with open(self.spill_file, "rb") as f:
+                records.frombytes(f.read())
+        records.extend(self.records)
+        return records[0::3], records[1::3], array('B', map(int, records[2::3]))
+
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            os.remove(self.spill_file)
+            self.spill = None
+
+
+    def __len__(self):
+        return self.length
+
+
+# For monitors that do not save their ticks
+class NoTickRecorder:
+    def record(self, kind, price, time):
+        pass
+
+
+    def close(self):
+        pass
+
+
+    def __len__(self):
+        return 0
@@ -41,11 +41,22 @@ class ActivePosition:
 
 
     def state_str(self):
+        return ActivePosition.render_state(self.state_record())
+
+
+    def state_record(self):
+        return (self.m.prm.price_precision, self.direction, self.transaction_price, self.transaction_time,
+            self.up_trending_price, self.down_trending_price)
+
+
+    @staticmethod
+    def render_state(record):
+        price_precision, direction, transaction_price, transaction_time, up_trending_price, down_trending_price = record
         output = (
-            f"  Active Position {self.direction}:\n"
-            f"    transaction_price: {self.transaction_price:.{self.m.prm.price_precision}f}\n"
-            f"    transaction_time: {self.transaction_time:.4f}\n"
-            f"    up_trending_price: {self.up_trending_price:.{self.m.prm.price_precision}f}\n"
-            f"    down_trending_price: {self.down_trending_price:.{self.m.prm.price_precision}f}\n"
+            f"  Active Position {direction}:\n"
+            f"    transaction_price: {transaction_price:.{price_precision}f}\n"
+            f"    transaction_time: {transaction_time:.4f}\n"
+            f"    up_trending_price: {up_trending_price:.{price_precision}f}\n"
+            f"    down_trending_price: {down_trending_price:.{price_precision}f}\n"
         )
         return output
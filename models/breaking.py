@@ -1,5 +1,6 @@
 import gvars
 from lib import util
+from models.density import DensityData
 
 class Breaking:
     def __init__(self, monitor):
@@ -99,9 +100,10 @@ class Breaking:
                 if (float(time_up_down[1] + time_up_down[2]) / time_up_down[0]) > self.m.prm.breaking_up_down_ratio:
                     duration_ok = True
 
-        self.m.datalog_buffer += (f"    breaking.duration_ok.mid_price: {mid_price}\n")
-        self.m.datalog_buffer += (f"    breaking.duration_ok.time_up_down: {time_up_down}\n")
-        self.m.datalog_buffer += (f"    breaking.duration_ok.duration_ok: {duration_ok}\n")
+        if self.m.diagnosing('full'):
+            self.m.datalog_buffer += (f"    breaking.duration_ok.mid_price: {mid_price}\n")
+            self.m.datalog_buffer += (f"    breaking.duration_ok.time_up_down: {time_up_down}\n")
+            self.m.datalog_buffer += (f"    breaking.duration_ok.duration_ok: {duration_ok}\n")
 
         return duration_ok
 
@@ -118,17 +120,31 @@ class Breaking:
 
 
     def state_str(self):
-        output = ""
-        if self.direction != 0:
-            output += (
-                "  BREAKING {}:\n"
-                "    min_price: {:.{price_precision}f}\n"
-                "    max_price: {:.{price_precision}f}\n"
-                "    start_time: {:.4f}\n"
-                "    price_changes: {}\n"
-            ).format(self.direction, self.min_price, self.max_price, self.start_time, 
-                self.price_changes, price_precision = self.m.prm.price_precision)
-            if len(self.price_changes_list) > 0:
-                output += f"    price_changes_list: {str(self.price_changes_list)}\n"
-            output += self.density_data.state_str(self.m.prm.price_precision)
+        return type(self).render_state(self.state_record())
+
+
+    def state_record(self):
+        if self.direction == 0:
+            return None
+        return (self.m.prm.price_precision, self.direction, self.min_price, self.max_price,
+            self.start_time, self.price_changes, str(self.price_changes_list) if len(self.price_changes_list) > 0 else None,
+            self.density_data.state_record())
+
+
+    @staticmethod
+    def render_state(record):
+        if record is None:
+            return ""
+        price_precision, direction, min_price, max_price, start_time, price_changes, price_changes_list, density_data = record
+        output = (
+            "  BREAKING {}:\n"
+            "    min_price: {:.{price_precision}f}\n"
+            "    max_price: {:.{price_precision}f}\n"
+            "    start_time: {:.4f}\n"
+            "    price_changes: {}\n"
+        ).format(direction, min_price, max_price, start_time,
+            price_changes, price_precision = price_precision)
+        if price_changes_list is not None:
+            output += f"    price_changes_list: {price_changes_list}\n"
+        output += DensityData.render_state(density_data, price_precision)
         return output
\ No newline at end of file
@@ -5,6 +5,8 @@ import gvars
 from lib import util
 
 class BreakingDecision(Decision):
+    KIND = 'breaking'
+
     def __init__(self, monitor, density_data):
         Decision.__init__(self, monitor)
         self.density_data = density_data
@@ -104,7 +106,8 @@ class BreakingDecision(Decision):
             return True
         elif (self.density_data.trend_density_direction != gvars.DENSITY_DIRECTION['out-edge'] and
                 self.direction * self.m.ticks(self.m.last_price() - self.m.mid_price(self.density_data.trend_tuple[1:3])) >= 0 - ticks_to_maximum):
-            self.m.datalog_buffer += (f"    breaking_decision.reached_maximum({ticks_to_maximum}).maximum: {self.m.mid_price(self.density_data.trend_tuple[1:3])}\n")
+            if self.m.diagnosing('full'):
+                self.m.datalog_buffer += (f"    breaking_decision.reached_maximum({ticks_to_maximum}).maximum: {self.m.mid_price(self.density_data.trend_tuple[1:3])}\n")
             return True
         else:
             return False
@@ -125,15 +128,22 @@ class BreakingDecision(Decision):
         return self.m.prm.breaking_stop_time
 
 
-    def state_str(self):
+    def details(self):
+        return (self.breaking_price_changes, self.breaking_duration_ok, self.in_line, self.trend_two, self.adjusting_ticks)
+
+
+    @staticmethod
+    def render_state(summary):
+        kind, direction, trend_pattern, scores, details = summary
+        breaking_price_changes, breaking_duration_ok, in_line, trend_two, adjusting_ticks = details
         output = "Breaking - "
-        output += f"trend_pattern: {self.trend_pattern:+d}, "
-        output += self._scores_output
+        output += f"trend_pattern: {trend_pattern:+d}, "
+        output += Decision.render_scores(scores)
         output += (
-            f"breaking_price_changes: {self.breaking_price_changes:>3}, "
-            f"breaking_duration_ok: {str(self.breaking_duration_ok):>5}, "
-            f"in_line: {self.in_line}, "
-            f"trend_two: {self.trend_two}, "
-            f"adjusting_ticks: {self.adjusting_ticks}, "
+            f"breaking_price_changes: {breaking_price_changes:>3}, "
+            f"breaking_duration_ok: {str(breaking_duration_ok):>5}, "
+            f"in_line: {in_line}, "
+            f"trend_two: {trend_two}, "
+            f"adjusting_ticks: {adjusting_ticks}, "
         )
         return output
\ No newline at end of file
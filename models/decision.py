@@ -2,6 +2,8 @@ import gvars
 from lib import util
 
 class Decision:
+    KIND = None # type: str
+
     def __init__(self, monitor):
         self.m = monitor
 
@@ -12,7 +14,7 @@ class Decision:
 
         self.trend_pattern = gvars.TREND_PATTERN['neutral']
 
-        self._scores_output = ""
+        self._scores = [] # (score name, score) of every all_scores call
 
 
     def is_breaking_in_range(self):
@@ -27,14 +29,16 @@ class Decision:
 
     def should_stop(self):
         trending_break_ticks = self.trending_break_ticks()
-        self.m.datalog_buffer += (f"    decision.should_stop.trending_break_ticks: {trending_break_ticks}\n")
+        if self.m.diagnosing('full'):
+            self.m.datalog_buffer += (f"    decision.should_stop.trending_break_ticks: {trending_break_ticks}\n")
 
         # Time stop
         time_since_transaction = self.m.last_time() - self.ap.transaction_time
         if time_since_transaction > self.break_time():
             min_max = self.m.min_max_since(self.break_time())
-            self.m.datalog_buffer += (f"    decision.should_stop.min_max[1].price: {min_max[1].price}\n")
-            self.m.datalog_buffer += (f"    decision.should_stop.min_max[0].price: {min_max[0].price}\n")
+            if self.m.diagnosing('full'):
+                self.m.datalog_buffer += (f"    decision.should_stop.min_max[1].price: {min_max[1].price}\n")
+                self.m.datalog_buffer += (f"    decision.should_stop.min_max[0].price: {min_max[0].price}\n")
             if self.m.ticks(min_max[1].price - min_max[0].price) <= trending_break_ticks:
                 return True
         
@@ -50,7 +54,7 @@ class Decision:
         for funct_name, funct_obj in vars(type(self)).items():
             if funct_name[-6:] == '_score':
                 score = funct_obj(self)
-                self._scores_output += (f"{funct_name}: {score}, ")
+                self._scores.append((funct_name, score))
                 scores.append(score)
         if (self.m.prm.reduce_score_rate_on_price_data_length is not None and 
                 not util.in_range(self.m.data[-1].price_data_length, self.m.prm.reduce_score_rate_on_price_data_length[0:2])):
@@ -58,6 +62,25 @@ class Decision:
         return scores
 
 
+    def scores_record(self):
+        return list(self._scores)
+
+
+    def state_str(self):
+        return type(self).render_state(self.summary())
+
+
+    # Small snapshot of the decision, kept by the results instead of the decision
+    # (which holds the density data or speeding points and the monitor)
+    def summary(self):
+        return (type(self).KIND, self.direction, self.trend_pattern, tuple(self._scores), self.details())
+
+
+    @staticmethod
+    def render_scores(scores):
+        return "".join(f"{name}: {score}, " for name, score in scores)
+
+
     @property
     def ap(self):
         return self.m.position.ap
@@ -69,6 +92,13 @@ class Decision:
     def trending_break_ticks(self):
         raise NotImplementedError
 
+    def details(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def render_state(summary):
+        raise NotImplementedError
+
     def break_time(self):
         raise NotImplementedError
 
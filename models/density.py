@@ -1,10 +1,23 @@
+from bisect import bisect_left, insort
+import math
+
 import gvars
-from lib import util, core
+from lib import util
 
 class Density:
+    RESUM_INTERVAL = 1024 # updates, total_duration is re-summed so the running sum does not drift
+
     def __init__(self, monitor):
         self.m = monitor
+        # Density points by tick (price / tick_price)
+        self.dps = {}
+        # Same density points ordered by price, and their ticks
         self.list_dps = []
+        self._dps_ticks = []
+        # (duration, tick) ordered by duration, for the percentile thresholds
+        self._dps_by_duration = []
+        self.total_duration = 0
+        self._updates = 0
         self.initialize_interval_variables()
         self.in_position = False
 
@@ -44,12 +57,8 @@ class Density:
 
     def build_dps(self):
         data = self.m.data_since(self.m.prm.primary_look_back_time)
-        dict_dps = {}
-        for cdp in data:
-            if cdp.price not in dict_dps:
-                dict_dps[cdp.price] = DensityPoint(cdp.price)
-            dict_dps[cdp.price].duration += cdp.duration
-        self.list_dps = list(dict_dps.values())
+        for i in range(data.start, data.stop):
+            self.add_duration(self.m.data.price[i - self.m.data.offset], self.m.data.duration(i))
 
 
     def update_dps(self):
@@ -58,58 +67,84 @@ class Density:
         data = self.m.data_since(self.m.prm.primary_look_back_time)
         
         # Add 2 newest prices
-        for cdp in data[-2:]:
-            dp = core.find(lambda dp: dp.price == cdp.price, self.list_dps)
-            if dp is None:
-                dp = DensityPoint(cdp.price)
-                self.list_dps.append(dp)
-            dp.duration += cdp.duration
+        for i in range(max(data.start, data.stop - 2), data.stop):
+            self.add_duration(self.m.data.price[i - self.m.data.offset], self.m.data.duration(i))
 
         if (data[-1].time - data[0].time < self.m.prm.primary_look_back_time - 300 and 
                 len(self._previous_price_data) == 0):
             return
 
-        # Remove old elements
-        for cdp in self._previous_price_data:
-            if cdp == data[0]: # Pointer comparison
-                break
-            dp_index = core.index(lambda dp: dp.price == cdp.price, self.list_dps)
-            if dp_index is None:
-                continue
-            dp = self.list_dps[dp_index]
-            dp.duration -= cdp.duration
-            if dp.price != self.m.last_price() and dp.duration < 0.001: # not last and duration close to zero (floating point errors)
-                self.list_dps.pop(dp_index)
+        # Remove old elements, the ones that were in the previous window but not in this one
+        if len(self._previous_price_data) > 0:
+            last_tick = self.m.ticks(self.m.last_price())
+            for i in range(self._previous_price_data.start, data.start):
+                tick = self.m.ticks(self.m.data.price[i - self.m.data.offset])
+                dp = self.dps.get(tick)
+                if dp is None:
+                    continue
+                self.set_duration(tick, dp.duration - self.m.data.duration(i))
+                if tick != last_tick and dp.duration < 0.001: # not last and duration close to zero (floating point errors)
+                    self.remove_dp(tick)
         self._previous_price_data = data
 
+        self._updates += 1
+        if self._updates % self.RESUM_INTERVAL == 0:
+            self.total_duration = math.fsum(dp.duration for dp in self.dps.values())
+
+
+    def add_duration(self, price, duration):
+        tick = self.m.ticks(price)
+        dp = self.dps.get(tick)
+        if dp is None:
+            dp = DensityPoint(price, self)
+            self.dps[tick] = dp
+            index = bisect_left(self._dps_ticks, tick)
+            self._dps_ticks.insert(index, tick)
+            self.list_dps.insert(index, dp)
+            insort(self._dps_by_duration, (dp.duration, tick))
+        if duration != 0:
+            self.set_duration(tick, dp.duration + duration)
+
+
+    def set_duration(self, tick, duration):
+        dp = self.dps[tick]
+        self._dps_by_duration.pop(bisect_left(self._dps_by_duration, (dp.duration, tick)))
+        self.total_duration += duration - dp.duration
+        dp.duration = duration
+        insort(self._dps_by_duration, (dp.duration, tick))
 
-    def set_percentagiles(self):
-        self.list_dps.sort(key=lambda dp: dp.duration)
 
-        # Set dpercentage
-        total_duration = sum(map(lambda dp: dp.duration, self.list_dps))
-        for index, dp in enumerate(self.list_dps):
-            dp.dpercentage = (dp.duration / total_duration) * 100
+    def remove_dp(self, tick):
+        dp = self.dps.pop(tick)
+        index = bisect_left(self._dps_ticks, tick)
+        self._dps_ticks.pop(index)
+        self.list_dps.pop(index)
+        self._dps_by_duration.pop(bisect_left(self._dps_by_duration, (dp.duration, tick)))
+        self.total_duration -= dp.duration
 
-        # set dpercentile 
-        dpercentile_coefficient = 100.0 / max(self.list_dps, key=lambda dp: dp.dpercentage).dpercentage
-        for dp in self.list_dps:
-            dp.dpercentile = round(dp.dpercentage * dpercentile_coefficient)
 
-        # set first_quarter and last_quarter dpercentiles
+    def dpercentage(self, duration):
+        return (duration / self.total_duration) * 100
+
+
+    def dpercentile(self, duration):
+        dpercentile_coefficient = 100.0 / self.dpercentage(self._dps_by_duration[-1][0])
+        return round(self.dpercentage(duration) * dpercentile_coefficient)
+
+
+    def set_percentagiles(self):
+        # set first_quarter and last_quarter dpercentiles from the durations order
         division = round((len(self.list_dps) - 1) / self.m.prm.density_division)
-        self.min_higher_area = self.list_dps[(len(self.list_dps) - 1) - division].dpercentile
-        self.max_lower_area = self.list_dps[division].dpercentile
+        self.min_higher_area = self.dpercentile(self._dps_by_duration[(len(self.list_dps) - 1) - division][0])
+        self.max_lower_area = self.dpercentile(self._dps_by_duration[division][0])
         return True # Signals that the next method can be executed
 
 
     def update_heights(self):
-        # This method assumes that self.list_dps is ordered by price
+        # self.list_dps is always ordered by price
         if len(self._previous_price_data) == 0:
             return
 
-        self.list_dps.sort(key=lambda dp: dp.price)
-
         for i in range(len(self.list_dps)):
             self.list_dps[i].height = gvars.HEIGHT['mid']
         unreal_consecutives = 0
@@ -153,13 +188,11 @@ class Density:
 
 
     def update_intervals(self):
-        # This method assumes that self.list_dps is ordered by price
+        # self.list_dps is always ordered by price
         if len(self._previous_price_data) == 0:
             return
 
-        self.list_dps.sort(key=lambda dp: dp.price)
-
-        current_dp_index = core.index(lambda dp: dp.price == self.m.last_price(), self.list_dps)
+        current_dp_index = bisect_left(self._dps_ticks, self.m.ticks(self.m.last_price()))
         self.current_dp = self.list_dps[current_dp_index]
 
         if self.current_dp.dpercentile <= self.max_lower_area:
@@ -321,57 +354,94 @@ class Density:
 
 
     def state_str(self):
+        return type(self).render_state(self.state_record())
+
+
+    # Plain values shown by state_str, rendered later by render_state (see LogWriter and EventLog)
+    def state_record(self):
         if not self.values_set():
+            return None
+        dps = []
+        if self.in_position:
+            dps = [dp.state_record() for dp in reversed(self.list_dps)
+                if self.down_interval_min <= dp.price <= self.up_interval_max]
+        return (self.m.prm.price_precision if self.m is not None else 5, dps,
+            self.in_position, self.min_higher_area, self.max_lower_area,
+            self.up_density_direction, self.down_density_direction,
+            self.up_interval_max, self.up_interval_min, self.current_interval_max,
+            self.current_dp.state_record() if self.current_dp is not None else None,
+            self.current_interval_min, self.down_interval_max, self.down_interval_min)
+
+
+    @staticmethod
+    def render_state(record):
+        if record is None:
             return ""
+        (price_precision, dps, in_position, min_higher_area, max_lower_area,
+            up_density_direction, down_density_direction,
+            up_interval_max, up_interval_min, current_interval_max, current_dp,
+            current_interval_min, down_interval_max, down_interval_min) = record
         output = "  DENSITY:\n"
-        if self.in_position:
-            for dp in reversed(self.list_dps):
-                if self.down_interval_min <= dp.price <= self.up_interval_max:
-                    output += f"    {dp.state_str(self.m.prm.price_precision)}\n"
+        for dp in dps:
+            output += f"    {DensityPoint.render_state(dp, price_precision)}\n"
         output += (
-            f"    in_position: {self.in_position}\n"
-            f"    min_higher_area: {self.min_higher_area}\n"
-            f"    max_lower_area: {self.max_lower_area}\n"
-            f"    up_density_direction: {gvars.DENSITY_DIRECTION_INV[self.up_density_direction]}\n"
-            f"    down_density_direction: {gvars.DENSITY_DIRECTION_INV[self.down_density_direction]}\n"
+            f"    in_position: {in_position}\n"
+            f"    min_higher_area: {min_higher_area}\n"
+            f"    max_lower_area: {max_lower_area}\n"
+            f"    up_density_direction: {gvars.DENSITY_DIRECTION_INV[up_density_direction]}\n"
+            f"    down_density_direction: {gvars.DENSITY_DIRECTION_INV[down_density_direction]}\n"
         )
         output += (
             "    {:.{price_precision}f}\n"
             "    {:.{price_precision}f}\n"
             "    {:.{price_precision}f}\n"
-        ).format(self.up_interval_max, self.up_interval_min, self.current_interval_max,
-            price_precision = self.m.prm.price_precision if self.m is not None else 5)
-        if self.current_dp is not None:
-            output += f"    current_dp: {self.current_dp.state_str(self.m.prm.price_precision)}\n"
+        ).format(up_interval_max, up_interval_min, current_interval_max,
+            price_precision = price_precision)
+        if current_dp is not None:
+            output += f"    current_dp: {DensityPoint.render_state(current_dp, price_precision)}\n"
         else:
             output += "    -\n"
         output += (
             "    {:.{price_precision}f}\n"
             "    {:.{price_precision}f}\n"
             "    {:.{price_precision}f}\n"
-        ).format(self.current_interval_min, self.down_interval_max, self.down_interval_min,
-            price_precision = self.m.prm.price_precision if self.m is not None else 5)
+        ).format(current_interval_min, down_interval_max, down_interval_min,
+            price_precision = price_precision)
         return output
 
 
 class DensityPoint:
-    def __init__(self, price):
+    __slots__ = ('price', 'duration', 'height', 'density')
+
+    def __init__(self, price, density):
         self.price = price
         self.duration = 0
-        self.dpercentage = None # type: int
-        self.dpercentile = None # type: int
         self.height = gvars.HEIGHT['mid']
+        self.density = density
+
+    @property
+    def dpercentage(self):
+        return self.density.dpercentage(self.duration)
+
+    @property
+    def dpercentile(self):
+        return self.density.dpercentile(self.duration)
 
     def state_str(self, price_precision = 2):
+        return DensityPoint.render_state(self.state_record(), price_precision)
+
+    def state_record(self):
+        return (self.price, self.duration, self.dpercentage, self.dpercentile, self.height)
+
+    @staticmethod
+    def render_state(record, price_precision = 2):
         output = (
             "price: {:.{price_precision}f}, "
             "duration: {:.2f}, "
             "dpercentage: {:.2f}, "
             "dpercentile: {}, "
             "height: {}"
-        ).format(self.price, self.duration,
-            self.dpercentage, self.dpercentile, self.height,
-            price_precision = price_precision)
+        ).format(*record, price_precision = price_precision)
         return output
 
 
@@ -388,16 +458,27 @@ class DensityData:
         self.down_interval_min = None # type: int
 
     def state_str(self, price_precision = 2):
+        return DensityData.render_state(self.state_record(), price_precision)
+
+    def state_record(self):
+        return (self.trend_density_direction, self.anti_trend_density_direction,
+            self.up_interval_max, self.up_interval_min, self.current_interval_max,
+            self.current_interval_min, self.down_interval_max, self.down_interval_min)
+
+    @staticmethod
+    def render_state(record, price_precision = 2):
+        (trend_density_direction, anti_trend_density_direction, up_interval_max, up_interval_min,
+            current_interval_max, current_interval_min, down_interval_max, down_interval_min) = record
         output = (
             "  Density Data:\n"
-            f"    trend_density_direction: {gvars.DENSITY_DIRECTION_INV[self.trend_density_direction]}\n"
-            f"    anti_trend_density_direction: {gvars.DENSITY_DIRECTION_INV[self.anti_trend_density_direction]}\n"
-            f"    {self.up_interval_max:.{price_precision}f}\n"
-            f"    {self.up_interval_min:.{price_precision}f}\n"
-            f"    {self.current_interval_max:.{price_precision}f}\n"
+            f"    trend_density_direction: {gvars.DENSITY_DIRECTION_INV[trend_density_direction]}\n"
+            f"    anti_trend_density_direction: {gvars.DENSITY_DIRECTION_INV[anti_trend_density_direction]}\n"
+            f"    {up_interval_max:.{price_precision}f}\n"
+            f"    {up_interval_min:.{price_precision}f}\n"
+            f"    {current_interval_max:.{price_precision}f}\n"
             f"    -\n"
-            f"    {self.current_interval_min:.{price_precision}f}\n"
-            f"    {self.down_interval_max:.{price_precision}f}\n"
-            f"    {self.down_interval_min:.{price_precision}f}\n"
+            f"    {current_interval_min:.{price_precision}f}\n"
+            f"    {down_interval_max:.{price_precision}f}\n"
+            f"    {down_interval_min:.{price_precision}f}\n"
         )
         return output
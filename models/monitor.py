@@ -1,13 +1,16 @@
 import time
 from threading import Thread, Lock
 import logging
-import json
 import os
 from functools import lru_cache
 
 import gvars
 from lib import util, core
 from lib.secondary import DummyStream
+from lib.log_writer import LogWriter
+from lib.event_log import EventLog
+from lib.histogram import StageLatencies, NoLatencies
+from lib.allocations import AllocationProfile, NoAllocationProfile
 
 # State objects can be used to return data and decide in this class whether to change state
 # or just return direct information and get this class to ask if should change or not
@@ -21,22 +24,44 @@ from models.breaking_decision import BreakingDecision
 from models.speeding_decision import SpeedingDecision
 from models.params_db import ParamsDb
 from models.closing import Closing
+from models.tick_store import TickStore, ChartDataPoint
+from lib.tick_files import save_ticks, save_quotes, TickRecorder, NoTickRecorder
 
 class Monitor:
-    def __init__(self, ticker, remote, prm_id):
+    HISTORY_MARGIN = 600 # secs, over the longest look back, for windows kept from previous ticks and breaks
+
+    def __init__(self, ticker, remote, prm_id, params=None):
 
         self.ticker = ticker
         self.remote = remote
-        self.data = []
         
         self.test = False
-        if prm_id == None:
+        self.diagnostics = None # type: int
+        if params is not None:
+            self.test = True
+            self.assign_params(params)
+        elif prm_id == None:
             self.test = True
             self.assign_params(Params(), randomize=True)
         elif prm_id == 0:
             self.assign_params(Params())
         else:
             self.assign_params(ParamsDb.gi().get_params(prm_id))
+        if gvars.CONF['bounded_history'] and remote.live_mode:
+            # Live sessions can last days, only the ticks the components look at are kept
+            spill_file = None
+            if not self.test and gvars.CONF['spill_history']:
+                spill_file = f"{self.create_and_return_output_dir()}/{ticker}_live_{time.strftime('%Y-%m-%d|%H-%M')}.spill"
+            self.data = TickStore(max_duration=self.history_duration(), spill_file=spill_file)
+        else:
+            self.data = TickStore()
+        if not self.test and remote.live_mode and gvars.CONF['record_quotes']:
+            spill_file = None
+            if gvars.CONF['spill_history']:
+                spill_file = f"{self.create_and_return_output_dir()}/{ticker}_live_{time.strftime('%Y-%m-%d|%H-%M')}_quotes.spill"
+            self.recorder = TickRecorder(spill_file)
+        else:
+            self.recorder = NoTickRecorder()
         self.position = Position(self, remote)
         self.density = Density(self)
         self.breaking = Breaking(self)
@@ -56,41 +81,66 @@ class Monitor:
 
         self.child_test_monitors = []
 
+        # Test monitors do not have a datalog, nothing needs to be built for them
+        self.diagnostics = gvars.DIAGNOSTICS[gvars.CONF['test_diagnostics'] if self.test else gvars.CONF['diagnostics']]
         if self.test:
-            base_file_name = f"{ticker}_{hash(self)}"
+            base_file_name = f"{ticker}_{os.getpid()}_{hash(self)}" # Sweeps run test monitors in many processes
             self.datalog = DummyStream()
         else:
             base_file_name = f"{ticker}"
-            self.datalog = open(f"{self.create_and_return_output_dir()}/{base_file_name}.log", "w")
+            # Nothing is dropped when replaying, live ticks do not wait for the disk
+            if gvars.CONF['datalog_format'] == 'events':
+                self.datalog = EventLog(f"{self.create_and_return_output_dir()}/{base_file_name}.events",
+                    block=not remote.live_mode, threaded=gvars.CONF['async_datalog'])
+            else:
+                self.datalog = LogWriter(open(f"{self.create_and_return_output_dir()}/{base_file_name}.log", "w"),
+                    block=not remote.live_mode, threaded=gvars.CONF['async_datalog'])
         self.datalog_buffer = ""
+        # Only monitors trading on their own ticker are measured
+        self.latencies = StageLatencies.for_ticker(ticker) if not self.test and gvars.CONF['latency_stats'] else NoLatencies()
+        self.latencies_reported = time.time()
+        self.tick_received = None # type: int # perf_counter_ns of the tick being processed
+        if not self.test and gvars.CONF['allocation_profile'] is not None:
+            self.allocations = AllocationProfile(ticker, gvars.CONF['allocation_profile'])
+        else:
+            self.allocations = NoAllocationProfile()
         self.datalog_final = open(f"{self.create_and_return_output_dir()}/{base_file_name}_final.log", "w")
 
 
-    def price_change(self, tickType, price, price_time):
-        with self.price_change_lock:
-            if tickType != 4:
-                return
+    # Live ticks of every type, from the reader thread
+    def record_tick(self, tickType, price, price_time):
+        self.recorder.record(tickType, price, price_time)
+
+
+    # received is when the remote got the tick, orders placed for it are measured from then
+    def price_change(self, tickType, price, price_time, received=None):
+        if tickType != 4:
+            return
+        with self.price_change_lock, self.allocations:
+            self.tick_received = received if received is not None else time.perf_counter_ns()
             for monitor in self.child_test_monitors:
-                monitor.price_change(tickType, price, price_time)
-            cdp = ChartDataPoint(price, price_time)
+                monitor.price_change(tickType, price, price_time, received)
+            start = lap = self.latencies.start()
+            jump = 0
             if len(self.data) > 0:
-                if self.data[-1].price == price:
+                if self.data.last_price() == price:
                     return
-                self.data[-1].duration = cdp.time - self.data[-1].time
-                cdp.jump = self.ticks(cdp.price - self.data[-1].price)
-
-            # Stats
-            cdp.price_data_length = len(self.data_since(900))
-            cdp.density_points_length = len(self.density.list_dps)
-            cdp.acc_pnl = self.results.acc_pnl()
-            cdp.nr_of_trades = self.position.nr_of_trades
-            cdp.action = self.cdp_action_buffer; self.cdp_action_buffer = ""
-            cdp.position = self.position.position
-
-            self.data.append(cdp)
+                jump = self.ticks(price - self.data.last_price())
+
+            self.data.append(price, price_time, jump,
+                # Stats
+                price_data_length = len(self.data_since(900)),
+                density_points_length = len(self.density.list_dps),
+                acc_pnl = self.results.acc_pnl(),
+                nr_of_trades = self.position.nr_of_trades,
+                action = self.cdp_action_buffer,
+                position = self.position.position
+            )
+            self.cdp_action_buffer = ""
 
             if len(self.data) == 1:
                 self.initial_time = int(self.data[0].time)
+            lap = self.latencies.lap('stats', lap)
 
             if not self.test and (self.remote.live_mode or len(self.data) % 50 == 0):
                 output = (
@@ -105,48 +155,62 @@ class Monitor:
                 )
                 print(output)
                 self.datalog_final.write(f"{output}\n")
+                lap = self.latencies.lap('progress', lap)
             
             if gvars.args.data_mode():
                 return
 
             self.set_last_height_and_trend()
+            lap = self.latencies.lap('trend', lap)
 
             self.density.price_change()
+            lap = self.latencies.lap('density', lap)
 
             self.speed.price_change()
+            lap = self.latencies.lap('speed', lap)
 
             self.breaking.price_change()
+            lap = self.latencies.lap('breaking', lap)
 
             self.position.price_change()
+            lap = self.latencies.lap('position', lap)
 
             self.process_params()
+            lap = self.latencies.lap('process_params', lap)
 
             self.query_and_decision()
+            lap = self.latencies.lap('query_and_decision', lap)
 
             self.log_data()
+            self.latencies.lap('log_data', lap)
+            self.latencies.lap('total', start)
+
+            if self.remote.live_mode and not self.test and time.time() - self.latencies_reported > gvars.CONF['latency_report_interval']:
+                self.latencies_reported = time.time()
+                print(self.latencies.state_str())
 
 
+    # Heights are derived from the trends in TickStore.height
     def set_last_height_and_trend(self):
-        if len(self.data) == 1:
-            self.data[-1].trend = 1 # Arbitrary, could be -1
+        if self.data.batch is not None:
+            return # Trends come precomputed from the batch
+        price, trend, last = self.data.price, self.data.trend, len(self.data) - 1 - self.data.offset
+        if last == 0:
+            trend[last] = 1 # Arbitrary, could be -1
             return
 
-        if self.data[-1].price > self.data[-2].price:
-            new_trend = self.ticks(self.data[-1].price - self.data[-2].price)
-            if self.data[-2].trend > 0:
-                self.data[-1].trend = self.data[-2].trend + new_trend
-                self.data[-2].height = gvars.HEIGHT["mid"]
+        if price[last] > price[last-1]:
+            new_trend = self.ticks(price[last] - price[last-1])
+            if trend[last-1] > 0:
+                trend[last] = trend[last-1] + new_trend
             else:
-                self.data[-1].trend = new_trend
-                self.data[-2].height = gvars.HEIGHT["min"]
+                trend[last] = new_trend
         else: # They can not be equal
-            new_trend = self.ticks(self.data[-2].price - self.data[-1].price)
-            if self.data[-2].trend < 0:
-                self.data[-1].trend = self.data[-2].trend - new_trend
-                self.data[-2].height = gvars.HEIGHT["mid"]
+            new_trend = self.ticks(price[last-1] - price[last])
+            if trend[last-1] < 0:
+                trend[last] = trend[last-1] - new_trend
             else:
-                self.data[-1].trend = -new_trend
-                self.data[-2].height = gvars.HEIGHT["max"]
+                trend[last] = -new_trend
 
 
     def query_and_decision(self):
@@ -222,12 +286,25 @@ class Monitor:
                 self.action_decision = decision
                 self.position.buy(self.price_plus_ticks(-decision.adjusting_ticks))
                 self.data[-1].action += f"-- BUY LMT {self.price_plus_ticks(-decision.adjusting_ticks)} "
-                self.datalog_buffer += f"    monitor.query_and_decision.decision: {decision.state_str()}\n"
+                self.log_decision(decision, 'buy', self.price_plus_ticks(-decision.adjusting_ticks))
             elif decision.should() == 'sell':
                 self.action_decision = decision
                 self.position.sell(self.price_plus_ticks(+decision.adjusting_ticks))
                 self.data[-1].action += f"-- SELL LMT {self.price_plus_ticks(+decision.adjusting_ticks)} "
-                self.datalog_buffer += f"    monitor.query_and_decision.decision: {decision.state_str()}\n"
+                self.log_decision(decision, 'sell', self.price_plus_ticks(+decision.adjusting_ticks))
+
+
+    def log_decision(self, decision, action, price):
+        if not self.diagnosing('decisions'):
+            return
+        state = decision.state_str()
+        self.datalog_buffer += f"    monitor.query_and_decision.decision: {state}\n"
+        self.log_event('decision', (decision.KIND, action, price, decision.scores_record(), state))
+
+
+    # Whether diagnostics of the level ('decisions' or 'full') should be built
+    def diagnosing(self, level):
+        return self.diagnostics >= gvars.DIAGNOSTICS[level]
 
 
     def position_closed(self, fill_price, fill_time):
@@ -240,43 +317,30 @@ class Monitor:
 
     def position_opened(self, fill_price, fill_time):
         self.cdp_action_buffer += f"-- Filled - Opened position: {self.position.position} - fill_price: {fill_price} "
-        self.datalog_buffer += (f"    Filled at price: {fill_price} - Position: {self.position.position}\n")
+        if self.diagnosing('decisions'):
+            self.datalog_buffer += (f"    Filled at price: {fill_price} - Position: {self.position.position}\n")
 
 
     def last_price(self):
-        return self.data[-1].price
+        return self.data.last_price()
 
     
     def last_time(self):
-        return self.data[-1].time
+        return self.data.last_time()
+
+
+    def history_duration(self):
+        return max(self.prm.max_look_back_time(), 900) + self.HISTORY_MARGIN
 
 
     # the_time could be a specific time or an amount of time since now
+    # Returns a view over self.data, it is not copied
     def data_since(self, time_or_duration):
-        data_since = []
-        for cdp in reversed(self.data):
-            data_since.append(cdp)
-            if cdp.time == time_or_duration:
-                break
-            elif self.last_time() - cdp.time > time_or_duration:
-                data_since.pop() # patch because of adding the element first
-                break
-        data_since.reverse()
-        return data_since
+        return self.data.since(time_or_duration)
 
     
     def time_up_down_since(self, the_time, price):
-        time_up = 0
-        time_equal = 0
-        time_down = 0
-        for cdp in self.data_since(the_time):
-            if cdp.price > price:
-                time_up += cdp.duration
-            elif cdp.price == price:
-                time_equal += cdp.duration
-            else:
-                time_down += cdp.duration
-        return (time_up, time_equal, time_down)
+        return self.data.durations.up_equal_down(self.data_since(the_time).start, price)
 
 
     def min_max_since(self, time_ago):
@@ -286,14 +350,15 @@ class Monitor:
 
 
     def timed_prices(self, time_ago=0, interval=60):
-        data = self.data if time_ago == 0 else self.data_since(time_ago)
-        timed_prices = []
-        initial_time = data[0].time
+        data = self.data.view() if time_ago == 0 else self.data_since(time_ago)
+        prices, times = data.column('price'), data.column('time')
+        timed_prices = TickStore()
+        initial_time = times[0]
         current_interval = 0
         i = 1
-        while i < len(data):
-            if data[i].time - initial_time >= current_interval:
-                timed_prices.append(ChartDataPoint(data[i-1].price, current_interval))
+        while i < len(times):
+            if times[i] - initial_time >= current_interval:
+                timed_prices.append(prices[i-1], current_interval)
                 current_interval += interval
             else:
                 i += 1
@@ -334,7 +399,19 @@ class Monitor:
                 self.output_chart_pnl_against('price_data_length', 'density_points_length')
             if self.remote.live_mode:
                 self.save_data()
+            if gvars.CONF['results_export'] is not None:
+                self.results.export(f"{self.create_and_return_output_dir()}/{self.ticker}_results.{gvars.CONF['results_export']}")
+            if gvars.CONF['latency_stats']:
+                print(self.latencies.state_str())
+                self.datalog_final.write(self.latencies.state_str())
+                StageLatencies.release(self.ticker)
+            if gvars.CONF['allocation_profile'] is not None:
+                self.allocations.close()
+                print(self.allocations.state_str())
+                self.datalog_final.write(self.allocations.state_str())
         self.log_final_data(should_print = not self.remote.live_mode)
+        self.data.close()
+        self.recorder.close()
         self.datalog.close()
         self.datalog_final.close()
 
@@ -353,25 +430,25 @@ class Monitor:
         if kind == 'timed':
             timed_prices = self.timed_prices(interval=15)
             price_source = bokeh.plotting.ColumnDataSource(data=dict(
-                x=list(map(lambda cdp: cdp.time, timed_prices)),
-                y=list(map(lambda cdp: cdp.price, timed_prices))
+                x=list(timed_prices.column('time')),
+                y=list(timed_prices.column('price'))
             ))
         else:
             price_source = bokeh.plotting.ColumnDataSource(data=dict(
-                x=[cdp.time - self.initial_time for cdp in self.data],
-                y=[cdp.price for cdp in self.data],
-                price_data_length=[cdp.price_data_length for cdp in self.data],
-                density_points_length=[cdp.density_points_length for cdp in self.data],
-                acc_pnl=[cdp.acc_pnl for cdp in self.data],
-                nr_of_trades=[cdp.nr_of_trades for cdp in self.data],
-                action=[cdp.action for cdp in self.data],
-                position=[cdp.position for cdp in self.data]
+                x=[t - self.initial_time for t in self.data.column('time')],
+                y=list(self.data.column('price')),
+                price_data_length=list(self.data.column('price_data_length')),
+                density_points_length=list(self.data.column('density_points_length')),
+                acc_pnl=list(self.data.column('acc_pnl')),
+                nr_of_trades=list(self.data.column('nr_of_trades')),
+                action=self.data.column('action'),
+                position=list(self.data.column('position'))
             ))
 
-        min_price = min([cdp.price for cdp in self.data])
+        min_price = min(self.data.column('price'))
         action_source = bokeh.plotting.ColumnDataSource(data=dict(
-            x=[cdp.time - self.initial_time for cdp in self.data],
-            y=[cdp.price if cdp.action != "" else min_price for cdp in self.data]
+            x=[t - self.initial_time for t in self.data.column('time')],
+            y=[price if action != "" else min_price for price, action in zip(self.data.column('price'), self.data.column('action'))]
         ))
         
         TOOLTIPS = [
@@ -437,12 +514,12 @@ class Monitor:
         from bokeh.models.ranges import Range1d
         from bokeh.models.axes import LinearAxis
 
-        time = [cdp.time - self.initial_time for cdp in self.data]
-        price = [cdp.price for cdp in self.data]
-        price_data_length = [cdp.price_data_length for cdp in self.data]
-        density_points_length = [cdp.density_points_length for cdp in self.data]
-        acc_pnl = [cdp.acc_pnl for cdp in self.data]
-        nr_of_trades = [cdp.nr_of_trades for cdp in self.data]
+        time = [t - self.initial_time for t in self.data.column('time')]
+        price = list(self.data.column('price'))
+        price_data_length = list(self.data.column('price_data_length'))
+        density_points_length = list(self.data.column('density_points_length'))
+        acc_pnl = list(self.data.column('acc_pnl'))
+        nr_of_trades = list(self.data.column('nr_of_trades'))
 
         pnl_source = bokeh.plotting.ColumnDataSource(data=dict(
             x=time,
@@ -494,41 +571,99 @@ class Monitor:
         bokeh.plotting.save(p)
 
 
+    # The quotes file has the last trades too, the .ticks file is only saved without quotes
     def save_data(self):
-        file_name = f"{self.create_and_return_output_dir()}/{self.ticker}_live_{time.strftime('%Y-%m-%d|%H-%M')}.json"
-        if os.path.isfile(file_name):
-            return
-        mapped_data = list(map(lambda cdp: (cdp.time, cdp.price), self.data))
-        with open(file_name, "w") as f:
-            json.dump(mapped_data, f)
+        file_name = f"{self.create_and_return_output_dir()}/{self.ticker}_live_{time.strftime('%Y-%m-%d|%H-%M')}"
+        if len(self.recorder) > 0:
+            if os.path.isfile(f"{file_name}.quotes"):
+                return
+            times, prices, kinds = self.recorder.all_ticks()
+            save_quotes(f"{file_name}.quotes", times, prices, kinds, self.ticker, self.prm.tick_price, self.prm.price_precision)
+        else:
+            if os.path.isfile(f"{file_name}.ticks"):
+                return
+            times, prices = self.data.all_ticks()
+            save_ticks(f"{file_name}.ticks", times, prices, self.ticker, self.prm.tick_price, self.prm.price_precision)
 
 
     def log_data(self):
-        if self.test:
+        if self.test or not self.diagnosing('decisions'):
             self.datalog_buffer = ""
             return
-        self.datalog.write(
-            f"\n=>{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_time()))}"
-            f"({self.last_time():.2f} - {int(self.last_time()) - self.initial_time}): {self.last_price():.{self.prm.price_precision}f}\n"
-        )
-        self.datalog.write(self.density.state_str())
-        self.datalog.write(self.speed.state_str())
-        self.datalog.write(self.breaking.state_str())
-        self.datalog.write(self.position.state_str())
-        self.datalog.write(self.results.state_str())
-        
-        if self.datalog_buffer != "":
-            self.datalog.write("  DATALOG_BUFFER:\n")
-            self.datalog.write(self.datalog_buffer)
-            self.datalog_buffer = ""
+        tick = ('tick', (self.last_time(), self.initial_time, self.last_price(), self.prm.price_precision))
+        results = ('results', self.results.state_str()) # Only not empty after a trade
+        if self.diagnosing('full'):
+            record = (
+                tick,
+                ('density', self.density.state_record()),
+                ('speed', self.speed.state_record()),
+                ('breaking', self.breaking.state_record()),
+                ('position', self.position.state_record()),
+                results,
+                ('datalog_buffer', self.datalog_buffer)
+            )
+        elif self.datalog_buffer != "" or results[1] != "":
+            record = (tick, results, ('datalog_buffer', self.datalog_buffer))
+        else:
+            return
+        self.datalog_buffer = ""
+        if gvars.CONF['datalog_format'] == 'events':
+            for event_type, payload in record:
+                if payload:
+                    self.datalog.write_event(event_type, payload)
+        else:
+            # Rendered by the datalog thread
+            self.datalog.write_record(Monitor.render_log_data, record)
+
+
+    # Order, fills and decisions only go to the events datalog
+    def log_event(self, event_type, payload):
+        if not self.test and gvars.CONF['datalog_format'] == 'events' and self.diagnosing('decisions'):
+            self.datalog.write_event(event_type, payload)
+
+
+    @staticmethod
+    def render_log_data(record):
+        return "".join(Monitor.render_event(event_type, payload) for event_type, payload in record)
+
+
+    @staticmethod
+    def render_event(event_type, payload):
+        if event_type == 'tick':
+            last_time, initial_time, last_price, price_precision = payload
+            return (
+                f"\n=>{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_time))}"
+                f"({last_time:.2f} - {int(last_time) - initial_time}): {last_price:.{price_precision}f}\n"
+            )
+        elif event_type == 'density':
+            return Density.render_state(payload)
+        elif event_type == 'speed':
+            return Speed.render_state(payload)
+        elif event_type == 'breaking':
+            return Breaking.render_state(payload)
+        elif event_type == 'position':
+            return Position.render_state(payload)
+        elif event_type == 'datalog_buffer':
+            return f"  DATALOG_BUFFER:\n{payload}" if payload != "" else ""
+        elif event_type == 'decision':
+            kind, action, price, scores, state = payload
+            return f"  DECISION {kind} {action} at {price}: {state}\n"
+        elif event_type == 'order':
+            order_id, action, quantity, price, order_time = payload
+            return f"  ORDER {order_id}: {action} {quantity} at {price if price is not None else 'MKT'} ({order_time:.4f})\n"
+        elif event_type == 'order_status':
+            order_id, status, remaining, fill_price, fill_time = payload
+            return f"  ORDER STATUS {order_id}: {status}, remaining: {remaining}, fill_price: {fill_price} ({fill_time:.4f})\n"
+        else: # results and text
+            return payload
 
 
     def log_final_data(self, should_print):
         output = "\nFINAL DATA\n"
         output += self.results.state_str('stats')
         print(output) if should_print else None
-        min_max = self.min_max_since(86400*7)
-        output += f"  Max ticks: {self.ticks(min_max[1].price - min_max[0].price)}\n"
+        min_price, max_price = self.data.min_max_price(TickStore.EXTREMES_DURATION)
+        output += f"  Max ticks: {self.ticks(max_price - min_price)}\n"
         output += f"  Data points: {len(self.data)}\n"
         output += self.prm.state_str()
         output += self.results.state_str('all')
@@ -542,12 +677,16 @@ class Monitor:
         if not self.test:
             return
         self.prm.attach_last_result()
-        if ((gvars.CONF['accepting_average_pnl'] is None or self.prm.last_result['average_pnl'] >= gvars.CONF['accepting_average_pnl'])
+        if self.params_accepted():
+            self.remote.store_params(self.prm)
+
+
+    def params_accepted(self):
+        return ((gvars.CONF['accepting_average_pnl'] is None or self.prm.last_result['average_pnl'] >= gvars.CONF['accepting_average_pnl'])
                     and
                 (gvars.CONF['accepting_trade_number'] is None or (self.prm.last_result['nr_of_winners'] + self.prm.last_result['nr_of_loosers']) >= gvars.CONF['accepting_trade_number'])
                     and
-                self.data[-1].time - self.data[0].time > 3600 * 4):
-            ParamsDb.gi().add_or_modify(self.prm)
+                self.last_time() - self.data.first_time > 3600 * 4)
 
 
     def process_params(self):
@@ -574,7 +713,7 @@ class Monitor:
                 elif monitor_average_pnl > gvars.CONF['accepting_average_pnl']:
                     print(f"Saving params on child monitors with avg_pnl of {monitor_average_pnl}")
                     monitor.prm.attach_last_result(gvars.CONF['dynamic_parameter_change'])
-                    ParamsDb.gi().add_or_modify(monitor.prm)
+                    self.remote.store_params(monitor.prm)
                 # # In case we don't want to reset results.
                 # # Identical to above block but without reseting results
                 # if (len(monitor.results.data) >= 30 and
@@ -611,16 +750,30 @@ class Monitor:
         self.speed = Speed(self)
 
 
-    def order_change(self, order_id, status, remaining, fill_price, fill_time):
+    def order_change(self, order_id, status, remaining, fill_price, fill_time, received=None):
         with self.order_change_lock:
+            if received is not None:
+                self.remote.order_latencies.status_delivered(self.ticker, received, time.perf_counter_ns())
+            self.log_event('order_status', (order_id, status, remaining, fill_price, fill_time))
             self.position.order_change(order_id, status, remaining, fill_price, fill_time)
 
 
+    def flush_logs(self):
+        self.datalog.flush()
+        self.datalog_final.flush()
+
+
     def create_children(self, number):
         for i in range(number):
             self.child_test_monitors.append(Monitor(self.ticker, self.remote, None))
 
 
+    def set_tick_batch(self, batch):
+        self.data = TickStore(batch)
+        for monitor in self.child_test_monitors:
+            monitor.set_tick_batch(batch)
+
+
     def assign_params(self, params, randomize=False):
         self.prm = params
         self.prm.assign_monitor(self)
@@ -636,21 +789,3 @@ class Monitor:
             pass
         return new_dir_name
 
-
-class ChartDataPoint:
-    def __init__(self, price, time):
-        self.price = price
-        self.time = time
-        self.duration = 0
-        self.jump = 0 # distance (in ticks) from previous price
-        self.height = gvars.HEIGHT['mid'] # min - mid - max
-        self.trend = None # type: int # distance (in ticks) from min or max
-        # self.slope = 0
-        
-        # Stats fields (should they be in different class?)
-        self.price_data_length = None # type: int
-        self.density_points_length = None # type: int
-        self.acc_pnl = None # type: int
-        self.nr_of_trades = None # type: int
-        self.action = None # type: string
-        self.position = None # type: int
\ No newline at end of file
@@ -1,6 +1,25 @@
 import random
 import statistics
 import time
+import itertools
+
+# ticker code -> (tick_price, price_precision, dollar_multiplier)
+BASIC_PARAMETERS = {
+    'ES': (0.25, 2, 50),
+    'NQ': (0.25, 2, 20),
+    'YM': (1, 2, 20),
+    'CL': (0.01, 2, 1000),
+    'NG': (0.001, 3, 10000),
+    'GC': (0.10, 2, 100),
+    'HG': (0.0005, 4, 5000),
+    'SI': (0.005, 3, 5000),
+    'EU': (0.00005, 5, 125000),
+    'JP': (0.0000005, 7, 12500000),
+    'ZB': (0.03125, 5, 1000),
+    'ZN': (0.015625, 6, 1000),
+    'ZC': (0.25, 2, 50),
+    'ZS': (0.25, 2, 50)
+}
 
 class Params:
     def __init__(self):
@@ -18,75 +37,8 @@ class Params:
 
 
     def set_basic_parameters(self):
-        if self.m.ticker_code() == "ES":
-            self.tick_price = 0.25
-            self.price_precision = 2
-            self.dollar_multiplier = 50
-        
-        elif self.m.ticker_code() == "NQ":
-            self.tick_price = 0.25
-            self.price_precision = 2
-            self.dollar_multiplier = 20
-        
-        elif self.m.ticker_code() == "YM":
-            self.tick_price = 1
-            self.price_precision = 2
-            self.dollar_multiplier = 20
-        
-        elif self.m.ticker_code() == "CL":
-            self.tick_price = 0.01
-            self.price_precision = 2
-            self.dollar_multiplier = 1000
-        
-        elif self.m.ticker_code() == "NG":
-            self.tick_price = 0.001
-            self.price_precision = 3
-            self.dollar_multiplier = 10000
-        
-        elif self.m.ticker_code() == "GC":
-            self.tick_price = 0.10
-            self.price_precision = 2
-            self.dollar_multiplier = 100
-        
-        elif self.m.ticker_code() == "HG":
-            self.tick_price = 0.0005
-            self.price_precision = 4
-            self.dollar_multiplier = 5000
-        
-        elif self.m.ticker_code() == "SI":
-            self.tick_price = 0.005
-            self.price_precision = 3
-            self.dollar_multiplier = 5000
-        
-        elif self.m.ticker_code() == "EU":
-            self.tick_price = 0.00005
-            self.price_precision = 5
-            self.dollar_multiplier = 125000
-        
-        elif self.m.ticker_code() == "JP":
-            self.tick_price = 0.0000005
-            self.price_precision = 7
-            self.dollar_multiplier = 12500000
-        
-        elif self.m.ticker_code() == "ZB":
-            self.tick_price = 0.03125
-            self.price_precision = 5
-            self.dollar_multiplier = 1000
-        
-        elif self.m.ticker_code() == "ZN":
-            self.tick_price = 0.015625
-            self.price_precision = 6
-            self.dollar_multiplier = 1000
-        
-        elif self.m.ticker_code() == "ZC":
-            self.tick_price = 0.25
-            self.price_precision = 2
-            self.dollar_multiplier = 50
-        
-        elif self.m.ticker_code() == "ZS":
-            self.tick_price = 0.25
-            self.price_precision = 2
-            self.dollar_multiplier = 50
+        if self.m.ticker_code() in BASIC_PARAMETERS:
+            self.tick_price, self.price_precision, self.dollar_multiplier = BASIC_PARAMETERS[self.m.ticker_code()]
 
         self.max_breaking_price_changes_list = 50
         self.min_breaking_price_changes_list = 20
@@ -140,6 +92,11 @@ class Params:
                 setattr(self, variable.replace('_options', ''), value[0])
 
 
+    # Longest time any component looks back, whatever the options chosen
+    def max_look_back_time(self):
+        return max(self.primary_look_back_time_options + self.speeding_time_options)
+
+
     def randomize(self):
         for variable, value in vars(self).items():
             if variable[-8:] == '_options':
@@ -147,6 +104,18 @@ class Params:
         self.id = None # without any id, ParamsDb will assign a new one and save it as new
 
 
+    # Every combination of the options of the given variables, the rest keep their defaults
+    @classmethod
+    def grid(cls, variables):
+        options = [getattr(cls(), variable + '_options') for variable in variables]
+        for values in itertools.product(*options):
+            params = cls()
+            for variable, value in zip(variables, values):
+                setattr(params, variable, value)
+            params.id = None # New params, as with randomize
+            yield params
+
+
     @property
     def min_breaking_price_changes(self):
         if self._min_breaking_price_changes == 'calc':
@@ -167,10 +136,7 @@ class Params:
             if len(self.m.results.data) < 20:
                 return self.default('_max_winning_ticks')
             else:
-                try:
-                    return statistics.mode(r.fantasy_pnl for r in self.m.results.data)
-                except statistics.StatisticsError:
-                    return self.default('_max_winning_ticks')
+                return self.m.results.fantasy_pnl_mode()
         else:
             return self._max_winning_ticks
 
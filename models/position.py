@@ -40,7 +40,8 @@ class Position:
 
         self.remote.place_order(self.m, "BUY", CONTRACT_NR, price, test=self.m.test)
 
-        self.m.datalog_buffer += (f"    Order to BUY at {price}\n")
+        if self.m.diagnosing('decisions'):
+            self.m.datalog_buffer += (f"    Order to BUY at {price}\n")
         logging.info("+++++ Buy called ++++++")
 
 
@@ -56,7 +57,8 @@ class Position:
 
         self.remote.place_order(self.m, "SELL", CONTRACT_NR, price, test=self.m.test)
 
-        self.m.datalog_buffer += (f"    Order to SELL at {price}\n")
+        if self.m.diagnosing('decisions'):
+            self.m.datalog_buffer += (f"    Order to SELL at {price}\n")
         logging.info("+++++ Sell called ++++++")
 
 
@@ -88,7 +90,8 @@ class Position:
         else:
             assert False # should never get here
 
-        self.m.datalog_buffer += (f"    Order to close at {price}\n")
+        if self.m.diagnosing('decisions'):
+            self.m.datalog_buffer += (f"    Order to close at {price}\n")
         logging.info("+++++ Close Called ++++++")
 
 
@@ -98,7 +101,8 @@ class Position:
         pending_order_id = self.pending_order_id
         self.pending_order_id = POI['local']
         self.remote.cancel_order(pending_order_id, test=self.m.test)
-        self.m.datalog_buffer += (f"    Order to cancel - Position: {self.position}\n")
+        if self.m.diagnosing('decisions'):
+            self.m.datalog_buffer += (f"    Order to cancel - Position: {self.position}\n")
 
 
     def is_pending(self):
@@ -119,9 +123,10 @@ class Position:
 
 
     def order_change(self, order_id, status, remaining, fill_price, fill_time):
-        self.m.datalog_buffer += (f"    position.order_change.order_id: {order_id}\n")
-        self.m.datalog_buffer += (f"    position.order_change.status: {status}\n")
-        self.m.datalog_buffer += (f"    position.order_change.remaining: {remaining}\n")
+        if self.m.diagnosing('decisions'):
+            self.m.datalog_buffer += (f"    position.order_change.order_id: {order_id}\n")
+            self.m.datalog_buffer += (f"    position.order_change.status: {status}\n")
+            self.m.datalog_buffer += (f"    position.order_change.remaining: {remaining}\n")
         
         if status == "Filled":
             self.pending_order_id = POI['none']
@@ -150,22 +155,42 @@ class Position:
 
 
     def state_str(self):
-        output = ""
+        return type(self).render_state(self.state_record())
+
+
+    # Snapshot of the values shown by state_str
+    def state_record(self):
+        details = None
         if self.is_active() or self.is_pending():
+            details = (self.nr_of_trades, self.position, self.pending_order_id, self.pending_position,
+                self.order_price, self.order_time)
+        if details is None and self.ap is None:
+            return None
+        return (self.m.prm.price_precision, details, self.ap.state_record() if self.ap is not None else None)
+
+
+    @staticmethod
+    def render_state(record):
+        if record is None:
+            return ""
+        price_precision, details, ap = record
+        output = ""
+        if details is not None:
+            nr_of_trades, position, pending_order_id, pending_position, order_price, order_time = details
             output += (
                 f"  POSITION:\n"
-                f"    nr_of_trades: {self.nr_of_trades}\n"
-                f"    position: {self.position}\n"
-                f"    pending_order_id: {self.pending_order_id}\n"
-                f"    pending_position: {self.pending_position}\n"
+                f"    nr_of_trades: {nr_of_trades}\n"
+                f"    position: {position}\n"
+                f"    pending_order_id: {pending_order_id}\n"
+                f"    pending_position: {pending_position}\n"
             )
-            if self.order_price is not None and self.order_time is not None:
+            if order_price is not None and order_time is not None:
                 output += (
-                    f"    order_price: {self.order_price:.{self.m.prm.price_precision}f}\n"
-                    f"    order_time: {self.order_time:.4f}\n"
+                    f"    order_price: {order_price:.{price_precision}f}\n"
+                    f"    order_time: {order_time:.4f}\n"
                 )
-        if self.ap is not None:
-            output += self.ap.state_str()
+        if ap is not None:
+            output += ActivePosition.render_state(ap)
         return output
 
 
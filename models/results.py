@@ -1,40 +1,98 @@
-import statistics
+from array import array
 
+from lib.columns import save_columns, save_csv
+from models.breaking_decision import BreakingDecision
+from models.speeding_decision import SpeedingDecision
+
+DECISION_TYPES = {decision_type.KIND: decision_type for decision_type in (BreakingDecision, SpeedingDecision)}
+DECISION_CODES = {None: 0, 'breaking': 1, 'speeding': 2} # decision column of the export
+
+# Results of the trades of a monitor.
+# Statistics are kept as the results are appended, in ticks so the sums are
+# exact: cumulative sums (like PriceLevelDurations) answer the ones over the
+# last N results with a subtraction and the totals are their last value.
 class Results:
     def __init__(self, monitor):
         self.m = monitor
         self.data = []
         self.show_results_history = False
+        # Cumulative by result, starting with 0 for no results
+        self._pnl_ticks = array('q', [0])
+        self._winners = array('q', [0])
+        self._loosers = array('q', [0])
+        # Totals
+        self._fantasy_pnl_ticks = 0
+        self._winners_pnl_ticks = 0
+        self._loosers_pnl_ticks = 0
+        # Mode of fantasy pnl, the first one found on ties (as statistics.mode)
+        self._fantasy_counts = {} # ticks -> [count, order found]
+        self._fantasy_mode = None # type: int
 
 
     def append(self, pnl, fantasy_pnl, fluctuation, reversal, order_time, start_time, end_time):
-    	self.show_results_history = True
-    	self.data.append(Result(pnl, fantasy_pnl, fluctuation, reversal, self.m.action_decision, self.pnl(),
+        self.show_results_history = True
+        decision = self.m.action_decision.summary() if self.m.action_decision is not None else None
+        self.data.append(Result(pnl, fantasy_pnl, fluctuation, reversal, decision, self.pnl(),
             order_time, start_time, end_time, self.m.initial_time))
+        pnl_ticks = self.m.ticks(pnl)
+        self._pnl_ticks.append(self._pnl_ticks[-1] + pnl_ticks)
+        self._winners.append(self._winners[-1] + (pnl_ticks > 0))
+        self._loosers.append(self._loosers[-1] + (pnl_ticks < 0))
+        if pnl_ticks > 0:
+            self._winners_pnl_ticks += pnl_ticks
+        elif pnl_ticks < 0:
+            self._loosers_pnl_ticks += pnl_ticks
+        fantasy_ticks = self.m.ticks(fantasy_pnl)
+        self._fantasy_pnl_ticks += fantasy_ticks
+        self.count_fantasy_pnl(fantasy_ticks)
+
+
+    def count_fantasy_pnl(self, fantasy_ticks):
+        counts = self._fantasy_counts.get(fantasy_ticks)
+        if counts is None:
+            counts = self._fantasy_counts[fantasy_ticks] = [0, len(self._fantasy_counts)]
+        counts[0] += 1
+        if self._fantasy_mode is None:
+            self._fantasy_mode = fantasy_ticks
+            return
+        mode_counts = self._fantasy_counts[self._fantasy_mode]
+        if counts[0] > mode_counts[0] or (counts[0] == mode_counts[0] and counts[1] < mode_counts[1]):
+            self._fantasy_mode = fantasy_ticks
+
+
+    def price(self, ticks):
+        return round(ticks * self.m.prm.tick_price, self.m.prm.price_precision)
+
+
+    # Position in the cumulative arrays where the last results start
+    def first(self, last):
+        return 0 if not last else max(0, len(self.data) - last) # data[-0:] was every result too
 
 
     def pnl(self, last=None):
-        data = self.data if last is None else self.data[-last:]
-        return sum(map(lambda r: r.pnl, data))
+        return self.price(self._pnl_ticks[-1] - self._pnl_ticks[self.first(last)])
 
     def nr_of_wl(self, x, last=None):
-        data = self.data if last is None else self.data[-last:]
         assert x in ('winners', 'loosers')
-        multi = 1 if x == 'winners' else -1
-        return len([r.pnl for r in data if multi * r.pnl > 0])
+        cumulative = self._winners if x == 'winners' else self._loosers
+        return cumulative[-1] - cumulative[self.first(last)]
 
     def average_pnl(self, last=None):
-        data = self.data if last is None else self.data[-last:]
-        return (sum(map(lambda r: r.pnl, data)) / len(data)) if len(data) > 0 else 0
+        first = self.first(last)
+        length = len(self.data) - first
+        return (self._pnl_ticks[-1] - self._pnl_ticks[first]) * self.m.prm.tick_price / length if length > 0 else 0
 
     def average_wl(self, x):
         assert x in ('winners', 'loosers')
-        multi = 1 if x == 'winners' else -1
-        results = [r.pnl for r in self.data if multi * r.pnl > 0]
-        return statistics.mean(results) if len(results) > 0 else 0
+        count = self.nr_of_wl(x)
+        pnl_ticks = self._winners_pnl_ticks if x == 'winners' else self._loosers_pnl_ticks
+        return pnl_ticks * self.m.prm.tick_price / count if count > 0 else 0
     
     def fantasy_pnl(self):
-        return sum(map(lambda r: r.fantasy_pnl, self.data))
+        return self.price(self._fantasy_pnl_ticks)
+
+    def fantasy_pnl_mode(self):
+        return self.price(self._fantasy_mode) if self._fantasy_mode is not None else None
 
     def total_trades(self):
         return len(self.data)
@@ -43,6 +101,32 @@ class Results:
         return self.data[-1].acc_pnl if len(self.data) > 0 else 0
 
 
+    # One column per Result field, the decision as its DECISION_CODES code,
+    # direction and trend pattern, and a column per score name
+    def columns(self):
+        columns = {name: array('d', (getattr(result, name) for result in self.data)) for name in (
+            'pnl', 'fantasy_pnl', 'fluctuation', 'reversal', 'acc_pnl', 'order_time', 'start_time', 'end_time')}
+        columns['decision'] = array('b', (DECISION_CODES[result.decision_kind()] for result in self.data))
+        columns['direction'] = array('b', (result.decision[1] or 0 if result.decision else 0 for result in self.data))
+        columns['trend_pattern'] = array('b', (result.decision[2] if result.decision else 0 for result in self.data))
+        score_names = []
+        for result in self.data:
+            for name, score in result.scores():
+                if name not in score_names:
+                    score_names.append(name)
+        for name in score_names:
+            columns[name] = array('i', (dict(result.scores()).get(name, 0) for result in self.data))
+        return columns
+
+
+    # As csv or as a binary columns file (see lib/columns.py), by the extension
+    def export(self, file_name):
+        if file_name.endswith(".csv"):
+            save_csv(file_name, self.columns())
+        else:
+            save_columns(file_name, self.columns())
+
+
     def state_str(self, *pshow):
         show = ('last', 'stats') if len(pshow) == 0 else pshow
         output = ""
@@ -72,6 +156,10 @@ class Results:
 
 
 class Result:
+    __slots__ = ('pnl', 'fantasy_pnl', 'fluctuation', 'reversal', 'decision', 'acc_pnl', 'order_time',
+        'start_time', 'end_time', 'initial_time')
+
+    # decision is the Decision.summary() of the decision of the trade
     def __init__(self, pnl, fantasy_pnl, fluctuation, reversal, decision, acc_pnl, order_time, start_time, end_time, initial_time):
         self.pnl = pnl
         self.fantasy_pnl = fantasy_pnl
@@ -89,6 +177,20 @@ class Result:
         return self.start_time == 0
 
 
+    def decision_kind(self):
+        return self.decision[0] if self.decision is not None else None
+
+
+    def scores(self):
+        return self.decision[3] if self.decision is not None else ()
+
+
+    def decision_str(self):
+        if self.decision is None:
+            return ""
+        return DECISION_TYPES[self.decision[0]].render_state(self.decision)
+
+
     def state_str(self, price_precision = 2):
         output = (
             f"pnl: {self.pnl:+.{price_precision}f}, "
@@ -99,6 +201,6 @@ class Result:
             f"o_time: {self.order_time - self.initial_time:>8.1f}, "
             f"s_time: {self.start_time - self.initial_time:>8.1f}, "
             f"e_time: {self.end_time - self.initial_time:>8.1f}, "
-            f"decision: ({self.decision.state_str()}), "
+            f"decision: ({self.decision_str()}), "
         )
         return output
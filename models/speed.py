@@ -1,19 +1,51 @@
+from collections import deque
+
+from lib.rolling import RollingExtremum
+
 class Speed:
     def __init__(self, monitor):
         self.m = monitor
 
-        self.time_speed = []
+        self.time_speed = deque()
         self.time_speeding_points = []
 
         self._speed_min_time_passed = False
         self._last_time_speeding_time = None # type: int
         self._show_full_list_in_state_str = True
 
+        # Rolling values over the price data (by tick index)
+        self._max_price = RollingExtremum()
+        self._min_price = RollingExtremum(maximum=False)
+        self._max_jump = RollingExtremum(key=abs)
+        self._last_non_positive_trend = -1
+        self._last_non_negative_trend = -1
+        # Rolling values over time_speed (by number of speed points added)
+        self._time_speed_max_ticks = RollingExtremum()
+        self._time_speed_min_ticks = RollingExtremum(maximum=False)
+        self._time_speed_added = 0
+
+        data = self.m.data_since(self.m.prm.speeding_time)
+        for i in range(data.start, data.stop):
+            self.add_tick(i)
+
 
     def price_change(self):
+        self.add_tick(len(self.m.data) - 1)
         self.update_time_speed()
 
 
+    def add_tick(self, index):
+        data = self.m.data
+        i = index - data.offset
+        self._max_price.push(index, data.price[i])
+        self._min_price.push(index, data.price[i])
+        self._max_jump.push(index, data.jump[i])
+        if data.trend[i] <= 0:
+            self._last_non_positive_trend = index
+        if data.trend[i] >= 0:
+            self._last_non_negative_trend = index
+
+
     def find_criteria_speeding(self):
         pass
         # data = self.m.data_since(self.m.prm.speeding_time)
@@ -45,19 +77,28 @@ class Speed:
             return
 
         # Create Speed point
+        start = price_data.start
         speed_point = SpeedPoint(
             ticks = self.m.ticks(price_data[-1].price - price_data[0].price),
-            max_ticks = self.m.ticks(max(price_data, key=lambda cdp: cdp.price).price - min(price_data, key=lambda cdp: cdp.price).price),
+            max_ticks = self.m.ticks(self._max_price.get(start) - self._min_price.get(start)),
             price = price_data[-1].price,
             time = price_data[-1].time,
             changes = len(price_data) - 1, # -1 because it includes the change already counted before
-            max_jump = max(price_data, key=lambda cdp: abs(cdp.jump)).jump,
-            run = all(pd.trend > 0 for pd in price_data) or all(pd.trend < 0 for pd in price_data)
+            max_jump = self._max_jump.get(start),
+            run = self._last_non_positive_trend < start or self._last_non_negative_trend < start
         )
 
+        # Later windows can't start before the current ones
+        keep_from = min(start, self.m.data_since(self.m.prm.speeding_time).start)
+        for rolling in (self._max_price, self._min_price, self._max_jump):
+            rolling.discard_before(keep_from)
+
         # Add to time speed
         if speed_point.ticks <= -4 or speed_point.ticks >= 4:
             self.time_speed.append(speed_point)
+            self._time_speed_max_ticks.push(self._time_speed_added, speed_point.ticks)
+            self._time_speed_min_ticks.push(self._time_speed_added, speed_point.ticks)
+            self._time_speed_added += 1
 
         # Return if not enough info
         if len(self.time_speed) == 0:
@@ -69,14 +110,16 @@ class Speed:
 
         # Remove old data
         while len(self.time_speed) > 0 and price_data[-1].time - self.time_speed[0].time > self.m.prm.primary_look_back_time:
-            self.time_speed.pop(0)
+            self.time_speed.popleft()
+        self._time_speed_max_ticks.discard_before(self._time_speed_added - len(self.time_speed))
+        self._time_speed_min_ticks.discard_before(self._time_speed_added - len(self.time_speed))
 
         # Current decision
         if len(self.time_speeding_points) == 0:
-            if 4 <= speed_point.ticks >= max(self.time_speed, key=lambda sp: sp.ticks).ticks * 0.75:
+            if 4 <= speed_point.ticks >= self._time_speed_max_ticks.get() * 0.75:
                 self._last_time_speeding_time = price_data[-1].time
                 self.time_speeding_points = [speed_point]
-            elif -4 >= speed_point.ticks <= min(self.time_speed, key=lambda sp: sp.ticks).ticks * 0.75:
+            elif -4 >= speed_point.ticks <= self._time_speed_min_ticks.get() * 0.75:
                 self._last_time_speeding_time = price_data[-1].time
                 self.time_speeding_points = [speed_point]
         elif len(self.time_speeding_points) <= self.m.prm.time_speeding_points_length - 1: # <= X if want to have X + 1 max speeding points
@@ -97,20 +140,34 @@ class Speed:
 
 
     def state_str(self):
-        output = ""
-        if len(self.time_speeding_points) > 0:
-            output += "  SPEED:\n"
-            if self._show_full_list_in_state_str:
-                self._show_full_list_in_state_str = False
-                high_percentile = max(self.time_speed, key=lambda sp: sp.ticks).ticks * 0.75
-                min_percentile = min(self.time_speed, key=lambda sp: sp.ticks).ticks * 0.75
-                output += "    time_speed:\n"
-                for sp in self.time_speed:
-                    if sp.ticks <= min_percentile or sp.ticks >= high_percentile:
-                        output += f"      {sp.state_str(self.m.prm.price_precision)}\n"
-            output += "    time_speeding_points:\n"
-            for sp in self.time_speeding_points:
-                output += f"      {sp.state_str(self.m.prm.price_precision)}\n"
+        return type(self).render_state(self.state_record())
+
+
+    def state_record(self):
+        if len(self.time_speeding_points) == 0:
+            return None
+        time_speed = None
+        if self._show_full_list_in_state_str:
+            self._show_full_list_in_state_str = False
+            high_percentile = self._time_speed_max_ticks.get() * 0.75
+            min_percentile = self._time_speed_min_ticks.get() * 0.75
+            time_speed = [sp.state_record() for sp in self.time_speed if sp.ticks <= min_percentile or sp.ticks >= high_percentile]
+        return (self.m.prm.price_precision, time_speed, [sp.state_record() for sp in self.time_speeding_points])
+
+
+    @staticmethod
+    def render_state(record):
+        if record is None:
+            return ""
+        price_precision, time_speed, time_speeding_points = record
+        output = "  SPEED:\n"
+        if time_speed is not None:
+            output += "    time_speed:\n"
+            for sp in time_speed:
+                output += f"      {SpeedPoint.render_state(sp, price_precision)}\n"
+        output += "    time_speeding_points:\n"
+        for sp in time_speeding_points:
+            output += f"      {SpeedPoint.render_state(sp, price_precision)}\n"
         return output
 
 
@@ -127,6 +184,15 @@ class SpeedPoint:
         
 
     def state_str(self, price_precision = 2):
+        return SpeedPoint.render_state(self.state_record(), price_precision)
+
+
+    def state_record(self):
+        return (self.ticks, self.max_ticks, self.price, self.time, self.max_jump, self.changes, self.danger_index)
+
+
+    @staticmethod
+    def render_state(record, price_precision = 2):
         output = (
             "ticks: {:+d}, "
             "max_ticks: {}, "
@@ -136,6 +202,5 @@ class SpeedPoint:
             "changes: {}, "
             "danger_index: {:.2f}"
         )
-        output = output.format(self.ticks, self.max_ticks, self.price, self.time,
-            self.max_jump, self.changes, self.danger_index, price_precision = price_precision)
+        output = output.format(*record, price_precision = price_precision)
         return output
\ No newline at end of file
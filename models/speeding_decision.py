@@ -5,6 +5,8 @@ import gvars
 from lib import util
 
 class SpeedingDecision(Decision):
+    KIND = 'speeding'
+
     def __init__(self, monitor, time_speeding_points):
         Decision.__init__(self, monitor)
         self.time_speeding_points = time_speeding_points
@@ -78,9 +80,15 @@ class SpeedingDecision(Decision):
         return self.m.prm.speeding_stop_time
 
 
-    def state_str(self):
+    def details(self):
+        return tuple(tsp.ticks for tsp in self.time_speeding_points)
+
+
+    @staticmethod
+    def render_state(summary):
+        kind, direction, trend_pattern, scores, speeding_ticks = summary
         output = "Speeding - "
-        output += f"trend_pattern: {self.trend_pattern:+d}, "
-        output += self._scores_output
-        output += f"time_speeding_points: {str([tsp.ticks for tsp in self.time_speeding_points])}"
+        output += f"trend_pattern: {trend_pattern:+d}, "
+        output += Decision.render_scores(scores)
+        output += f"time_speeding_points: {str(list(speeding_ticks))}"
         return output
\ No newline at end of file
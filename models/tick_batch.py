@@ -0,0 +1,69 @@
+from array import array
+
+# Whole recorded tick file (see lib.tick_files), loaded at once in load mode.
+# The columns that only depend on the prices (the ticks kept after dropping
+# the repeated and invalid prices, their jumps and trends) are computed in one
+# pass here and shared by the TickStore of every monitor replaying the file,
+# so the monitors only have to run their own models and decisions per tick.
+class TickBatch:
+    def __init__(self, raw_time, raw_price, tick_price):
+        self.tick_price = tick_price
+        self.raw_time = raw_time
+        self.raw_price = raw_price
+        self.price = array('d')
+        self.time = array('d')
+        self.jump = array('i')
+        self.trend = array('i')
+        self._window_starts = {} # duration -> array of window starts by tick
+        self._compute_ticks()
+
+
+    def __len__(self):
+        return len(self.price)
+
+
+    def ticks(self, price_difference):
+        return round(price_difference / self.tick_price)
+
+
+    # Index of the first tick of the window of the given duration ending at each tick
+    # (the same window TickStore.since(duration) selects)
+    def window_starts(self, duration):
+        starts = self._window_starts.get(duration)
+        if starts is None:
+            starts = self._window_starts[duration] = array('i', bytes(4 * len(self.time)))
+            times = self.time
+            start = 0
+            for i, time in enumerate(times):
+                while time - times[start] > duration:
+                    start += 1
+                starts[i] = start
+        return starts
+
+
+    # Private
+
+    # Same rules as Monitor.price_change and Monitor.set_last_height_and_trend
+    def _compute_ticks(self):
+        price, time, jump, trend = self.price, self.time, self.jump, self.trend
+        last_price = None
+        last_trend = 0
+        for tick_time, tick_price in zip(self.raw_time, self.raw_price):
+            if tick_price <= 0 or tick_price == last_price:
+                continue
+            if last_price is None:
+                tick_jump = 0
+                last_trend = 1 # Arbitrary, could be -1
+            else:
+                tick_jump = self.ticks(tick_price - last_price)
+                if tick_price > last_price:
+                    new_trend = self.ticks(tick_price - last_price)
+                    last_trend = last_trend + new_trend if last_trend > 0 else new_trend
+                else: # They can not be equal
+                    new_trend = self.ticks(last_price - tick_price)
+                    last_trend = last_trend - new_trend if last_trend < 0 else -new_trend
+            price.append(tick_price)
+            time.append(tick_time)
+            jump.append(tick_jump)
+            trend.append(last_trend)
+            last_price = tick_price
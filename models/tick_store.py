@@ -0,0 +1,417 @@
+from array import array
+import os
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+import gvars
+from lib.rolling import RollingExtremum
+
+# Tick history of a monitor, stored by columns. Every tick is one position in
+# a set of typed arrays and ChartDataPoint is only a view of one position, so
+# appending a tick does not allocate a Python object per field.
+# Windowed queries bisect the monotonic time column and return views.
+#
+# With max_duration the history is bounded: ticks older than max_duration are
+# evicted from the head of the columns every EVICT_INTERVAL ticks (and appended
+# to spill_file if given). Indexes keep counting from the first tick ever, the
+# columns hold the ticks from self.offset on, so code reading the columns
+# directly subtracts it.
+class TickStore:
+    # column name -> array typecode
+    COLUMNS = {
+        'price': 'd',
+        'time': 'd',
+        'jump': 'i', # distance (in ticks) from previous price
+        'trend': 'i', # distance (in ticks) from min or max, 0 until set
+        # Stats fields
+        'price_data_length': 'i',
+        'density_points_length': 'i',
+        'acc_pnl': 'd',
+        'nr_of_trades': 'i',
+        'position': 'i'
+    }
+    # Columns that only depend on the prices, they can come precomputed from a TickBatch
+    TICK_COLUMNS = ('price', 'time', 'jump', 'trend')
+    EVICT_INTERVAL = 1024 # ticks
+    EXTREMES_DURATION = 86400 * 7 # longest min_max_price duration once ticks are evicted
+
+    def __init__(self, batch=None, max_duration=None, spill_file=None):
+        assert batch is None or max_duration is None # Batch columns are shared, they can not be evicted
+        self.batch = batch
+        self.max_duration = max_duration
+        self.spill_file = spill_file
+        self.spill = None
+        self.offset = 0 # index of the first tick in the columns
+        self.first_time = None # type: float
+        # Price extremes by time, so they are known after the ticks are evicted
+        self.max_prices = RollingExtremum() if max_duration is not None else None
+        self.min_prices = RollingExtremum(maximum=False) if max_duration is not None else None
+        for name, typecode in self.COLUMNS.items():
+            if batch is not None and name in self.TICK_COLUMNS:
+                # Shared with every store of the batch, self.size tells how many are visible
+                setattr(self, name, getattr(batch, name))
+            else:
+                setattr(self, name, array(typecode))
+        self.size = 0
+        self.action = {} # sparse, most ticks don't have any action
+        self.durations = PriceDurationIndex()
+
+
+    def append(self, price, time, jump=0, price_data_length=0, density_points_length=0,
+            acc_pnl=0, nr_of_trades=0, action="", position=0):
+        size = self.size
+        if size > 0:
+            # Duration of the previous tick is final now
+            last = size - 1 - self.offset
+            self.durations.add(size - 1, self.price[last], time - self.time[last])
+        else:
+            self.first_time = time
+        if self.batch is None:
+            self.price.append(price)
+            self.time.append(time)
+            self.jump.append(jump)
+            self.trend.append(0)
+        else:
+            assert self.price[size] == price and self.time[size] == time
+        self.price_data_length.append(price_data_length)
+        self.density_points_length.append(density_points_length)
+        self.acc_pnl.append(acc_pnl)
+        self.nr_of_trades.append(nr_of_trades)
+        self.position.append(position)
+        if action:
+            self.action[size] = action
+        self.size += 1
+        if self.max_duration is not None:
+            self.max_prices.push(time, price)
+            self.min_prices.push(time, price)
+            if self.size % self.EVICT_INTERVAL == 0:
+                self.evict()
+        return ChartDataPoint(self, size)
+
+
+    def last_price(self):
+        return self.price[self.size - 1 - self.offset]
+
+
+    def last_time(self):
+        return self.time[self.size - 1 - self.offset]
+
+
+    # Ticks older than max_duration before the previous tick, whose windows are
+    # still in use while the last one is processed, except the last of them
+    # (since looks at the tick before a window)
+    def evict(self):
+        last_time = self.time[self.size - 2 - self.offset]
+        stop = bisect_left(self.time, last_time - self.max_duration, 0, self.size - self.offset) - 1
+        if stop <= 0:
+            return
+        if self.spill_file is not None:
+            self.spill_ticks(stop)
+        for name in self.COLUMNS:
+            del getattr(self, name)[:stop]
+        self.offset += stop
+        for index in [index for index in self.action if index < self.offset]:
+            del self.action[index]
+        self.durations.discard_before(self.offset)
+        for extremes in (self.max_prices, self.min_prices):
+            extremes.discard_before(last_time - self.EXTREMES_DURATION)
+
+
+    # Evicted ticks are appended to the spill file as (time, price) pairs
+    def spill_ticks(self, stop):
+        if self.spill is None:
+            self.spill = open(self.spill_file, "wb")
+        pairs = array('d', bytes(16 * stop))
+        pairs[0::2] = self.time[:stop]
+        pairs[1::2] = self.price[:stop]
+        pairs.tofile(self.spill)
+        self.spill.flush()
+
+
+    # Every tick, spilled or not, as (times, prices) arrays
+    def all_ticks(self):
+        times, prices = array('d'), array('d')
+        if self.spill is not None:
+            with open(self.spill_file, "rb") as f:
+                pairs = array('d', f.read())
+            times, prices = pairs[0::2], pairs[1::2]
+        times.extend(self.time[:self.size - self.offset])
+        prices.extend(self.price[:self.size - self.offset])
+        return times, prices
+
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            os.remove(self.spill_file)
+            self.spill = None
+
+
+    # Lowest and highest prices since the duration, also over evicted ticks
+    def min_max_price(self, duration):
+        if self.max_duration is not None and duration > self.max_duration:
+            start = self.last_time() - duration
+            return self.min_prices.get(start), self.max_prices.get(start)
+        prices = self.since(duration).column('price')
+        return min(prices), max(prices)
+
+
+    # the_time could be a specific time or an amount of time since now
+    # (same semantics as the backwards scan it replaces in Monitor.data_since)
+    def since(self, time_or_duration):
+        size = self.size
+        if size == 0:
+            return TickView(self, 0, 0)
+        if self.batch is not None and time_or_duration < self.time[0]:
+            # Can only be a duration, whose windows are computed once for the whole batch
+            return TickView(self, self.batch.window_starts(time_or_duration)[size - 1], size)
+        times = self.time
+        offset = self.offset
+        stop = size - offset
+        last_time = times[stop - 1]
+
+        # First index not older than the duration
+        start = bisect_left(times, last_time - time_or_duration, 0, stop)
+        while start > 0 and not (last_time - times[start - 1] > time_or_duration):
+            start -= 1
+        while start < stop and last_time - times[start] > time_or_duration:
+            start += 1
+
+        # A tick at exactly the_time is included
+        exact = bisect_right(times, time_or_duration, 0, stop) - 1
+        if exact >= 0 and times[exact] == time_or_duration and exact >= start - 1:
+            start = exact
+        return TickView(self, start + offset, size)
+
+
+    def view(self, start=None, stop=None):
+        return TickView(self, self.offset if start is None else start, self.size if stop is None else stop)
+
+
+    # Time spent at the price of the tick, known once the next tick arrives
+    def duration(self, index):
+        if index + 1 < self.size:
+            index -= self.offset
+            return self.time[index + 1] - self.time[index]
+        return 0
+
+
+    # Whether the tick was a local min or max, known once the next tick arrives
+    def height(self, index):
+        if index + 1 < self.size:
+            index -= self.offset
+            if self.price[index + 1] > self.price[index]:
+                return gvars.HEIGHT['mid'] if self.trend[index] > 0 else gvars.HEIGHT['min']
+            else:
+                return gvars.HEIGHT['mid'] if self.trend[index] < 0 else gvars.HEIGHT['max']
+        return gvars.HEIGHT['mid']
+
+
+    def column(self, name, start=0, stop=None):
+        stop = self.size if stop is None else stop
+        if name == 'action':
+            return [self.action.get(i, "") for i in range(start, stop)]
+        elif name in ('duration', 'height'):
+            return [getattr(self, name)(i) for i in range(start, stop)]
+        assert start >= self.offset
+        return getattr(self, name)[start - self.offset:stop - self.offset]
+
+
+    def __len__(self):
+        return self.size
+
+
+    def __getitem__(self, key):
+        size = self.size
+        if isinstance(key, slice):
+            start, stop, step = key.indices(size)
+            assert step == 1
+            return TickView(self, start, max(start, stop))
+        if key < 0:
+            key += size
+        if not self.offset <= key < size:
+            raise IndexError("TickStore index out of range")
+        return ChartDataPoint(self, key)
+
+
+    # Only the ticks still in the columns
+    def __iter__(self):
+        for i in range(self.offset, self.size):
+            yield ChartDataPoint(self, i)
+
+
+    def __reversed__(self):
+        for i in range(self.size - 1, self.offset - 1, -1):
+            yield ChartDataPoint(self, i)
+
+
+# Durations of the ticks by price level, to know how long the price was above,
+# at or below a given price since any tick without iterating the ticks.
+# Each level keeps the indexes of its ticks and the cumulative durations, and
+# levels are kept in the order they were last visited, so a query only looks
+# at the levels visited since the starting tick.
+class PriceDurationIndex:
+    def __init__(self):
+        self._levels = OrderedDict() # price -> PriceLevelDurations, least recently visited first
+
+
+    def add(self, index, price, duration):
+        level = self._levels.get(price)
+        if level is None:
+            level = self._levels[price] = PriceLevelDurations()
+        else:
+            self._levels.move_to_end(price)
+        level.indexes.append(index)
+        level.cumulative.append(level.total() + duration)
+
+
+    # Durations before start can not be asked anymore
+    def discard_before(self, start):
+        while len(self._levels) > 0:
+            price, level = next(iter(self._levels.items()))
+            if level.indexes[-1] >= start:
+                break
+            del self._levels[price] # Not visited since start
+        for level in self._levels.values():
+            level.discard_before(start)
+
+
+    def up_equal_down(self, start, price):
+        time_up = 0
+        time_equal = 0
+        time_down = 0
+        for level_price, level in reversed(self._levels.items()):
+            if level.indexes[-1] < start:
+                break
+            duration = level.since(start)
+            if level_price > price:
+                time_up += duration
+            elif level_price == price:
+                time_equal += duration
+            else:
+                time_down += duration
+        return (time_up, time_equal, time_down)
+
+
+class PriceLevelDurations:
+    __slots__ = ('indexes', 'cumulative')
+
+    def __init__(self):
+        self.indexes = array('q')
+        self.cumulative = array('d')
+
+
+    def total(self):
+        return self.cumulative[-1] if len(self.cumulative) > 0 else 0
+
+
+    def since(self, start):
+        position = bisect_left(self.indexes, start)
+        return self.cumulative[-1] - (self.cumulative[position - 1] if position > 0 else 0)
+
+
+    # Keeps the last tick before start, whose cumulative duration since() subtracts
+    def discard_before(self, start):
+        position = bisect_left(self.indexes, start) - 1
+        if position > 0:
+            del self.indexes[:position]
+            del self.cumulative[:position]
+
+
+# Read only window over a TickStore. Indexes are fixed when the view is
+# created, so later appends to the store do not change it.
+class TickView:
+    __slots__ = ('store', 'start', 'stop')
+
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = start
+        self.stop = stop
+
+
+    def column(self, name):
+        return self.store.column(name, self.start, self.stop)
+
+
+    def __len__(self):
+        return self.stop - self.start
+
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.stop - self.start)
+            assert step == 1
+            return TickView(self.store, self.start + start, self.start + max(start, stop))
+        if key < 0:
+            key += self.stop - self.start
+        if not 0 <= key < self.stop - self.start:
+            raise IndexError("TickView index out of range")
+        return ChartDataPoint(self.store, self.start + key)
+
+
+    def __iter__(self):
+        for i in range(self.start, self.stop):
+            yield ChartDataPoint(self.store, i)
+
+
+    def __reversed__(self):
+        for i in range(self.stop - 1, self.start - 1, -1):
+            yield ChartDataPoint(self.store, i)
+
+
+    def __eq__(self, other):
+        if isinstance(other, TickView) and other.store is self.store:
+            return (self.start, self.stop) == (other.start, other.stop) or (len(self) == 0 and len(other) == 0)
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+
+    def __repr__(self):
+        return f"TickView({self.start}:{self.stop})"
+
+
+# Row accessor of a TickStore
+class ChartDataPoint:
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+
+    def __eq__(self, other):
+        return isinstance(other, ChartDataPoint) and self.store is other.store and self.index == other.index
+
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+
+    @property
+    def duration(self):
+        return self.store.duration(self.index)
+
+    @property
+    def height(self):
+        return self.store.height(self.index) # min - mid - max
+
+    @property
+    def action(self):
+        return self.store.action.get(self.index, "")
+
+    @action.setter
+    def action(self, value):
+        self.store.action[self.index] = value
+
+
+def _column_property(name):
+    def getter(self):
+        return getattr(self.store, name)[self.index - self.store.offset]
+    def setter(self, value):
+        getattr(self.store, name)[self.index - self.store.offset] = value
+    return property(getter, setter)
+
+for _name in TickStore.COLUMNS:
+    setattr(ChartDataPoint, _name, _column_property(_name))
@@ -0,0 +1,37 @@
+import sys, os
+import logging
+
+import gvars
+from lib import core
+from lib.arg_parse import ArgParse
+from models.params import Params
+from ib.params_sweep import ParamsSweep
+
+# python sweep.py <json file> <number of random params> [grid=variable,variable] [workers=N]
+if __name__ == "__main__":
+    try:
+        gvars.args = ArgParse(sys.argv)
+        logging.basicConfig(filename='./log/hft_load.log', level=logging.ERROR)
+        if gvars.args.grid_variables():
+            params_list = list(Params.grid(gvars.args.grid_variables()))
+        else:
+            params_list = []
+            for i in range(core.safe_execute(0, ValueError, int, sys.argv[2])):
+                params = Params()
+                params.randomize()
+                params_list.append(params)
+
+        summaries = ParamsSweep(sys.argv[1], params_list, gvars.args.workers()).run()
+        print(f"Replayed {len(summaries)} params, accepted {len([s for s in summaries if s[1]])}:")
+        for params, accepted in summaries[:10]:
+            result = params.last_result
+            if result is None:
+                print(f"  id: {params.id}  no result  accepted: {accepted}")
+                continue
+            print(f"  id: {params.id}  average_pnl: {result['average_pnl']:.2f}  "
+                f"winners: {result['nr_of_winners']}  loosers: {result['nr_of_loosers']}  accepted: {accepted}")
+    except:
+        print("Reraising exceptions in sweep file.")
+        raise
+    finally:
+        print("Program finished.")
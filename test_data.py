@@ -12,7 +12,8 @@ if __name__ == "__main__":
     try:
         parameters = sys.argv + 5 * ['']
         # parameters[1] = "GCQ8"
-        ib_hft = IBTestData(parameters[1])
+        # parameters[2] = "quotes" for bid/ask and trade ticks instead of bars
+        ib_hft = IBTestData(parameters[1], parameters[2] == "quotes")
         # Waiting indefinitely to catch the program termination exception
         # time.sleep(999999999)
         print("Main program finished")
@@ -0,0 +1,41 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import tracemalloc
+
+from lib.allocations import AllocationProfile
+
+class TestAllocationProfile(unittest.TestCase):
+
+    def test_modules_and_ticks(self):
+        profile = AllocationProfile("ES", 2)
+        kept = []
+        for i in range(5):
+            with profile:
+                kept.append([object() for j in range(100)])
+                temporary = bytearray(100000)
+                del temporary
+        profile.close()
+        self.assertEqual(profile.ticks, 5)
+        self.assertGreaterEqual(profile.allocated.percentile(50), 100000)
+        size, count = profile.modules[os.path.join("tests", "test_allocations.py")]
+        self.assertGreaterEqual(count, 500)
+        self.assertIn("tests/test_allocations.py", profile.state_str())
+
+    def test_profiles_share_tracing(self):
+        first, second = AllocationProfile("ES", 1), AllocationProfile("NQ", 1)
+        for profile in (first, second):
+            with profile:
+                kept = [object() for j in range(100)]
+        first.close()
+        self.assertTrue(tracemalloc.is_tracing())
+        with second:
+            kept.append(bytearray(100000))
+        second.close() # Would fail taking its snapshot if the first close stopped tracing
+        self.assertEqual(second.ticks, 2)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == '__main__':
+    unittest.main()
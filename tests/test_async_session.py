@@ -0,0 +1,80 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import asyncio
+
+from ib.async_session import AsyncSession, MonitorQueue
+
+class FakeMonitor:
+    ticker = "ES"
+
+    def __init__(self):
+        self.calls = []
+
+    def price_change(self, tickType, price, price_time, received=None):
+        self.calls.append(('tick', price, price_time))
+
+    def order_change(self, order_id, status, remaining, fill_price, fill_time, received=None):
+        self.calls.append(('order', order_id, status))
+
+    def flush_logs(self):
+        self.calls.append(('flush',))
+
+
+class TestMonitorQueue(unittest.TestCase):
+
+    def test_orders_first_and_coalescing(self):
+        monitor = FakeMonitor()
+
+        async def replay():
+            monitor_queue = MonitorQueue(monitor, asyncio.get_running_loop(), max_depth=2)
+            task = asyncio.create_task(monitor_queue.run())
+            for i in range(4):
+                monitor_queue.push_tick(100.00 + i * 0.25, 1000 + i, None)
+            monitor_queue.push_order((7, "Filled", 0, 100.00, 1003, None))
+            # Everything is pushed before the coroutine runs
+            while monitor_queue.delivered < 1:
+                await asyncio.sleep(0)
+            monitor_queue.push_tick(101.00, 1004, None)
+            while monitor_queue.delivered < 2:
+                await asyncio.sleep(0)
+            task.cancel()
+            return monitor_queue
+
+        monitor_queue = asyncio.run(replay())
+        self.assertEqual(monitor.calls, [('order', 7, "Filled"), ('tick', 100.75, 1000), ('tick', 101.00, 1004)])
+        self.assertEqual((monitor_queue.pushed, monitor_queue.delivered, monitor_queue.coalesced), (5, 2, 3))
+
+
+class TestAsyncSession(unittest.TestCase):
+
+    def test_routing(self):
+        parent, child = FakeMonitor(), FakeMonitor()
+
+        async def session_run():
+            session = AsyncSession(["ES"])
+            session.loop = asyncio.get_running_loop()
+            session.add_monitors(1, [parent])
+            session.push_tick(1, 100.25, 1000, None)
+            session.push_order(parent, (7, "Filled", 0, 100.25, 1000, None))
+            # Statuses of the test orders of the children are simulated in the loop, by the parent's tick
+            session.push_order(child, (8, "Filled", 0, 100.25, 1000, None))
+            self.assertEqual(child.calls, [('order', 8, "Filled")])
+            self.assertEqual(parent.calls, [])
+            monitor_queue = session.monitor_queues[parent]
+            while monitor_queue.delivered < 1:
+                await asyncio.sleep(0)
+            await session.flush_logs()
+            for task in session.tasks:
+                task.cancel()
+            return session
+
+        session = asyncio.run(session_run())
+        self.assertEqual(parent.calls, [('order', 7, "Filled"), ('tick', 100.25, 1000), ('flush',)])
+        self.assertEqual(list(session.queues), [1])
+        self.assertEqual(len(session.tasks), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import random
+import math
+from types import SimpleNamespace
+
+from models.density import Density
+from models.tick_store import TickStore
+
+class TestDensity(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        # Long enough for ticks to expire and for a few re-sums of total_duration
+        rng = random.Random(7)
+        monitor = WalkMonitor(look_back=900, density_division=5)
+        price, time = 2700.0, 1000000.0
+        checked = 0
+        for i in range(6000):
+            price = max(2600.0, price + rng.choice((-0.25, 0, 0.25)))
+            time += rng.choice((0.1, 0.5, 1, 2, 5, 20))
+            monitor.append(price, time)
+            if i % 7 == 0:
+                self.assert_brute_force(monitor)
+                checked += 1
+        self.assertGreater(monitor.data[-1].time - monitor.data[0].time, 10 * 900)
+        self.assertGreater(checked, 800)
+
+    def assert_brute_force(self, monitor):
+        density = monitor.density
+        data = monitor.data_since(monitor.prm.primary_look_back_time)
+        durations = {}
+        for i in range(data.start, data.stop):
+            tick = monitor.ticks(monitor.data.price[i - monitor.data.offset])
+            durations[tick] = durations.get(tick, 0) + monitor.data.duration(i)
+
+        self.assertEqual([monitor.ticks(dp.price) for dp in density.list_dps], sorted(durations))
+        for dp in density.list_dps:
+            self.assertAlmostEqual(dp.duration, durations[monitor.ticks(dp.price)], places=6)
+        total = math.fsum(durations.values())
+        self.assertAlmostEqual(density.total_duration, total, places=6)
+
+        if len(durations) < 10: # Fewer points than Density.price_change needs, the areas are from before
+            return
+        ordered = sorted(durations.values())
+        division = round((len(ordered) - 1) / monitor.prm.density_division)
+        dpercentile = lambda duration: round(duration / ordered[-1] * 100)
+        # The incremental sums may differ in the last bits, so may a rounding at .5
+        self.assertLessEqual(abs(density.min_higher_area - dpercentile(ordered[len(ordered) - 1 - division])), 1)
+        self.assertLessEqual(abs(density.max_lower_area - dpercentile(ordered[division])), 1)
+
+
+# What Density reads from Monitor, over a real TickStore
+class WalkMonitor:
+    def __init__(self, look_back, density_division):
+        self.prm = SimpleNamespace(primary_look_back_time=look_back, density_division=density_division,
+            tick_price=0.25, price_precision=2)
+        self.data = TickStore()
+        self.density = Density(self)
+
+    def append(self, price, time):
+        self.data.append(price, time)
+        self.density.price_change()
+
+    def data_since(self, time_or_duration):
+        return self.data.since(time_or_duration)
+
+    def last_price(self):
+        return self.data.last_price()
+
+    def ticks(self, price_difference):
+        return round(price_difference / self.prm.tick_price)
+
+
+if __name__ == '__main__':
+    unittest.main()
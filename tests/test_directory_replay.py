@@ -0,0 +1,36 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+
+from models.params import Params
+from models.params_db import ParamsDb
+from ib.directory_replay import DirectoryReplay
+
+class TestDirectoryReplay(unittest.TestCase):
+
+    def setUp(self):
+        # An empty ParamsDb, not loaded from ./output
+        self.stored_instance = ParamsDb._instance
+        ParamsDb._instance = ParamsDb.__new__(ParamsDb)
+        ParamsDb._instance.params_list = []
+        ParamsDb._instance.changed = False
+        ParamsDb._instance.next_id = None
+
+    def tearDown(self):
+        ParamsDb._instance = self.stored_instance
+
+    def test_merge_params_accepted_twice(self):
+        params = Params()
+        params.randomize() # Test monitor params, without an id
+        attrs = ParamsDb.get_attributes_from_params(params)
+        first = {'average_pnl': 10.0, 'nr_of_winners': 8, 'nr_of_loosers': 2, 'underlying': "ES_2019-01-02--10-00"}
+        second = {'average_pnl': 12.5, 'nr_of_winners': 9, 'nr_of_loosers': 3, 'underlying': "ES_2019-01-02--11-00"}
+        DirectoryReplay([]).merge([(0, attrs, first), (0, attrs, second)])
+        params_list = ParamsDb.gi().params_list
+        self.assertEqual(len(params_list), 1)
+        self.assertEqual(params_list[0].results, [first, second])
+
+
+if __name__ == '__main__':
+    unittest.main()
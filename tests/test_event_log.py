@@ -0,0 +1,33 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import tempfile
+
+from lib.event_log import EventLog, read_events
+
+class TestEventLog(unittest.TestCase):
+
+    def test_write_and_read(self):
+        events = [
+            ('tick', (1540003596.698, 1540000000, 2769.75, 2)),
+            ('breaking', (2, 1, 2769.5, 2770.25, 1540003500.0, 7, "[5, 9]", (1, -1, 2771.0, 2770.5, 2770.0, 2769.0, 2768.5, 2768.0))),
+            ('order', (121, "BUY", 1, None, 1540003596.698)),
+            ('text', "\nFINAL DATA\n")
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = f"{directory}/ESH9.events"
+            event_log = EventLog(file_name, block=True)
+            for event_type, payload in events:
+                event_log.write_event(event_type, payload)
+            event_log.close()
+            self.assertEqual(list(read_events(file_name)), events)
+
+            # A killed writer leaves a partial frame at the end
+            with open(file_name, "ab") as f:
+                f.write(b"\x10\x00")
+            self.assertEqual(list(read_events(file_name)), events)
+
+
+if __name__ == '__main__':
+    unittest.main()
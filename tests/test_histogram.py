@@ -0,0 +1,54 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import random
+
+from lib.histogram import Histogram, StageLatencies
+
+class TestHistogram(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        values = [random.randint(0, 10**9) for i in range(10000)] + [5, 7]
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for percentile in (1, 50, 90, 99, 99.9, 100):
+            exact = values[max(1, round(len(values) * percentile / 100)) - 1]
+            self.assertLessEqual(abs(histogram.percentile(percentile) - exact), exact / 32 + 1)
+        self.assertEqual(histogram.max, values[-1])
+        self.assertEqual(histogram.total, len(values))
+
+    def test_buckets(self):
+        histogram = Histogram()
+        buckets = [histogram.bucket(value) for value in range(10**5)]
+        self.assertEqual(buckets, sorted(buckets))
+        for value in (0, 31, 32, 33, 1000, 10**5):
+            self.assertGreaterEqual(histogram.bucket_value(histogram.bucket(value)), value)
+
+    def test_stage_latencies(self):
+        latencies = StageLatencies("ESH9")
+        lap = latencies.start()
+        lap = latencies.lap('density', lap)
+        latencies.record('speed', 2500)
+        self.assertEqual(list(latencies.stages), ['density', 'speed'])
+        self.assertEqual(latencies.stages['speed'].percentile(99), 2500)
+        self.assertIn("speed", latencies.state_str())
+
+    def test_stage_latencies_released(self):
+        # Two replays of the ticker in one process, as in a reused pool worker
+        counts = []
+        for replay in range(2):
+            first, second = StageLatencies.for_ticker("ESZ8"), StageLatencies.for_ticker("ESZ8")
+            self.assertIs(first, second)
+            for i in range(10):
+                first.record('total', 1000 + i)
+            counts.append(first.stages['total'].total)
+            StageLatencies.release("ESZ8")
+            StageLatencies.release("ESZ8")
+        self.assertEqual(counts, [10, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
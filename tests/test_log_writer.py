@@ -0,0 +1,101 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import io
+import threading
+
+from lib.log_writer import LogWriter
+
+class TestLogWriter(unittest.TestCase):
+
+    def test_writes_in_order(self):
+        stream = ClosedStringIO()
+        writer = LogWriter(stream, block=True, max_records=4)
+        for i in range(100):
+            writer.write_record(lambda record: f"{record[0]}:{record[1]}\n", (i, i * 2))
+        writer.write("end\n")
+        writer.close()
+        self.assertEqual(stream.text, "".join(f"{i}:{i * 2}\n" for i in range(100)) + "end\n")
+
+    def test_drops_when_full(self):
+        stream = ClosedStringIO()
+        started, finish = threading.Event(), threading.Event()
+        writer = LogWriter(stream, max_records=2)
+        writer.write_record(lambda record: started.set() or finish.wait() and "", None) # Keeps the thread busy
+        started.wait()
+        for i in range(10):
+            writer.write(f"{i}\n")
+        finish.set()
+        writer.close()
+        self.assertGreater(writer.dropped, 0)
+        self.assertIn(f"LOG WRITER: {writer.dropped} records dropped, 0 failed", stream.text)
+
+    def test_survives_stream_errors(self):
+        stream = FailingStream(fail_times=1)
+        started, finish = threading.Event(), threading.Event()
+        writer = LogWriter(stream, max_records=2)
+        writer.write_record(lambda record: started.set() or finish.wait() and "", None) # Alone in the failing batch
+        started.wait()
+        for i in range(10):
+            writer.write(f"{i}\n") # Fills the queue, close has to wait for the thread to drain it
+        with self.assertLogs(level='ERROR'):
+            finish.set()
+            closing = threading.Thread(target=writer.close)
+            closing.start()
+            closing.join(5)
+        self.assertFalse(closing.is_alive())
+        self.assertEqual(writer.failed, 1)
+        self.assertEqual(stream.text, f"0\n1\n\nLOG WRITER: {writer.dropped} records dropped, 1 failed\n")
+
+    def test_flush(self):
+        stream = FlushedStringIO()
+        writer = LogWriter(stream)
+        writer.write("a\n")
+        writer.write_record(str, 5)
+        writer.flush()
+        self.assertTrue(stream.flushed.wait(5))
+        self.assertEqual(stream.flushed_text, "a\n5")
+        writer.close()
+        self.assertEqual(stream.text, "a\n5")
+
+    def test_not_threaded(self):
+        stream = ClosedStringIO()
+        writer = LogWriter(stream, threaded=False)
+        writer.write_record(str, 5)
+        self.assertEqual(stream.getvalue(), "5")
+
+
+# Keeps the text after the writer closes it
+class ClosedStringIO(io.StringIO):
+    def close(self):
+        self.text = self.getvalue()
+        super().close()
+
+
+# Keeps what was written when it was flushed
+class FlushedStringIO(ClosedStringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushed = threading.Event()
+
+    def flush(self):
+        self.flushed_text = self.getvalue()
+        self.flushed.set()
+
+
+# Raises on the first fail_times writes
+class FailingStream(ClosedStringIO):
+    def __init__(self, fail_times):
+        super().__init__()
+        self.fail_times = fail_times
+
+    def write(self, text):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise OSError("No space left on device")
+        return super().write(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+
+from ib.order_book import OrderBook
+from lib.tick_files import BID, ASK
+
+class TestOrderBook(unittest.TestCase):
+
+    def setUp(self):
+        self.book = OrderBook(0.25)
+        self.book.add('b1', 1, "BUY", 1, 100.00)
+        self.book.add('b2', 2, "BUY", 1, 99.50)
+        self.book.add('b3', 3, "BUY", 1, 100.00)
+        self.book.add('s1', 4, "SELL", 1, 101.00)
+        self.book.add('s2', 5, "SELL", 1, 100.50)
+
+    def test_fills_crossed_levels_only(self):
+        self.assertEqual(self.book.match(100.25), [])
+        fills = self.book.match(99.75)
+        self.assertEqual([(order.order_id, price) for order, price in fills], [(1, 100.00), (3, 100.00)])
+        fills = self.book.match(101.25)
+        self.assertEqual([order.order_id for order, price in fills], [5, 4])
+        self.assertEqual(len(self.book), 1)
+        self.assertEqual(self.book.buy_ticks, [398])
+
+    def test_cancel_and_modify(self):
+        self.book.cancel('b1')
+        self.book.add('b2', 2, "BUY", 1, 100.00) # Modified, after b3 in the queue
+        self.assertIsNone(self.book.cancel('b1'))
+        fills = self.book.match(100.00)
+        self.assertEqual([order.order_id for order, price in fills], [3, 2])
+        self.assertEqual((self.book.buy_ticks, self.book.sell_ticks), ([], [-404, -402]))
+
+    def test_queue_models(self):
+        book = OrderBook(0.25, queue_touches=None)
+        book.add('b1', 1, "BUY", 1, 100.00)
+        self.assertEqual(book.match(100.00), [])
+        self.assertEqual(len(book.match(99.75)), 1)
+        book = OrderBook(0.25, queue_touches=2)
+        book.add('b1', 1, "BUY", 1, 100.00)
+        self.assertEqual(book.match(100.00), [])
+        self.assertEqual(len(book.match(100.00)), 1)
+        self.assertEqual(book.market_price("SELL", 100.00, 2), 99.75)
+
+    def test_top_of_book(self):
+        self.assertEqual(self.book.marketable_price("BUY", 100.75), None)
+        self.assertEqual(self.book.quote(ASK, 100.25), [])
+        self.assertEqual(self.book.market_price("BUY", 100.00, 2), 100.25)
+        self.assertEqual(self.book.marketable_price("BUY", 100.25), 100.25)
+        self.assertEqual(self.book.marketable_price("BUY", 100.00), None)
+        fills = self.book.quote(ASK, 100.00)
+        self.assertEqual([(order.order_id, price) for order, price in fills], [(1, 100.00), (3, 100.00)])
+        fills = self.book.quote(BID, 100.50)
+        self.assertEqual([order.order_id for order, price in fills], [5])
+        self.assertEqual(self.book.market_price("SELL", 100.00, 2), 100.50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+
+from ib.order_latencies import OrderLatencies
+
+class TestOrderLatencies(unittest.TestCase):
+
+    def test_round_trip_is_measured_once_per_send(self):
+        latencies = OrderLatencies()
+        latencies.order_sent(1, 'ES', 1000, 5000)
+        latencies.status_received(1, "Submitted", 9000)
+        latencies.status_received(1, "Filled", 20000)
+        # Modified and sent again
+        latencies.order_sent(1, 'ES', 30000, 31000)
+        latencies.status_received(1, "Submitted", 33000)
+        latencies.status_received(2, "Submitted", 40000) # Unknown order
+        self.assertEqual(latencies.histograms[('ES', 'tick_to_order')].total, 2)
+        round_trip = latencies.histograms[('ES', 'order_round_trip')]
+        self.assertEqual((round_trip.total, round_trip.sum), (2, 4000 + 2000))
+        self.assertEqual([status for status, round_trip, sends in latencies.orders[1].statuses],
+            ["Submitted", "Filled", "Submitted"])
+        self.assertIn("tick_to_order", latencies.summary_str('ES'))
+        self.assertNotIn("tick_to_order", latencies.summary_str('NQ'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+
+from ib.order_registry import OrderRegistry
+
+class TestOrderRegistry(unittest.TestCase):
+
+    def test_live_and_history(self):
+        registry = OrderRegistry(history_size=2)
+        monitors = [object() for i in range(3)]
+        for order_id, monitor in enumerate(monitors):
+            registry.add(order_id, monitor)
+        self.assertEqual((registry.monitor(1), registry.order_id(monitors[2])), (monitors[1], 2))
+        with self.assertRaises(AssertionError):
+            registry.add(7, monitors[0]) # One live order per monitor
+        registry.status(0, "Submitted")
+        self.assertIs(registry.monitor(0), monitors[0])
+        for order_id in range(3):
+            registry.status(order_id, "Filled")
+        registry.status(2, "Filled") # Repeated
+        self.assertEqual(len(registry), 0)
+        self.assertIsNone(registry.monitor(2))
+        self.assertIsNone(registry.order_id(monitors[2]))
+        self.assertEqual((registry.final_status(0), registry.final_status(2)), (None, "Filled"))
+        registry.add(3, monitors[0])
+        self.assertEqual(registry.order_id(monitors[0]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+
+from models.params import Params
+from ib.params_sweep import ParamsSweep
+
+class TestParamsSweep(unittest.TestCase):
+
+    def test_sort_params_without_result(self):
+        params_list = [Params() for i in range(3)]
+        params_list[0].last_result = {'average_pnl': -5.0}
+        params_list[2].last_result = {'average_pnl': 7.5}
+        sweep = ParamsSweep("ES.ticks", params_list, workers=1)
+        sweep.summaries = [(params, False) for params in params_list]
+        sweep.sort_summaries()
+        self.assertEqual([params for params, accepted in sweep.summaries], [params_list[2], params_list[0], params_list[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
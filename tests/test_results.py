@@ -0,0 +1,60 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import random
+import tempfile
+import statistics
+from types import SimpleNamespace
+
+from models.results import Results
+from lib.columns import load_columns
+
+class TestResults(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = SimpleNamespace(prm=SimpleNamespace(tick_price=0.10, price_precision=2), action_decision=None, initial_time=0)
+        self.monitor.ticks = lambda price_difference: round(price_difference / self.monitor.prm.tick_price)
+        self.results = Results(self.monitor)
+        rnd = random.Random(2)
+        for i in range(200):
+            pnl = round(rnd.randint(-6, 8) * 0.10, 2)
+            self.results.append(pnl, round(pnl + rnd.randint(0, 3) * 0.10, 2), 0, 0, i, i, i)
+
+    def test_statistics(self):
+        pnls = [r.pnl for r in self.results.data]
+        for last in (None, 1, 20, 500):
+            data = pnls if last is None else pnls[-last:]
+            self.assertAlmostEqual(self.results.pnl(last), sum(data))
+            self.assertAlmostEqual(self.results.average_pnl(last), statistics.mean(data))
+            self.assertEqual(self.results.nr_of_wl('winners', last), len([pnl for pnl in data if pnl > 0]))
+            self.assertEqual(self.results.nr_of_wl('loosers', last), len([pnl for pnl in data if pnl < 0]))
+        self.assertAlmostEqual(self.results.average_wl('loosers'), statistics.mean([pnl for pnl in pnls if pnl < 0]))
+        self.assertAlmostEqual(self.results.fantasy_pnl(), sum(r.fantasy_pnl for r in self.results.data))
+        self.assertEqual(self.results.fantasy_pnl_mode(), statistics.mode(r.fantasy_pnl for r in self.results.data))
+        self.assertAlmostEqual(self.results.acc_pnl(), sum(pnls[:-1]))
+
+    def test_export(self):
+        summary = ('breaking', 1, 1, (('in_line_score', 2), ('advantage_score', 3)), (3, True, 1, 0, 1))
+        self.monitor.action_decision = SimpleNamespace(summary=lambda: summary)
+        self.results.append(0.30, 0.40, 0, 0, 300, 300, 301)
+        self.assertIn("decision: (Breaking - trend_pattern: +1, in_line_score: 2, advantage_score: 3, breaking_price_changes:   3",
+            self.results.data[-1].state_str())
+        file_name = f"{tempfile.mkdtemp()}/results.columns"
+        self.results.export(file_name)
+        columns = load_columns(file_name)
+        self.assertEqual(list(columns['decision'][-2:]), [0, 1])
+        self.assertEqual(list(columns['advantage_score'][-2:]), [0, 3])
+        self.assertEqual(list(columns['pnl']), [r.pnl for r in self.results.data])
+        self.results.export(f"{file_name}.csv")
+        with open(f"{file_name}.csv") as f:
+            self.assertEqual(len(f.readlines()), len(self.results.data) + 1)
+
+    def test_empty(self):
+        results = Results(self.monitor)
+        self.assertEqual((results.pnl(), results.average_pnl(10), results.average_wl('winners')), (0, 0, 0))
+        self.assertIsNone(results.fantasy_pnl_mode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+
+from lib.rolling import RollingExtremum
+
+class TestRollingExtremum(unittest.TestCase):
+
+    def test_max_and_min(self):
+        values = [3, 1, 4, 1, 5, 9, 2, 6]
+        maximum, minimum = RollingExtremum(), RollingExtremum(maximum=False)
+        for i, value in enumerate(values):
+            maximum.push(i, value)
+            minimum.push(i, value)
+        for start in range(len(values)):
+            self.assertEqual(maximum.get(start), max(values[start:]))
+            self.assertEqual(minimum.get(start), min(values[start:]))
+
+    def test_key_keeps_earliest_on_ties(self):
+        jumps = RollingExtremum(key=abs)
+        for i, jump in enumerate([1, -2, 2, -1]):
+            jumps.push(i, jump)
+        self.assertEqual(jumps.get(0), -2)
+        self.assertEqual(jumps.get(2), 2)
+
+    def test_discard_before(self):
+        maximum = RollingExtremum()
+        for i in range(200):
+            maximum.push(i, -i)
+        maximum.discard_before(150)
+        self.assertEqual(len(maximum), 50)
+        self.assertEqual(maximum.get(), -150)
+        self.assertEqual(maximum.get(180), -180)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+from array import array
+
+from models.tick_batch import TickBatch
+from models.tick_store import TickStore
+
+class TestTickBatch(unittest.TestCase):
+
+    def setUp(self):
+        ticks = [[1000000, 1220.50], [1000005, 1220.50], [1000010, 1220.75], [1000020, 1221.25],
+            [1000030, 0], [1000040, 1221.00], [1000100, 1220.50], [1000110, 1220.75]]
+        times = array('d', (time for time, price in ticks))
+        prices = array('d', (price for time, price in ticks))
+        self.batch = TickBatch(times, prices, 0.25)
+
+    def test_ticks(self):
+        self.assertEqual(list(self.batch.price), [1220.50, 1220.75, 1221.25, 1221.00, 1220.50, 1220.75])
+        self.assertEqual(list(self.batch.jump), [0, 1, 2, -1, -2, 1])
+        self.assertEqual(list(self.batch.trend), [1, 2, 4, -1, -3, 1])
+
+    def test_since_matches_store(self):
+        batch_store = TickStore(self.batch)
+        store = TickStore()
+        for price, time in zip(self.batch.price, self.batch.time):
+            batch_store.append(price, time)
+            store.append(price, time)
+            for duration in (0, 15, 60, 900):
+                self.assertEqual(batch_store.since(duration).start, store.since(duration).start)
+                self.assertEqual(len(batch_store.since(duration)), len(store.since(duration)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+from threading import Event, current_thread
+
+from ib.tick_dispatch import TickDispatcher
+
+class TestTickDispatch(unittest.TestCase):
+
+    def test_coalesces_when_behind(self):
+        delivered = []
+        started, release = Event(), Event()
+        def deliver(price, time, received):
+            delivered.append((price, time))
+            started.set()
+            release.wait()
+        dispatcher = TickDispatcher(max_depth=2)
+        dispatcher.add(1, "ES", deliver)
+        dispatcher.push(1, 100.00, 1000, 0)
+        started.wait()
+        # Queued while the first tick is processed
+        for i in range(1, 5):
+            dispatcher.push(1, 100.00 + i * 0.25, 1000 + i, 0)
+        tick_queue = dispatcher.queues[1]
+        self.assertEqual(tick_queue.depth(), 4)
+        release.set()
+        while tick_queue.delivered < 2:
+            tick_queue.thread.join(0.01)
+        dispatcher.stop()
+        self.assertEqual(delivered, [(100.00, 1000), (101.00, 1001)])
+        self.assertEqual((tick_queue.pushed, tick_queue.delivered, tick_queue.coalesced), (5, 2, 3))
+        self.assertIn("ES", dispatcher.state_str())
+
+    def test_order_statuses_before_waiting_ticks(self):
+        calls = []
+        started, release = Event(), Event()
+        def deliver(price, time, received):
+            calls.append(('tick', price, current_thread()))
+            started.set()
+            release.wait()
+        def order_status(order_id):
+            calls.append(('order', order_id, current_thread()))
+        dispatcher = TickDispatcher(max_depth=None)
+        dispatcher.add(1, "ES", deliver)
+        dispatcher.push(1, 100.00, 1000, 0)
+        started.wait()
+        # Statuses and ticks come interleaved while the worker processes a tick
+        dispatcher.push(1, 100.25, 1001, 0)
+        dispatcher.push_order("ES", lambda: order_status(7))
+        dispatcher.push(1, 100.50, 1002, 0)
+        dispatcher.push_order("ES", lambda: order_status(8))
+        tick_queue = dispatcher.queues[1]
+        release.set()
+        while tick_queue.delivered < 3:
+            tick_queue.thread.join(0.01)
+        dispatcher.stop()
+        self.assertEqual([call[:2] for call in calls], [('tick', 100.00), ('order', 7), ('order', 8), ('tick', 100.25), ('tick', 100.50)])
+        self.assertTrue(all(call[2] is tick_queue.thread for call in calls))
+        self.assertEqual(tick_queue.order_statuses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
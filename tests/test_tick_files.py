@@ -0,0 +1,76 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+from array import array
+import tempfile
+
+from lib.tick_files import (save_ticks, load_ticks, read_header, iter_json_ticks,
+    save_quotes, load_quotes, iter_quotes, is_quotes_file, TickRecorder, BID, ASK, LAST)
+
+class TestTickFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.ticks = [(1000.0, 99.75, BID), (1000.0, 100.25, ASK), (1000.5, 100.25, LAST), (1001.0, 100.00, BID), (1002.0, 100.00, LAST)]
+
+    def test_tick_files(self):
+        times = array('d', (1000000, 1000005, 1000010, 1000020, 1000030, 1000040))
+        prices = array('d', (1220.50, 1220.50, 1220.75, 1221.25, 0, 1221.00))
+        for tick_price in (0.25, 0.10, None):
+            file_name = f"{self.dir}/ESH9.ticks"
+            save_ticks(file_name, times, prices, "ESH9", tick_price, 2)
+            self.assertEqual(read_header(file_name)['price_type'], 'i' if tick_price == 0.25 else 'd')
+            self.assertFalse(is_quotes_file(file_name))
+            mapped_times, mapped_prices = load_ticks(file_name)
+            self.assertEqual(list(mapped_times), list(times))
+            self.assertEqual(list(mapped_prices), list(prices))
+            del mapped_times, mapped_prices
+
+    def test_json_tick_stream(self):
+        file_name = f"{self.dir}/ESH9.json"
+        with open(file_name, "w") as f:
+            f.write('[[1000000, 1220.5], [1000010, 1220.75],\n [1000020.5, 1221]]')
+        for chunk_size in (1, 7, 1 << 16):
+            self.assertEqual(list(iter_json_ticks(file_name, chunk_size)),
+                [(1000000, 1220.5), (1000010, 1220.75), (1000020.5, 1221)])
+        with open(file_name, "w") as f:
+            f.write('[[1000000, 1220.5], [1000010')
+        with self.assertRaises(ValueError):
+            list(iter_json_ticks(file_name))
+        for text in ("", " \n"):
+            with open(file_name, "w") as f:
+                f.write(text)
+            with self.assertRaises(ValueError):
+                list(iter_json_ticks(file_name))
+        with open(file_name, "w") as f:
+            f.write('[]')
+        self.assertEqual(list(iter_json_ticks(file_name)), [])
+
+    def test_quotes_file(self):
+        file_name = f"{self.dir}/ES.quotes"
+        save_quotes(file_name, *zip(*self.ticks), "ES", 0.25, 2)
+        self.assertTrue(is_quotes_file(file_name))
+        self.assertEqual(list(iter_quotes(file_name)), self.ticks)
+        times, prices = load_ticks(file_name)
+        self.assertEqual((list(times), list(prices)), ([1000.5, 1002.0], [100.25, 100.00]))
+        quotes, last_ticks = load_quotes(file_name)
+        self.assertEqual(list(zip(*quotes)), self.ticks)
+        self.assertEqual([list(column) for column in last_ticks], [list(times), list(prices)])
+        # Prices off the tick price are stored as they are
+        save_quotes(file_name, [1000.0], [100.1], [LAST], "ES", 0.25, 2)
+        self.assertEqual(list(iter_quotes(file_name)), [(1000.0, 100.1, LAST)])
+
+    def test_recorder_spill(self):
+        recorder = TickRecorder(f"{self.dir}/ES.spill")
+        recorder.SPILL_INTERVAL = 2
+        for time, price, kind in self.ticks:
+            recorder.record(kind, price, time)
+        self.assertEqual(len(recorder.records), 3)
+        self.assertEqual(list(zip(*recorder.all_ticks())), self.ticks)
+        recorder.close()
+        self.assertFalse(os.path.exists(f"{self.dir}/ES.spill"))
+
+
+if __name__ == '__main__':
+    unittest.main()
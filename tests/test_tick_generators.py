@@ -0,0 +1,21 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+
+from benchmarks.tick_generators import generate_ticks, REGIMES
+
+class TestTickGenerators(unittest.TestCase):
+
+    def test_ticks(self):
+        for regime in REGIMES:
+            times, prices = generate_ticks(regime, "CLF9", 2000, seed=1)
+            self.assertEqual(len(times), 2000)
+            self.assertTrue(all(t1 <= t2 for t1, t2 in zip(times, times[1:])))
+            self.assertTrue(all(p1 != p2 for p1, p2 in zip(prices, prices[1:])))
+            self.assertTrue(all(round(price, 2) == price for price in prices))
+            self.assertEqual((times, prices), generate_ticks(regime, "CLF9", 2000, seed=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
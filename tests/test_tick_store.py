@@ -0,0 +1,85 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import unittest
+import tempfile
+
+from models.tick_store import TickStore
+
+class TestTickStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = create_store()
+
+    def test_since_duration(self):
+        self.assertEqual(list(self.store.since(145)), list(self.store)[-4:])
+        self.assertEqual(list(self.store.since(100)), list(self.store)[-2:])
+        self.assertEqual(len(self.store.since(0)), 1)
+
+    def test_since_time(self):
+        self.assertEqual(list(self.store.since(1000100)), list(self.store)[-2:])
+        self.assertEqual(list(self.store.since(1000000)), list(self.store))
+
+    def test_view_is_not_affected_by_appends(self):
+        view = self.store.since(145)
+        self.store.append(1220.40, 1000300)
+        self.assertEqual(len(view), 4)
+        self.assertEqual(view[-1].time, 1000200)
+        self.assertEqual(view[1:][0].time, 1000090)
+
+    def test_rows(self):
+        cdp = self.store[3]
+        self.assertEqual(cdp.price, 1220.80)
+        self.assertEqual(cdp.duration, 25)
+        self.assertEqual(self.store[-1].duration, 0)
+        self.assertEqual(cdp, self.store.since(175)[0])
+        cdp.action += "-- BUY "
+        self.assertEqual(self.store[3].action, "-- BUY ")
+        self.assertEqual(self.store[4].action, "")
+
+    def test_durations_up_equal_down(self):
+        # Since 1000050: 1220.70 (10s), 1220.60 (30s), 1220.80 (10s), 1221.00 (100s), 1220.90 (last)
+        start = self.store.since(1000050).start
+        self.assertEqual(self.store.durations.up_equal_down(start, 1220.70), (110, 10, 30))
+        self.assertEqual(self.store.durations.up_equal_down(start, 1220.75), (110, 0, 40))
+        self.assertEqual(self.store.durations.up_equal_down(len(self.store) - 1, 1220.70), (0, 0, 0))
+
+    def test_empty(self):
+        self.assertEqual(len(TickStore().since(900)), 0)
+
+    def test_bounded_history(self):
+        spill_file = f"{tempfile.mkdtemp()}/ES.spill"
+        bounded = TickStore(max_duration=100, spill_file=spill_file)
+        unbounded = TickStore()
+        for i in range(3 * TickStore.EVICT_INTERVAL):
+            price, time = 1000 + (i * 7) % 13 * 0.25, 1000000 + i * 0.5
+            bounded.append(price, time)
+            unbounded.append(price, time)
+        self.assertGreater(bounded.offset, 0)
+        self.assertLess(len(bounded.price), 300)
+        self.assertEqual(len(bounded), len(unbounded))
+        for duration in (10, 50, 100):
+            view, expected = bounded.since(duration), unbounded.since(duration)
+            self.assertEqual((view.start, view.stop), (expected.start, expected.stop))
+            self.assertEqual(list(view.column('price')), list(expected.column('price')))
+            self.assertEqual(bounded.durations.up_equal_down(view.start, 1001), unbounded.durations.up_equal_down(view.start, 1001))
+        self.assertEqual(bounded[-1].duration, 0)
+        with self.assertRaises(IndexError):
+            bounded[0]
+        self.assertEqual(bounded.min_max_price(86400), (1000, 1003))
+        self.assertEqual(bounded.all_ticks(), (unbounded.time, unbounded.price))
+        bounded.close()
+        self.assertFalse(os.path.exists(spill_file))
+
+
+def create_store():
+    store = TickStore()
+    prices = (1220.40, 1220.60, 1220.70, 1220.80, 1220.70, 1220.60, 1220.80, 1221.00, 1220.90)
+    seconds = (0, 10, 15, 25, 50, 60, 90, 100, 200)
+    for price, second in zip(prices, seconds):
+        store.append(price, 1000000 + second)
+    return store
+
+
+if __name__ == '__main__':
+    unittest.main()
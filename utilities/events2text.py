@@ -0,0 +1,14 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from lib.event_log import read_events
+from models.monitor import Monitor
+
+# Renders an events datalog as the text datalog
+# python utilities/events2text.py <file.events> [event_type,event_type]
+if __name__ == "__main__":
+    args = sys.argv + 10 * [""]
+
+    event_types = [event_type for event_type in args[2].split(',') if event_type != '']
+    for event_type, payload in read_events(args[1]):
+        if len(event_types) == 0 or event_type in event_types:
+            sys.stdout.write(Monitor.render_event(event_type, payload))
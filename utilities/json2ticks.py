@@ -0,0 +1,21 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from lib import util
+from lib.tick_files import load_ticks, save_ticks
+from models.params import BASIC_PARAMETERS
+
+# Converts recorded .json tick files (a file or every file of a directory) to .ticks files
+if __name__ == "__main__":
+    args = sys.argv + 10 * [""]
+
+    if os.path.isdir(args[1]):
+        file_names = [f"{args[1]}/{file_name}" for file_name in sorted(os.listdir(args[1])) if file_name.endswith(".json")]
+    else:
+        file_names = [args[1]]
+
+    for file_name in file_names:
+        ticker = util.file_from_path(file_name)[:-len(".json")]
+        tick_price, price_precision, dollar_multiplier = BASIC_PARAMETERS.get(ticker[0:2], (None, 0, None))
+        times, prices = load_ticks(file_name)
+        save_ticks(f"{file_name[:-len('.json')]}.ticks", times, prices, ticker, tick_price, price_precision)
+        print(f"{file_name}: {len(times)} ticks")